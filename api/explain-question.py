@@ -0,0 +1,75 @@
+from flask import Flask, request, jsonify
+import os
+import sys
+
+# lib_loader.py at the repo root loads lib/ (not a valid module name) as "lib"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from lib_loader import load_lib
+load_lib()
+
+from lib.explanations import EXPLANATION_MISSING, get_question_explanation, is_explanation_admin
+from lib.http_cache import cached_json_response
+
+app = Flask(__name__)
+
+@app.route('/', methods=['GET', 'POST'])
+def explain_question():
+    if request.method == 'GET' and not request.args:
+        return jsonify({
+            "error": "This endpoint requires query parameters or POST method",
+            "usage": "GET ?questionId=1 (stored explanation) or POST with JSON body: {\"questionId\": 1} (generates a missing one)"
+        }), 405
+
+    try:
+        if request.method == 'GET':
+            data = request.args.to_dict()
+        elif request.is_json:
+            data = request.get_json()
+        else:
+            data = request.form.to_dict()
+
+        if not data:
+            return jsonify({"error": "No data provided"}), 400
+
+        question_id = data.get("questionId")
+        if not question_id:
+            return jsonify({"error": "Missing questionId"}), 400
+
+        try:
+            question_id = int(question_id)
+        except (ValueError, TypeError):
+            return jsonify({"error": "questionId must be a number"}), 400
+
+        # Generating calls the LLM and writes tblquestion, so GET only reads the stored explanation
+        generate = request.method == 'POST'
+        regenerate = generate and data.get("regenerate") in (True, "true", "1", 1)
+
+        # Regenerating overwrites curated descriptions: admin token only
+        if regenerate:
+            token = request.headers.get("Authorization", "").replace("Bearer ", "", 1).strip()
+            if not is_explanation_admin(token):
+                return jsonify({"error": "regenerate requires an admin token"}), 403
+
+        result = get_question_explanation(question_id, regenerate=regenerate, generate=generate)
+
+        if result.get("error") == "Question not found":
+            return jsonify({"error": "Question not found"}), 404
+        if result.get("error") == EXPLANATION_MISSING:
+            return jsonify({"error": EXPLANATION_MISSING, "usage": f"POST {{\"questionId\": {question_id}}} to generate it"}), 404
+        if result.get("error"):
+            return jsonify({"error": result["error"]}), 500
+
+        print(f"Explanation for question {question_id}: {result['source']}"
+              f"{' (coalesced)' if result.get('coalesced') else ''}")
+        return cached_json_response(result)
+
+    except Exception as e:
+        print(f"Error: {e}")
+        return jsonify({
+            "error": "Internal server error",
+            "details": str(e)
+        }), 500
+
+# For local testing
+if __name__ == "__main__":
+    app.run(debug=True)
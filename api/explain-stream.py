@@ -0,0 +1,97 @@
+from flask import Flask, Response, request, jsonify, stream_with_context
+import json
+import os
+import sys
+
+# lib_loader.py at the repo root loads lib/ (not a valid module name) as "lib"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from lib_loader import load_lib
+load_lib()
+
+from lib.board_explainer import get_shared_explainer
+
+app = Flask(__name__)
+
+def sse_event(data, event=None):
+    """Format one Server-Sent Events message"""
+    message = f"event: {event}\n" if event else ""
+    return message + f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+def parse_options(data):
+    """Options come as a JSON array, or as repeated ?option= query parameters"""
+    if request.method == 'GET' and "options" not in data:
+        return request.args.getlist("option")
+
+    options = data.get("options")
+    if isinstance(options, str):
+        options = json.loads(options)
+    if not isinstance(options, list):
+        raise ValueError("options must be a list")
+    return [str(option) for option in options]
+
+@app.route('/', methods=['GET', 'POST'])
+def explain_stream():
+    # GET is what the browser EventSource API sends
+    if request.method == 'GET' and not request.args:
+        return jsonify({
+            "error": "This endpoint requires query parameters or POST method",
+            "usage": "GET ?question=...&option=...&option=...&correctAnswer=A or POST with JSON body: "
+                     "{\"question\": \"...\", \"options\": [\"...\"], \"correctAnswer\": \"A\"}"
+        }), 405
+
+    try:
+        if request.method == 'GET':
+            data = request.args.to_dict()
+        elif request.is_json:
+            data = request.get_json()
+        else:
+            data = request.form.to_dict()
+
+        if not data:
+            return jsonify({"error": "No data provided"}), 400
+
+        question = data.get("question")
+        correct_answer = data.get("correctAnswer")
+        if not question or not correct_answer:
+            return jsonify({"error": "Missing question or correctAnswer"}), 400
+
+        try:
+            options = parse_options(data)
+        except ValueError:
+            return jsonify({"error": "options must be a JSON array of strings"}), 400
+
+        explainer = get_shared_explainer()
+        if not explainer:
+            return jsonify({"error": "OpenAI API is not configured"}), 500
+
+        def generate():
+            length = 0
+            try:
+                for text in explainer.stream_simple_explanation(question, options, correct_answer):
+                    length += len(text)
+                    yield sse_event({"text": text})
+                yield sse_event({"length": length}, event="done")
+            except Exception as e:
+                print(f"Error while streaming explanation: {e}")
+                yield sse_event({"error": "Explanation generation failed"}, event="error")
+
+        return Response(
+            stream_with_context(generate()),
+            mimetype="text/event-stream",
+            headers={
+                "Cache-Control": "no-cache",
+                # Keep proxies from buffering the stream
+                "X-Accel-Buffering": "no"
+            }
+        )
+
+    except Exception as e:
+        print(f"Error: {e}")
+        return jsonify({
+            "error": "Internal server error",
+            "details": str(e)
+        }), 500
+
+# For local testing
+if __name__ == "__main__":
+    app.run(debug=True)
@@ -1,61 +1,78 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
+import itertools
 import os
-import pymysql
+import sys
+
+# lib_loader.py at the repo root loads lib/ (not a valid module name) as "lib"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from lib_loader import load_lib
+load_lib()
+
+from lib.database import get_questions_by_topic, iter_questions_by_topic
+from lib.http_cache import cached_json_response
 
 app = Flask(__name__)
 
-def get_db_connection():
-    """Get database connection"""
-    try:
-        config = {
-            'host': os.getenv("MYSQL_HOST"),
-            'port': int(os.getenv("MYSQL_PORT", "3306")),
-            'user': os.getenv("MYSQL_USER"),
-            'password': os.getenv("MYSQL_PASSWORD"),
-            'database': os.getenv("MYSQL_DATABASE"),
-            'charset': 'utf8mb4',
-            'autocommit': True,
-            'connect_timeout': 30
-        }
-        return pymysql.connect(**config)
-    except Exception as e:
-        print(f"Database connection failed: {e}")
+# Upper bound for a single page when the caller passes `limit`
+MAX_PAGE_SIZE = 1000
+
+def parse_optional_int(data, key):
+    """Read an optional integer parameter, raising ValueError when it is not a number"""
+    value = data.get(key)
+    if value is None or value == "":
         return None
+    return int(value)
 
-def execute_query(query, params=None):
-    """Execute database query and return results"""
-    connection = get_db_connection()
-    if not connection:
-        return {"error": "Database connection failed"}
-    
+def stream_questions(topic_id, after, limit, mode):
+    """Stream a topic's questions as NDJSON lines or as one chunked JSON document"""
+    rows = iter_questions_by_topic(topic_id, after=after, limit=limit)
+
+    # Pull the first row now so connection and query errors still become a 500
     try:
-        cursor = connection.cursor(pymysql.cursors.DictCursor)
-        cursor.execute(query, params or ())
-        
-        if query.strip().upper().startswith('SELECT'):
-            result = cursor.fetchall()
-            return {"data": list(result)}
-        else:
-            return {"affected_rows": cursor.rowcount}
-            
+        first_row = next(rows, None)
     except Exception as e:
         print(f"Query execution failed: {e}")
-        return {"error": str(e)}
-    finally:
-        cursor.close()
-        connection.close()
+        return jsonify({"error": "Failed to fetch questions"}), 500
+
+    all_rows = itertools.chain([first_row], rows) if first_row is not None else iter(())
+
+    def generate():
+        if mode == "ndjson":
+            try:
+                for row in all_rows:
+                    yield app.json.dumps(row) + "\n"
+            except Exception as e:
+                print(f"Error while streaming questions: {e}")
+                yield app.json.dumps({"error": "Failed to fetch questions"}) + "\n"
+            return
+
+        # Same shape as the buffered response: {"data": [...]}
+        yield '{"data": ['
+        try:
+            for index, row in enumerate(all_rows):
+                yield ("," if index else "") + app.json.dumps(row)
+            yield "]}"
+        except Exception as e:
+            print(f"Error while streaming questions: {e}")
+            yield '], "error": "Failed to fetch questions"}'
+
+    mimetype = "application/x-ndjson" if mode == "ndjson" else "application/json"
+    return Response(stream_with_context(generate()), mimetype=mimetype)
 
 @app.route('/', methods=['GET', 'POST'])
 def fetch_questions_by_topic():
-    if request.method == 'GET':
+    # GET with query parameters is the cacheable form of the request
+    if request.method == 'GET' and not request.args:
         return jsonify({
-            "error": "This endpoint requires POST method",
-            "usage": "POST with JSON body: {\"topicId\": 1}"
+            "error": "This endpoint requires query parameters or POST method",
+            "usage": "GET ?topicId=1 or POST with JSON body: {\"topicId\": 1, \"limit\": 100, \"after\": 0, \"stream\": \"ndjson\"}"
         }), 405
     
     try:
-        # Handle both JSON and form data
-        if request.is_json:
+        # Handle query string, JSON and form data
+        if request.method == 'GET':
+            data = request.args.to_dict()
+        elif request.is_json:
             data = request.get_json()
         else:
             data = request.form.to_dict()
@@ -74,37 +91,36 @@ def fetch_questions_by_topic():
         except (ValueError, TypeError):
             return jsonify({"error": "topicId must be a number"}), 400
 
-        print(f"Fetching questions for topic ID: {topic_id}")
-
-        # Step 1: Fetch question IDs linked to the topic
-        query_ids = "SELECT questionId FROM topicQueRel WHERE topicId = %s"
-        response_ids = execute_query(query_ids, (topic_id,))
-
-        if response_ids.get("error"):
-            return jsonify({"error": "Failed to fetch question IDs"}), 500
+        # Optional keyset pagination: `after` is the last questionId already seen
+        try:
+            limit = parse_optional_int(data, "limit")
+            after = parse_optional_int(data, "after")
+        except (ValueError, TypeError):
+            return jsonify({"error": "limit and after must be numbers"}), 400
 
-        print(f"Raw topic-question ID data: {response_ids}")
+        if limit is not None and limit < 1:
+            return jsonify({"error": "limit must be positive"}), 400
+        if limit is not None:
+            limit = min(limit, MAX_PAGE_SIZE)
 
-        # Extract question IDs from response
-        rows = response_ids.get("data", [])
-        question_ids = [row["questionId"] for row in rows if row.get("questionId")]
-        print(f"Extracted question IDs: {question_ids}")
+        stream = data.get("stream")
+        if stream and stream not in ("ndjson", "json", True, "true"):
+            return jsonify({"error": "stream must be \"ndjson\" or \"json\""}), 400
 
-        if not question_ids:
-            return jsonify({"data": []}), 200
+        print(f"Fetching questions for topic ID: {topic_id}")
 
-        # Step 2: Build query for full questions
-        ids_placeholders = ",".join(["%s"] * len(question_ids))
-        query_questions = f"SELECT * FROM tblquestion WHERE questionId IN ({ids_placeholders})"
-        print(f"Final question query: {query_questions}")
+        if stream:
+            mode = "ndjson" if stream == "ndjson" else "json"
+            return stream_questions(topic_id, after, limit, mode)
 
-        response_questions = execute_query(query_questions, question_ids)
+        # Fetch the topic's questions in a single round trip
+        response_questions = get_questions_by_topic(topic_id, limit=limit, after=after)
 
         if response_questions.get("error"):
             return jsonify({"error": "Failed to fetch questions"}), 500
 
-        print(f"Fetched questions: {response_questions}")
-        return jsonify(response_questions), 200
+        print(f"Fetched {len(response_questions.get('data', []))} questions")
+        return cached_json_response(response_questions)
 
     except Exception as e:
         print(f"Error: {e}")
@@ -1,62 +1,31 @@
 from flask import Flask, request, jsonify
 import os
-import pymysql
-import json
+import sys
 
-app = Flask(__name__)
+# lib_loader.py at the repo root loads lib/ (not a valid module name) as "lib"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from lib_loader import load_lib
+load_lib()
 
-def get_db_connection():
-    """Get database connection"""
-    try:
-        config = {
-            'host': os.getenv("MYSQL_HOST"),
-            'port': int(os.getenv("MYSQL_PORT", "3306")),
-            'user': os.getenv("MYSQL_USER"),
-            'password': os.getenv("MYSQL_PASSWORD"),
-            'database': os.getenv("MYSQL_DATABASE"),
-            'charset': 'utf8mb4',
-            'autocommit': True,
-            'connect_timeout': 30
-        }
-        return pymysql.connect(**config)
-    except Exception as e:
-        print(f"Database connection failed: {e}")
-        return None
+from lib.database import get_topics_by_subject
+from lib.http_cache import cached_json_response
 
-def execute_query(query, params=None):
-    """Execute database query and return results"""
-    connection = get_db_connection()
-    if not connection:
-        return {"error": "Database connection failed"}
-    
-    try:
-        cursor = connection.cursor(pymysql.cursors.DictCursor)
-        cursor.execute(query, params or ())
-        
-        if query.strip().upper().startswith('SELECT'):
-            result = cursor.fetchall()
-            return {"data": list(result)}
-        else:
-            return {"affected_rows": cursor.rowcount}
-            
-    except Exception as e:
-        print(f"Query execution failed: {e}")
-        return {"error": str(e)}
-    finally:
-        cursor.close()
-        connection.close()
+app = Flask(__name__)
 
 @app.route('/', methods=['GET', 'POST'])
 def fetch_topics():
-    if request.method == 'GET':
+    # GET with query parameters is the cacheable form of the request
+    if request.method == 'GET' and not request.args:
         return jsonify({
-            "error": "This endpoint requires POST method",
-            "usage": "POST with JSON body: {\"subjectId\": 1}"
+            "error": "This endpoint requires query parameters or POST method",
+            "usage": "GET ?subjectId=1 or POST with JSON body: {\"subjectId\": 1}"
         }), 405
     
     try:
-        # Handle both JSON and form data
-        if request.is_json:
+        # Handle query string, JSON and form data
+        if request.method == 'GET':
+            data = request.args.to_dict()
+        elif request.is_json:
             data = request.get_json()
         else:
             data = request.form.to_dict()
@@ -75,9 +44,8 @@ def fetch_topics():
         except (ValueError, TypeError):
             return jsonify({"error": "subjectId must be a number"}), 400
 
-        # Query database
-        sql_query = "SELECT * FROM topics WHERE subjectId = %s"
-        response = execute_query(sql_query, (subject_id,))
+        # Query database through the shared connection pool
+        response = get_topics_by_subject(subject_id)
 
         if response.get("error"):
             return jsonify({
@@ -85,7 +53,7 @@ def fetch_topics():
                 "details": response["error"]
             }), 500
 
-        return jsonify(response), 200
+        return cached_json_response(response)
 
     except Exception as e:
         return jsonify({
@@ -1,33 +1,16 @@
 from flask import Flask, jsonify
 import os
 import sys
-import pymysql
 
-app = Flask(__name__)
+# lib_loader.py at the repo root loads lib/ (not a valid module name) as "lib"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from lib_loader import load_lib
+load_lib()
 
-def get_db_connection():
-    """Test database connection"""
-    try:
-        config = {
-            'host': os.getenv("MYSQL_HOST"),
-            'port': int(os.getenv("MYSQL_PORT", "3306")),
-            'user': os.getenv("MYSQL_USER"),
-            'password': os.getenv("MYSQL_PASSWORD"),
-            'database': os.getenv("MYSQL_DATABASE"),
-            'charset': 'utf8mb4',
-            'connect_timeout': 10
-        }
-        
-        connection = pymysql.connect(**config)
-        cursor = connection.cursor()
-        cursor.execute("SELECT 1")
-        result = cursor.fetchone()
-        cursor.close()
-        connection.close()
-        
-        return True, "Connected successfully"
-    except Exception as e:
-        return False, str(e)
+from lib.database import get_db_pool, hierarchy_cache, test_db_connection
+from lib.llm_client import get_openai_pool_stats
+
+app = Flask(__name__)
 
 @app.route('/', defaults={'path': ''})
 @app.route('/<path:path>')
@@ -40,16 +23,20 @@ def health_check(path):
             "mysql_password": "configured" if os.getenv("MYSQL_PASSWORD") else "missing"
         }
         
-        # Test database connection
-        db_connected, db_message = get_db_connection()
+        # Test database connection through the shared pool
+        db_connected, db_message = test_db_connection()
+        pool = get_db_pool()
         
         response = {
             "status": "healthy" if db_connected else "partial",
             "database": {
                 "connected": db_connected,
                 "message": db_message,
-                "host": os.getenv("MYSQL_HOST", "not set")
+                "host": os.getenv("MYSQL_HOST", "not set"),
+                "pool": pool.stats() if pool else None
             },
+            "cache": hierarchy_cache.stats(),
+            "openai_pool": get_openai_pool_stats(),
             "environment": env_status,
             "python_version": sys.version,
             "deployment": "vercel_serverless"
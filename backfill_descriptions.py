@@ -0,0 +1,14 @@
+import sys
+
+# Resumable backfill of missing question descriptions.
+#   python backfill_descriptions.py --topic-id 12 --time-budget 240
+# Progress is checkpointed after every batch; run the same command again to resume.
+
+# lib_loader.py (next to this script) loads lib/ (not a valid module name) as "lib"
+from lib_loader import load_lib
+load_lib()
+
+from lib.backfill import main
+
+if __name__ == "__main__":
+    sys.exit(main())
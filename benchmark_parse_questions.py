@@ -0,0 +1,125 @@
+import argparse
+import random
+import re
+import sys
+import time
+
+# Benchmark for bulk question parsing.
+#   python benchmark_parse_questions.py --questions 100000
+# Builds a synthetic question bank (Polish and English, including exports
+# with cp1252-mangled Polish), checks that parse_questions agrees with the
+# previous line-by-line parser, and reports questions/sec for both.
+# The previous parser only knew the cp1252-mangled Polish answer phrases, so
+# questions whose answer line is correctly encoded Polish are expected to
+# differ: parse_questions finds their answer, the old parser did not.
+
+# lib_loader.py (next to this script) loads lib/ (not a valid module name) as "lib"
+from lib_loader import load_lib
+load_lib()
+
+from lib.question_parser import ANSWER_PHRASES, parse_question_text, parse_questions
+
+STEMS = [
+    "A 54-year-old man presents with chest pain radiating to the left arm.",
+    "Pacjentka lat 32 zgłasza się z gorączką, kaszlem i dusznością od 3 dni.",
+    "Which of the following statements about heart failure are true:",
+    "Które z poniższych stwierdzeń dotyczących cukrzycy typu 2 są prawdziwe:",
+    "Laboratory results show hemoglobin 9 g/dl and MCV 70 fl."
+]
+STATEMENTS = [
+    "metformin is the first-line drug",
+    "leczenie rozpoczyna się od zmiany stylu życia",
+    "troponin rises within 3 hours",
+    "objawy ustępują po antybiotykoterapii",
+    "ACE inhibitors reduce mortality"
+]
+ANSWER_LINES = ["Prawidłowa odpowiedź: {}", "Correct answer: {}", "Answer: {}", "Odpowiedź: {}"]
+
+# The answer phrases parse_question matched before, as they were written
+LEGACY_ANSWER_PHRASES = ["PrawidÅ‚owa odpowiedÅº", "Correct answer", "Answer:", "OdpowiedÅº:"]
+# Phrases only the new parser knows: correctly encoded Polish
+NEW_ANSWER_PHRASES = tuple(phrase for phrase in ANSWER_PHRASES if phrase not in LEGACY_ANSWER_PHRASES)
+
+def legacy_parse_question(question_text):
+    """The line-by-line parser parse_question used before, kept as the baseline"""
+    lines = question_text.strip().split('\n')
+    main_topic = ""
+    options = []
+    answer_choices = []
+    correct_answer = ""
+    current_section = "topic"
+
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        if re.match(r'^\d+\)', line):
+            current_section = "options"
+            options.append(line)
+        elif re.match(r'^[A-E]\.', line):
+            current_section = "choices"
+            answer_choices.append(line)
+        elif any(phrase in line for phrase in LEGACY_ANSWER_PHRASES):
+            current_section = "answer"
+            correct_answer = line
+        elif current_section == "topic":
+            main_topic += " " + line
+
+    return {
+        "main_topic": main_topic.strip().rstrip(':'),
+        "options": options,
+        "answer_choices": answer_choices,
+        "correct_answer": correct_answer
+    }
+
+def is_intended_difference(question_text):
+    """A mismatch is expected when the question has a correctly encoded Polish answer line"""
+    return any(phrase in question_text for phrase in NEW_ANSWER_PHRASES)
+
+def build_corpus(count, seed=42):
+    """Synthetic question texts shaped like exported bank rows"""
+    rng = random.Random(seed)
+    corpus = []
+    for _ in range(count):
+        lines = rng.sample(STEMS, rng.randint(1, 2))
+        lines += [f"{number}) {rng.choice(STATEMENTS)}" for number in range(1, rng.randint(1, 5) + 1)]
+        lines += [f"{letter}. {rng.choice(STATEMENTS)}" for letter in "ABCDE"[:rng.randint(4, 5)]]
+        answer = rng.choice(ANSWER_LINES).format(rng.choice("ABCDE"))
+        if rng.random() < 0.3:
+            answer = answer.encode("utf-8").decode("cp1252", errors="replace")
+        lines.append(answer)
+        corpus.append("\n".join(f"  {line}" if rng.random() < 0.1 else line for line in lines))
+    return corpus
+
+def time_run(label, parse, corpus, repeat):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        parse(corpus)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    print(f"{label:<28} {best:8.3f}s  {len(corpus) / best:12,.0f} questions/sec")
+    return best
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark bulk question parsing")
+    parser.add_argument("--questions", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    corpus = build_corpus(args.questions)
+    print(f"Corpus: {len(corpus):,} questions, {sum(len(text) for text in corpus) / 1e6:.1f} MB")
+
+    mismatched = [text for text in corpus if parse_question_text(text).to_dict() != legacy_parse_question(text)]
+    intended = sum(1 for text in mismatched if is_intended_difference(text))
+    mismatches = len(mismatched) - intended
+    print(f"Differences from the line-by-line parser: {len(mismatched)} "
+          f"({intended} correctly encoded Polish answer lines, {mismatches} unexpected)")
+
+    legacy = time_run("line-by-line parse_question", lambda texts: [legacy_parse_question(text) for text in texts], corpus, args.repeat)
+    bulk = time_run("parse_questions", parse_questions, corpus, args.repeat)
+    print(f"Speed-up: {legacy / bulk:.2f}x")
+    return 1 if mismatches else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,11 +2,22 @@
 # This file makes the lib directory a Python package
 # It can be empty or contain package-level imports
 
-from .database import get_db_connection, execute_query
+from .database import (
+    acquire_db_connection,
+    execute_query,
+    get_db_connection,
+    get_db_pool,
+    pooled_db_connection,
+    release_db_connection
+)
 from .board_explainer import GenericBoardStyleMedicalExplainer
 
 __all__ = [
     'get_db_connection',
-    'execute_query', 
+    'acquire_db_connection',
+    'release_db_connection',
+    'pooled_db_connection',
+    'get_db_pool',
+    'execute_query',
     'GenericBoardStyleMedicalExplainer'
 ]
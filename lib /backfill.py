@@ -0,0 +1,234 @@
+import os
+import json
+import time
+import argparse
+import tempfile
+
+from .board_explainer import GenericBoardStyleMedicalExplainer
+from .database import execute_query
+from .question_bank import row_to_mcq
+from .question_store import update_descriptions
+from .queries import build_missing_descriptions_query, get_question_column_map
+
+# Backfill of missing tblquestion descriptions.
+# Questions are scanned in questionId order and the checkpoint stores the
+# last questionId whose batch was written, so a crash or a serverless
+# timeout resumes from the next batch instead of starting over.
+
+DEFAULT_BATCH_SIZE = 50
+MAX_FAILED_IDS = 1000
+# Batches in a row where every explanation failed (an API or DB outage)
+# before the run stops; the cursor stays on the failed batch
+MAX_FAILED_BATCHES = int(os.getenv("BACKFILL_MAX_FAILED_BATCHES", "3"))
+
+def get_checkpoint_path(topic_id=None):
+    """
+    Checkpoint file for a topic (or for the whole bank), under BACKFILL_CHECKPOINT_DIR
+    There is no default directory: a temp directory does not survive across
+    serverless instances, so a resumed run would silently start over
+    """
+    directory = os.getenv("BACKFILL_CHECKPOINT_DIR")
+    if not directory:
+        raise ValueError("Set BACKFILL_CHECKPOINT_DIR or pass a checkpoint path to keep backfill progress")
+    name = f"topic_{topic_id}" if topic_id is not None else "all"
+    return os.path.join(directory, f"medfellow_backfill_{name}.json")
+
+def new_checkpoint():
+    return {"after": None, "processed": 0, "written": 0, "failed": 0, "failed_ids": [],
+            "elapsed": 0.0, "finished": False}
+
+def load_checkpoint(path):
+    """Read a checkpoint, or start a fresh one when there is none"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        pass
+    except (ValueError, OSError) as e:
+        print(f"Ignoring unreadable checkpoint {path}: {e}")
+
+    return new_checkpoint()
+
+def save_checkpoint(path, checkpoint):
+    """Write the checkpoint atomically, so a crash mid-write keeps the previous one"""
+    checkpoint["updated_at"] = time.time()
+    directory = os.path.dirname(path) or "."
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".backfill-", suffix=".json")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(checkpoint, f)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def count_missing_descriptions(topic_id=None, after=None):
+    """Questions still waiting for a description after the cursor, or None on failure"""
+    query, params = build_missing_descriptions_query(topic_id, after=after, count=True)
+    result = execute_query(query, params)
+    if result.get("error") or not result.get("data"):
+        return None
+    return result["data"][0]["count"]
+
+def format_eta(seconds):
+    if seconds is None:
+        return "unknown"
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h{minutes:02d}m{seconds:02d}s" if hours else f"{minutes}m{seconds:02d}s"
+
+def run_backfill(topic_id=None, checkpoint_path=None, batch_size=DEFAULT_BATCH_SIZE, max_concurrency=8,
+                 time_budget=None, max_batches=None, restart=False, api_key=None, explainer=None):
+    """
+    Generate explanations for questions with a NULL or blank description.
+    Each batch is fetched by keyset, explained with bounded concurrency,
+    written back in bulk and then checkpointed. time_budget (seconds) stops
+    before a batch that would not finish in time, so a serverless run can
+    end cleanly and the next one resumes. A batch where every explanation
+    failed is retried in place; after MAX_FAILED_BATCHES of those in a row
+    the run stops without moving the cursor.
+    checkpoint_path must be durable storage (or BACKFILL_CHECKPOINT_DIR set).
+    Returns a progress report, with "error" when the run had to stop
+    """
+    try:
+        checkpoint_path = checkpoint_path or get_checkpoint_path(topic_id)
+    except ValueError as e:
+        return {"topic_id": topic_id, "error": str(e)}
+    checkpoint = load_checkpoint(checkpoint_path)
+    if restart or checkpoint.get("finished"):
+        checkpoint = new_checkpoint()
+    checkpoint["topic_id"] = topic_id
+
+    started = time.monotonic()
+    deadline = started + time_budget if time_budget else None
+    explainer = explainer or GenericBoardStyleMedicalExplainer(api_key)
+    column_map = get_question_column_map()
+    columns = ["questionId"] + [column_map[field] for field in ("question", "A", "B", "C", "D", "answer")]
+
+    remaining = count_missing_descriptions(topic_id, checkpoint["after"])
+    print(f"Backfill starting after questionId {checkpoint['after']}: {remaining} questions to explain")
+
+    run_processed = 0
+    batches = 0
+    failed_batches = 0
+    error = None
+    slowest_batch = 0.0
+
+    while max_batches is None or batches < max_batches:
+        if deadline and time.monotonic() + slowest_batch > deadline:
+            print("Backfill stopping: time budget would run out during the next batch")
+            break
+
+        batch_started = time.monotonic()
+        query, params = build_missing_descriptions_query(
+            topic_id, after=checkpoint["after"], limit=batch_size, columns=columns
+        )
+        result = execute_query(query, params)
+        if result.get("error"):
+            error = result["error"]
+            break
+
+        rows = result.get("data", [])
+        if not rows:
+            checkpoint["finished"] = True
+            break
+
+        items = []
+        for row in rows:
+            mcq = row_to_mcq(row, column_map)
+            options = [mcq["options"][letter] for letter in ("A", "B", "C", "D")]
+            items.append((mcq["question"], options, mcq["answer"]))
+
+        results = explainer.generate_explanations_batch(items, max_concurrency=max_concurrency)
+        updates = [(rows[item["index"]]["questionId"], item["explanation"]) for item in results if item["success"]]
+        failed_ids = [rows[item["index"]]["questionId"] for item in results if not item["success"]]
+
+        if not updates:
+            # Nothing explained (API outage?): retry this batch instead of skipping past it
+            failed_batches += 1
+            print(f"Backfill: every explanation failed after questionId {checkpoint['after']} "
+                  f"({failed_batches}/{MAX_FAILED_BATCHES})")
+            if failed_batches >= MAX_FAILED_BATCHES:
+                error = f"{failed_batches} batches in a row failed completely: {results[0]['error']}"
+                break
+            slowest_batch = max(slowest_batch, time.monotonic() - batch_started)
+            continue
+        failed_batches = 0
+
+        report = update_descriptions(updates)
+        if report.get("error"):
+            # Keep the cursor where it was so the next run retries this batch
+            error = report["error"]
+            break
+
+        # Failed questions keep an empty description; the next full scan picks them up again
+        checkpoint["after"] = rows[-1]["questionId"]
+        checkpoint["processed"] += len(rows)
+        checkpoint["written"] += report["rows"]
+        checkpoint["failed"] += len(failed_ids)
+        checkpoint["failed_ids"] = (checkpoint["failed_ids"] + failed_ids)[-MAX_FAILED_IDS:]
+        checkpoint["elapsed"] = round(checkpoint["elapsed"] + time.monotonic() - batch_started, 3)
+        save_checkpoint(checkpoint_path, checkpoint)
+
+        batches += 1
+        run_processed += len(rows)
+        slowest_batch = max(slowest_batch, time.monotonic() - batch_started)
+
+        elapsed = time.monotonic() - started
+        rate = run_processed / elapsed if elapsed > 0 else 0.0
+        if remaining is not None:
+            left = max(remaining - run_processed, 0)
+            eta = format_eta(left / rate) if rate else "unknown"
+            print(f"Backfill: {run_processed}/{remaining} questions, {rate:.2f} q/s, ETA {eta} "
+                  f"(last questionId {checkpoint['after']})")
+        else:
+            print(f"Backfill: {run_processed} questions, {rate:.2f} q/s (last questionId {checkpoint['after']})")
+
+    if checkpoint.get("finished"):
+        save_checkpoint(checkpoint_path, checkpoint)
+
+    elapsed = time.monotonic() - started
+    summary = {
+        "topic_id": topic_id,
+        "checkpoint": checkpoint_path,
+        "after": checkpoint["after"],
+        "finished": checkpoint.get("finished", False),
+        "batches": batches,
+        "processed": run_processed,
+        "total_processed": checkpoint["processed"],
+        "total_written": checkpoint["written"],
+        "total_failed": checkpoint["failed"],
+        "remaining": max(remaining - run_processed, 0) if remaining is not None else None,
+        "elapsed": round(elapsed, 3),
+        "questions_per_sec": round(run_processed / elapsed, 3) if elapsed > 0 else 0.0
+    }
+    if error:
+        print(f"Backfill stopped: {error}")
+        summary["error"] = error
+    return summary
+
+def main(argv=None):
+    """Command line entry point; see backfill_descriptions.py"""
+    parser = argparse.ArgumentParser(description="Fill missing tblquestion descriptions with generated explanations")
+    parser.add_argument("--topic-id", type=int, default=None, help="Only backfill questions of this topic")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Questions per batch")
+    parser.add_argument("--concurrency", type=int, default=8, help="Explanations generated in parallel")
+    parser.add_argument("--time-budget", type=float, default=None, help="Stop cleanly after this many seconds")
+    parser.add_argument("--max-batches", type=int, default=None, help="Stop after this many batches")
+    parser.add_argument("--checkpoint", default=None,
+                        help="Checkpoint file path (default: under BACKFILL_CHECKPOINT_DIR, which must then be set)")
+    parser.add_argument("--restart", action="store_true", help="Ignore the checkpoint and scan from the start")
+    args = parser.parse_args(argv)
+
+    summary = run_backfill(
+        topic_id=args.topic_id,
+        checkpoint_path=args.checkpoint,
+        batch_size=args.batch_size,
+        max_concurrency=args.concurrency,
+        time_budget=args.time_budget,
+        max_batches=args.max_batches,
+        restart=args.restart
+    )
+    print(json.dumps(summary, indent=2))
+    return 1 if summary.get("error") else 0
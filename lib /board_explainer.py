@@ -1,76 +1,64 @@
 import os
 import json
-from openai import OpenAI
-from typing import Dict, List, Optional
+from typing import Dict, Iterator, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
 import time
-import re
+import threading
+
+from .llm_cache import get_cached_llm_output, llm_cache_key, store_llm_output
+from .llm_client import get_async_openai_client, get_openai_client
+from .question_parser import parse_question_text
+from .rate_limiter import create_chat_completion, create_chat_completion_async
+
+# Model used for explanations. Bump a prompt version whenever that prompt
+# changes, so cached outputs produced by the old prompt are not reused
+EXPLANATION_MODEL = "gpt-4o-mini"
+SIMPLE_EXPLANATION_PROMPT_VERSION = 1
+QUICK_EXPLANATION_PROMPT_VERSION = 1
 
 class GenericBoardStyleMedicalExplainer:
-    def __init__(self, api_key: str = None):
-        """Initialize the explainer with OpenAI API key"""
+    def __init__(self, api_key: str = None, base_url: str = None):
+        """Initialize the explainer with OpenAI API key (base_url points it at another server, e.g. a mock)"""
         if not api_key:
             api_key = os.getenv("OPENAI_API_KEY")
         
         if not api_key:
             raise ValueError("OpenAI API key is required")
             
-        self.client = OpenAI(api_key=api_key)
+        self.api_key = api_key
+        self.base_url = base_url
+        # Shared process-wide client: explainers reuse its warm connections
+        self.client = get_openai_client(api_key, base_url)
         self.research_results = []
+
+    @property
+    def async_client(self):
+        """Shared AsyncOpenAI client for the running event loop"""
+        return get_async_openai_client(self.api_key, self.base_url)
         
     def parse_question(self, question_text: str) -> Dict:
         """
         Parse any medical board question to extract key components
+        For many questions at once, use parse_questions (compact records)
         """
-        # Extract the main topic and options
-        lines = question_text.strip().split('\n')
-        
-        # Find the main question/topic (usually the first line or lines before numbered options)
-        main_topic = ""
-        options = []
-        answer_choices = []
-        correct_answer = ""
-        
-        current_section = "topic"
-        
-        for line in lines:
-            line = line.strip()
-            if not line:
-                continue
-                
-            # Check if it's a numbered option (1), 2), 3), etc.)
-            if re.match(r'^\d+\)', line):
-                current_section = "options"
-                options.append(line)
-            
-            # Check if it's answer choices (A., B., C., etc.)
-            elif re.match(r'^[A-E]\.', line):
-                current_section = "choices"
-                answer_choices.append(line)
-            
-            # Check if it's the correct answer line (Polish or English)
-            elif any(phrase in line for phrase in ["PrawidÅ‚owa odpowiedÅº", "Correct answer", "Answer:", "OdpowiedÅº:"]):
-                current_section = "answer"
-                correct_answer = line
-            
-            # Build the main topic
-            elif current_section == "topic":
-                main_topic += " " + line
-        
-        # Clean up the main topic
-        main_topic = main_topic.strip().rstrip(':')
-        
-        return {
-            "main_topic": main_topic,
-            "options": options,
-            "answer_choices": answer_choices,
-            "correct_answer": correct_answer
-        }
+        return parse_question_text(question_text).to_dict()
 
     def generate_simple_explanation(self, question: str, options: List[str], correct_answer: str) -> str:
         """
         Generate a simplified explanation suitable for serverless environments
         This version is optimized for faster execution and lower resource usage
         """
+        try:
+            return self._request_simple_explanation(question, options, correct_answer)
+            
+        except Exception as e:
+            print(f"Error in simple explanation generation: {str(e)}")
+            return self._generate_fallback_explanation(question, options, correct_answer)
+
+    def _build_simple_explanation_messages(self, question: str, options: List[str], correct_answer: str) -> List[Dict]:
+        """
+        Build the chat messages for generate_simple_explanation
+        """
         # Format options as labeled choices
         labeled_options = []
         for i, option in enumerate(options):
@@ -100,30 +88,179 @@ class GenericBoardStyleMedicalExplainer:
         **NieprawidÅ‚owe opcje:** [krÃ³tkie wyjaÅ›nienie dla każdej]
         """
 
+        return [
+            {"role": "system", "content": "JesteÅ› edukatorem medycznym dostarczajÄ…cym jasne, dokÅ‚adne wyjaÅ›nienia dla pytaÅ„ w stylu egzaminu paÅ„stwowego. Skoncentruj siÄ™ na wartoÅ›ci edukacyjnej i rozumowaniu klinicznym. Odpowiadaj WYÅÄ„CZNIE po polsku uÅ¼ywajÄ…c polskiej terminologii medycznej."},
+            {"role": "user", "content": prompt}
+        ]
+
+    def _simple_explanation_cache_key(self, question: str, options: List[str], correct_answer: str) -> str:
+        """
+        LLM cache key for a simple explanation request
+        """
+        return llm_cache_key(
+            "simple_explanation", EXPLANATION_MODEL, SIMPLE_EXPLANATION_PROMPT_VERSION,
+            {"question": question, "options": list(options), "correct_answer": correct_answer}, 0.3
+        )
+
+    def _request_simple_explanation(self, question: str, options: List[str], correct_answer: str, timeout: float = 30,
+                                    refresh: bool = False) -> str:
+        """
+        Request one explanation from the API
+        Raises on API errors or unusable output instead of falling back
+        Answers from the LLM output cache when the same question was explained before;
+        refresh skips the cache and overwrites its entry with the new explanation
+        timeout bounds the whole request, rate limit waits and retries included
+        """
+        cache_key = self._simple_explanation_cache_key(question, options, correct_answer)
+        if not refresh:
+            found, cached = get_cached_llm_output(cache_key)
+            if found:
+                return cached
+        
+        response = create_chat_completion(
+            self.client,
+            model=EXPLANATION_MODEL,  # Using mini version for faster response in serverless
+            messages=self._build_simple_explanation_messages(question, options, correct_answer),
+            temperature=0.3,  # Slightly higher for more natural explanations
+            max_tokens=600,   # Reduced for faster response
+            timeout=timeout,  # 30 second default for serverless
+            deadline=time.monotonic() + timeout
+        )
+        
+        explanation = response.choices[0].message.content.strip()
+        
+        # Basic validation
+        if len(explanation) < 50:
+            raise ValueError(f"Explanation too short ({len(explanation)} chars)")
+        
+        store_llm_output(cache_key, "simple_explanation", explanation)
+        return explanation
+
+    def stream_simple_explanation(self, question: str, options: List[str], correct_answer: str,
+                                  timeout: float = 30) -> Iterator[str]:
+        """
+        Stream a simple explanation as text deltas, as the model produces them
+        The first tokens arrive well before the full answer would. A cached
+        explanation is yielded in one piece; when the request fails before
+        any text was produced, the fallback explanation is yielded instead.
+        Errors after the first token are raised to the caller
+        """
+        cache_key = self._simple_explanation_cache_key(question, options, correct_answer)
+        found, cached = get_cached_llm_output(cache_key)
+        if found:
+            yield cached
+            return
+        
+        parts = []
         try:
-            response = self.client.chat.completions.create(
-                model="gpt-4o-mini",  # Using mini version for faster response in serverless
-                messages=[
-                    {"role": "system", "content": "JesteÅ› edukatorem medycznym dostarczajÄ…cym jasne, dokÅ‚adne wyjaÅ›nienia dla pytaÅ„ w stylu egzaminu paÅ„stwowego. Skoncentruj siÄ™ na wartoÅ›ci edukacyjnej i rozumowaniu klinicznym. Odpowiadaj WYÅÄ„CZNIE po polsku uÅ¼ywajÄ…c polskiej terminologii medycznej."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.3,  # Slightly higher for more natural explanations
-                max_tokens=600,   # Reduced for faster response
-                timeout=30        # 30 second timeout for serverless
+            stream = create_chat_completion(
+                self.client,
+                model=EXPLANATION_MODEL,
+                messages=self._build_simple_explanation_messages(question, options, correct_answer),
+                temperature=0.3,
+                max_tokens=600,
+                timeout=timeout,
+                deadline=time.monotonic() + timeout,
+                stream=True
             )
             
-            explanation = response.choices[0].message.content.strip()
-            
-            # Basic validation
-            if len(explanation) < 50:
-                return self._generate_fallback_explanation(question, options, correct_answer)
-            
-            return explanation
+            for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    parts.append(delta)
+                    yield delta
+                    
+        except Exception as e:
+            if parts:
+                raise
+            print(f"Error in streaming explanation generation: {str(e)}")
+            yield self._generate_fallback_explanation(question, options, correct_answer)
+            return
+        
+        explanation = "".join(parts).strip()
+        if not explanation:
+            yield self._generate_fallback_explanation(question, options, correct_answer)
+        elif len(explanation) >= 50:
+            store_llm_output(cache_key, "simple_explanation", explanation)
+
+    async def generate_simple_explanation_async(self, question: str, options: List[str], correct_answer: str) -> str:
+        """
+        Async variant of generate_simple_explanation
+        Many calls can be awaited together over the shared async client
+        """
+        try:
+            return await self._request_simple_explanation_async(question, options, correct_answer)
             
         except Exception as e:
-            print(f"Error in simple explanation generation: {str(e)}")
+            print(f"Error in async simple explanation generation: {str(e)}")
             return self._generate_fallback_explanation(question, options, correct_answer)
 
+    async def _request_simple_explanation_async(self, question: str, options: List[str], correct_answer: str,
+                                                timeout: float = 30, refresh: bool = False) -> str:
+        """
+        Async variant of _request_simple_explanation
+        """
+        cache_key = self._simple_explanation_cache_key(question, options, correct_answer)
+        if not refresh:
+            found, cached = get_cached_llm_output(cache_key)
+            if found:
+                return cached
+        
+        response = await create_chat_completion_async(
+            self.async_client,
+            model=EXPLANATION_MODEL,
+            messages=self._build_simple_explanation_messages(question, options, correct_answer),
+            temperature=0.3,
+            max_tokens=600,
+            timeout=timeout,
+            deadline=time.monotonic() + timeout
+        )
+        
+        explanation = response.choices[0].message.content.strip()
+        
+        if len(explanation) < 50:
+            raise ValueError(f"Explanation too short ({len(explanation)} chars)")
+        
+        store_llm_output(cache_key, "simple_explanation", explanation)
+        return explanation
+
+    def generate_explanations_batch(self, items: List[Tuple[str, List[str], str]], max_concurrency: int = 8,
+                                    timeout: float = 30) -> List[Dict]:
+        """
+        Generate explanations for many (question, options, correct_answer) tuples concurrently
+        Returns one result per item, in input order:
+        {"index", "success", "explanation", "error", "elapsed"}
+        Failed items are reported as failures rather than replaced with the fallback text,
+        so callers can retry them or skip saving them
+        """
+        items = list(items)
+        if not items:
+            return []
+        
+        def explain(index: int, item: Tuple[str, List[str], str]) -> Dict:
+            started = time.monotonic()
+            try:
+                question, options, correct_answer = item
+                explanation = self._request_simple_explanation(question, options, correct_answer, timeout=timeout)
+                return {"index": index, "success": True, "explanation": explanation, "error": None,
+                        "elapsed": round(time.monotonic() - started, 3)}
+            except Exception as e:
+                print(f"Error in batch explanation for item {index}: {str(e)}")
+                return {"index": index, "success": False, "explanation": None, "error": str(e),
+                        "elapsed": round(time.monotonic() - started, 3)}
+        
+        started = time.monotonic()
+        workers = max(1, min(max_concurrency, len(items)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(explain, range(len(items)), items))
+        
+        succeeded = sum(1 for result in results if result["success"])
+        print(f"Batch explanations: {succeeded}/{len(items)} succeeded in {time.monotonic() - started:.1f}s "
+              f"with {workers} workers")
+        return results
+
     def _generate_fallback_explanation(self, question: str, options: List[str], correct_answer: str) -> str:
         """
         Generate a basic fallback explanation when OpenAI API fails
@@ -146,43 +283,104 @@ class GenericBoardStyleMedicalExplainer:
         Generate a very quick explanation without detailed option analysis
         Optimized for high-throughput serverless scenarios
         """
-        prompt = f"""
-        Podaj krÃ³tkie (50-100 sÅ‚Ã³w) wyjaÅ›nienie medyczne:
+        cache_key = self._quick_explanation_cache_key(question, correct_answer)
+        found, cached = get_cached_llm_output(cache_key)
+        if found:
+            return cached
         
-        Pytanie: {question}
-        PrawidÅ‚owa odpowiedÅº: {correct_answer}
-        
-        WyjaÅ›nij tylko dlaczego ta odpowiedÅº jest prawidÅ‚owa. JÄ™zyk polski, terminologia medyczna.
-        """
-
         try:
-            response = self.client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": "JesteÅ› ekspertem medycznym. Odpowiadaj krÃ³tko i precyzyjnie po polsku."},
-                    {"role": "user", "content": prompt}
-                ],
+            response = create_chat_completion(
+                self.client,
+                model=EXPLANATION_MODEL,
+                messages=self._build_quick_explanation_messages(question, correct_answer),
                 temperature=0.2,
                 max_tokens=200,
-                timeout=15
+                timeout=15,
+                deadline=time.monotonic() + 15
             )
             
-            return response.choices[0].message.content.strip()
+            explanation = response.choices[0].message.content.strip()
+            store_llm_output(cache_key, "quick_explanation", explanation)
+            return explanation
             
         except Exception as e:
             print(f"Error in quick explanation generation: {str(e)}")
-            return f"**PrawidÅ‚owa odpowiedÅº:** {correct_answer}\n\n**WyjaÅ›nienie:** Wymaga dalszej analizy medycznej."
+            return self._generate_quick_fallback(correct_answer)
+
+    async def generate_quick_explanation_async(self, question: str, correct_answer: str) -> str:
+        """
+        Async variant of generate_quick_explanation
+        """
+        cache_key = self._quick_explanation_cache_key(question, correct_answer)
+        found, cached = get_cached_llm_output(cache_key)
+        if found:
+            return cached
+        
+        try:
+            response = await create_chat_completion_async(
+                self.async_client,
+                model=EXPLANATION_MODEL,
+                messages=self._build_quick_explanation_messages(question, correct_answer),
+                temperature=0.2,
+                max_tokens=200,
+                timeout=15,
+                deadline=time.monotonic() + 15
+            )
+            
+            explanation = response.choices[0].message.content.strip()
+            store_llm_output(cache_key, "quick_explanation", explanation)
+            return explanation
+            
+        except Exception as e:
+            print(f"Error in async quick explanation generation: {str(e)}")
+            return self._generate_quick_fallback(correct_answer)
+
+    def _quick_explanation_cache_key(self, question: str, correct_answer: str) -> str:
+        """
+        LLM cache key for a quick explanation request
+        """
+        return llm_cache_key(
+            "quick_explanation", EXPLANATION_MODEL, QUICK_EXPLANATION_PROMPT_VERSION,
+            {"question": question, "correct_answer": correct_answer}, 0.2
+        )
+
+    def _build_quick_explanation_messages(self, question: str, correct_answer: str) -> List[Dict]:
+        """
+        Build the chat messages for generate_quick_explanation
+        """
+        prompt = f"""
+        Podaj krÃ³tkie (50-100 sÅ‚Ã³w) wyjaÅ›nienie medyczne:
+        
+        Pytanie: {question}
+        PrawidÅ‚owa odpowiedÅº: {correct_answer}
+        
+        WyjaÅ›nij tylko dlaczego ta odpowiedÅº jest prawidÅ‚owa. JÄ™zyk polski, terminologia medyczna.
+        """
+
+        return [
+            {"role": "system", "content": "JesteÅ› ekspertem medycznym. Odpowiadaj krÃ³tko i precyzyjnie po polsku."},
+            {"role": "user", "content": prompt}
+        ]
+
+    def _generate_quick_fallback(self, correct_answer: str) -> str:
+        """
+        Short placeholder used when a quick explanation cannot be generated
+        """
+        return f"**PrawidÅ‚owa odpowiedÅº:** {correct_answer}\n\n**WyjaÅ›nienie:** Wymaga dalszej analizy medycznej."
 
     def test_api_connection(self) -> bool:
         """
         Test if OpenAI API is working
+        Goes through the shared rate limiter like every other request
         """
         try:
-            response = self.client.chat.completions.create(
-                model="gpt-4o-mini",
+            response = create_chat_completion(
+                self.client,
+                model=EXPLANATION_MODEL,
                 messages=[{"role": "user", "content": "Test"}],
                 max_tokens=10,
-                timeout=10
+                timeout=10,
+                deadline=time.monotonic() + 10
             )
             return True
         except Exception as e:
@@ -199,12 +397,28 @@ def create_explainer(api_key: str = None) -> Optional[GenericBoardStyleMedicalEx
         print(f"Failed to create explainer: {e}")
         return None
 
+# Explainers kept for warm invocations, one per API key
+shared_explainers: Dict[Optional[str], GenericBoardStyleMedicalExplainer] = {}
+shared_explainers_lock = threading.Lock()
+
+def get_shared_explainer(api_key: str = None) -> Optional[GenericBoardStyleMedicalExplainer]:
+    """
+    Get a process-wide explainer, creating it on first use
+    """
+    with shared_explainers_lock:
+        explainer = shared_explainers.get(api_key)
+        if explainer is None:
+            explainer = create_explainer(api_key)
+            if explainer:
+                shared_explainers[api_key] = explainer
+        return explainer
+
 def get_explanation_for_question(question: str, options: List[str], correct_answer: str, api_key: str = None) -> str:
     """
     Standalone function to get explanation for a question
     Useful for serverless functions that don't want to manage class instances
     """
-    explainer = create_explainer(api_key)
+    explainer = get_shared_explainer(api_key)
     if not explainer:
         return "Nie można wygenerować wyjaśnienia - problem z konfiguracją OpenAI API"
     
@@ -0,0 +1,251 @@
+import os
+import json
+import time
+import threading
+from collections import OrderedDict
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+class LRUTTLCache:
+    """In-process LRU cache whose entries expire after a time-to-live"""
+
+    def __init__(self, max_entries=512, ttl=300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return (found, value); expired entries count as not found"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False, None
+
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return False, None
+
+            self._entries.move_to_end(key)
+            return True, value
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def delete_prefix(self, prefix):
+        with self._lock:
+            for key in [key for key in self._entries if key.startswith(prefix)]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+class RedisCacheBackend:
+    """
+    Shared cache backend on a Redis-compatible server.
+    Values are stored as JSON, so anything that is not JSON native
+    (dates, decimals) comes back as a string
+    """
+
+    def __init__(self, client, prefix="medfellow:"):
+        self.client = client
+        self.prefix = prefix
+
+    @classmethod
+    def from_url(cls, url, prefix="medfellow:"):
+        if redis is None:
+            raise ImportError("The redis package is required for the Redis cache backend")
+        return cls(redis.Redis.from_url(url), prefix)
+
+    def get(self, key):
+        raw = self.client.get(self.prefix + key)
+        if raw is None:
+            return False, None
+        return True, json.loads(raw)
+
+    def set(self, key, value, ttl=None):
+        payload = json.dumps(value, default=str)
+        if ttl:
+            self.client.set(self.prefix + key, payload, ex=max(1, int(ttl)))
+        else:
+            self.client.set(self.prefix + key, payload)
+
+    def add(self, key, value, ttl=None):
+        """Atomic set-if-absent (SET NX); returns True when it was set"""
+        payload = json.dumps(value, default=str)
+        return bool(self.client.set(self.prefix + key, payload, nx=True, ex=max(1, int(ttl)) if ttl else None))
+
+    def delete(self, key):
+        self.client.delete(self.prefix + key)
+
+    def delete_prefix(self, prefix):
+        keys = list(self.client.scan_iter(match=self.prefix + prefix + "*"))
+        if keys:
+            self.client.delete(*keys)
+
+    def clear(self):
+        self.delete_prefix("")
+
+class ReadThroughCache:
+    """
+    Read-through cache: the in-process LRU first, then the optional shared
+    backend, then the loader. Loaded values are written back to both tiers
+    """
+
+    def __init__(self, local=None, backend=None, ttl=300):
+        self.local = local or LRUTTLCache(ttl=ttl)
+        self.backend = backend
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._stats = {
+            "hits": 0,
+            "backend_hits": 0,
+            "misses": 0,
+            "backend_errors": 0,
+            "invalidations": 0
+        }
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def get_or_load(self, key, loader, should_cache=None):
+        """Return the cached value for key, calling loader() on a miss"""
+        found, value = self.local.get(key)
+        if found:
+            self._count("hits")
+            return value
+
+        if self.backend is not None:
+            try:
+                found, value = self.backend.get(key)
+            except Exception as e:
+                print(f"Cache backend read failed: {e}")
+                self._count("backend_errors")
+                found = False
+            if found:
+                self._count("backend_hits")
+                self.local.set(key, value, self.ttl)
+                return value
+
+        self._count("misses")
+        value = loader()
+
+        if should_cache is None or should_cache(value):
+            self.local.set(key, value, self.ttl)
+            if self.backend is not None:
+                try:
+                    self.backend.set(key, value, self.ttl)
+                except Exception as e:
+                    print(f"Cache backend write failed: {e}")
+                    self._count("backend_errors")
+
+        return value
+
+    def invalidate(self, key):
+        """Drop one key from every tier"""
+        self._count("invalidations")
+        self.local.delete(key)
+        if self.backend is not None:
+            try:
+                self.backend.delete(key)
+            except Exception as e:
+                print(f"Cache backend delete failed: {e}")
+                self._count("backend_errors")
+
+    def invalidate_prefix(self, prefix):
+        """Drop every key starting with prefix from every tier"""
+        self._count("invalidations")
+        self.local.delete_prefix(prefix)
+        if self.backend is not None:
+            try:
+                self.backend.delete_prefix(prefix)
+            except Exception as e:
+                print(f"Cache backend delete failed: {e}")
+                self._count("backend_errors")
+
+    def stats(self):
+        """Hit/miss counters for health checks and monitoring"""
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats["hits"] + stats["backend_hits"] + stats["misses"]
+        stats["entries"] = len(self.local)
+        stats["hit_rate"] = round((stats["hits"] + stats["backend_hits"]) / lookups, 4) if lookups else 0.0
+        stats["backend"] = type(self.backend).__name__ if self.backend is not None else None
+        return stats
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls for the same key into one execution.
+    The first caller runs the function; callers arriving while it runs wait
+    and receive the same result (or exception) instead of repeating the work
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self._stats = {"executions": 0, "coalesced": 0}
+
+    def do(self, key, fn):
+        """Return (value, shared) where shared is True for callers that waited on another's call"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = {"done": threading.Event(), "value": None, "error": None}
+                self._calls[key] = call
+                self._stats["executions"] += 1
+            else:
+                self._stats["coalesced"] += 1
+
+        if not leader:
+            call["done"].wait()
+            if call["error"] is not None:
+                raise call["error"]
+            return call["value"], True
+
+        try:
+            call["value"] = fn()
+        except Exception as e:
+            call["error"] = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call["done"].set()
+        return call["value"], False
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["in_flight"] = len(self._calls)
+        return stats
+
+def create_cache_backend():
+    """Build the shared backend from CACHE_REDIS_URL, or None to stay in-process"""
+    url = os.getenv("CACHE_REDIS_URL")
+    if not url:
+        return None
+
+    try:
+        return RedisCacheBackend.from_url(url, prefix=os.getenv("CACHE_KEY_PREFIX", "medfellow:"))
+    except Exception as e:
+        print(f"Cache backend unavailable, using in-process cache only: {e}")
+        return None
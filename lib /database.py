@@ -1,9 +1,196 @@
 import os
+import time
 import pymysql
 import threading
+import warnings
 from contextlib import contextmanager
 
-# Thread-local storage for database connections
+from .cache import LRUTTLCache, ReadThroughCache, create_cache_backend
+from .queries import (
+    build_missing_counts_by_topic_query,
+    build_topic_missing_count_query,
+    build_topic_questions_query
+)
+
+class PoolTimeoutError(Exception):
+    """Raised when no pooled connection becomes available in time"""
+
+class ConnectionPool:
+    """
+    Bounded pool of MySQL connections.
+    The pool lives at module level, so a warm serverless instance reuses its
+    connections across invocations instead of paying the TCP + TLS + auth
+    handshake on every query
+    """
+
+    def __init__(self, config, max_size=4, idle_timeout=300, health_check_after=30, acquire_timeout=10):
+        self.config = config
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.health_check_after = health_check_after
+        self.acquire_timeout = acquire_timeout
+
+        # Idle connections as (connection, last_used), most recently used last
+        self._idle = []
+        # Connections currently open, idle or borrowed
+        self._size = 0
+        self._condition = threading.Condition()
+        self._stats = {
+            "acquired": 0,
+            "hits": 0,
+            "created": 0,
+            "waits": 0,
+            "wait_time_total": 0.0,
+            "wait_time_max": 0.0,
+            "timeouts": 0,
+            "evicted_idle": 0,
+            "health_check_failures": 0,
+            "discarded": 0
+        }
+
+    def _evict_idle_locked(self, now):
+        """Close connections idle longer than idle_timeout (caller holds the lock)"""
+        keep = []
+        for connection, last_used in self._idle:
+            if now - last_used > self.idle_timeout:
+                self._close_quietly(connection)
+                self._size -= 1
+                self._stats["evicted_idle"] += 1
+            else:
+                keep.append((connection, last_used))
+        self._idle = keep
+
+    @staticmethod
+    def _close_quietly(connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def _is_healthy(self, connection, last_used):
+        """Ping connections that sat idle long enough for the server to drop them"""
+        if time.monotonic() - last_used < self.health_check_after:
+            return connection.open
+        try:
+            connection.ping(reconnect=False)
+            return True
+        except Exception:
+            return False
+
+    def acquire(self, timeout=None):
+        """Borrow a connection, waiting up to `timeout` seconds when the pool is exhausted"""
+        timeout = self.acquire_timeout if timeout is None else timeout
+        started = time.monotonic()
+        waited = False
+
+        while True:
+            connection = None
+            last_used = None
+            with self._condition:
+                self._evict_idle_locked(time.monotonic())
+
+                while not self._idle and self._size >= self.max_size:
+                    remaining = timeout - (time.monotonic() - started)
+                    if remaining <= 0:
+                        self._stats["timeouts"] += 1
+                        raise PoolTimeoutError(f"No database connection available after {timeout}s")
+                    waited = True
+                    self._condition.wait(remaining)
+
+                if self._idle:
+                    connection, last_used = self._idle.pop()
+                else:
+                    # Reserve a slot before connecting outside the lock
+                    self._size += 1
+
+            if connection is not None:
+                if self._is_healthy(connection, last_used):
+                    self._record_acquire(started, waited, hit=True)
+                    return connection
+
+                # Stale connection: drop it and try again
+                self._close_quietly(connection)
+                with self._condition:
+                    self._size -= 1
+                    self._stats["health_check_failures"] += 1
+                    self._condition.notify()
+                continue
+
+            try:
+                connection = pymysql.connect(**self.config)
+            except Exception:
+                with self._condition:
+                    self._size -= 1
+                    self._condition.notify()
+                raise
+
+            self._record_acquire(started, waited, hit=False)
+            return connection
+
+    def _record_acquire(self, started, waited, hit):
+        elapsed = time.monotonic() - started
+        with self._condition:
+            self._stats["acquired"] += 1
+            self._stats["hits" if hit else "created"] += 1
+            if waited:
+                self._stats["waits"] += 1
+                self._stats["wait_time_total"] += elapsed
+                self._stats["wait_time_max"] = max(self._stats["wait_time_max"], elapsed)
+
+    def release(self, connection, discard=False):
+        """Return a borrowed connection; broken or dirty connections should be discarded"""
+        with self._condition:
+            if discard or not connection.open:
+                self._close_quietly(connection)
+                self._size -= 1
+                self._stats["discarded"] += 1
+            else:
+                self._idle.append((connection, time.monotonic()))
+            self._condition.notify()
+
+    @contextmanager
+    def connection(self, timeout=None):
+        """Borrow a connection for the duration of a with-block"""
+        connection = self.acquire(timeout)
+        discard = False
+        try:
+            yield connection
+        except (pymysql.err.OperationalError, pymysql.err.InterfaceError):
+            discard = True
+            raise
+        finally:
+            self.release(connection, discard=discard)
+
+    def close_all(self):
+        """Close every idle connection; borrowed ones return to the pool as usual"""
+        with self._condition:
+            for connection, _ in self._idle:
+                self._close_quietly(connection)
+            self._size -= len(self._idle)
+            self._idle = []
+            self._condition.notify_all()
+
+    def stats(self):
+        """Pool usage counters for health checks and monitoring"""
+        with self._condition:
+            stats = dict(self._stats)
+            stats.update({
+                "max_size": self.max_size,
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": self._size - len(self._idle)
+            })
+        acquired = stats["acquired"]
+        stats["hit_rate"] = round(stats["hits"] / acquired, 4) if acquired else 0.0
+        stats["wait_time_total"] = round(stats["wait_time_total"], 4)
+        stats["wait_time_max"] = round(stats["wait_time_max"], 4)
+        return stats
+
+# Process-wide pool, created on first use and kept for warm invocations
+db_pool = None
+db_pool_lock = threading.Lock()
+
+# Per-thread connections handed out by the deprecated get_db_connection()
 thread_local = threading.local()
 
 def get_db_config():
@@ -19,54 +206,156 @@ def get_db_config():
         'connect_timeout': 30
     }
 
+def get_db_pool():
+    """Get the shared connection pool, creating it on first use"""
+    global db_pool
+
+    if db_pool is not None:
+        return db_pool
+
+    config = get_db_config()
+    if not all([config['host'], config['user'], config['password'], config['database']]):
+        print("Missing required database environment variables")
+        return None
+
+    with db_pool_lock:
+        if db_pool is None:
+            db_pool = ConnectionPool(
+                config,
+                max_size=int(os.getenv("MYSQL_POOL_SIZE", "4")),
+                idle_timeout=float(os.getenv("MYSQL_POOL_IDLE_TIMEOUT", "300")),
+                health_check_after=float(os.getenv("MYSQL_POOL_HEALTH_CHECK_AFTER", "30")),
+                acquire_timeout=float(os.getenv("MYSQL_POOL_ACQUIRE_TIMEOUT", "10"))
+            )
+    return db_pool
+
 def get_db_connection():
-    """Get a database connection for the current thread"""
-    # Check if all required environment variables are set
+    """
+    Get a database connection for the current thread (deprecated)
+    Kept with its original contract for existing callers: the connection
+    belongs to the thread, is never released and is not taken from the pool.
+    New code should use pooled_db_connection()
+    """
+    warnings.warn("get_db_connection() is deprecated, use pooled_db_connection()", DeprecationWarning, stacklevel=2)
     config = get_db_config()
     if not all([config['host'], config['user'], config['password'], config['database']]):
         print("Missing required database environment variables")
         return None
-    
+
     try:
-        # Use thread-local storage for connections
-        if not hasattr(thread_local, 'connection') or thread_local.connection is None:
+        if getattr(thread_local, 'connection', None) is None:
             thread_local.connection = pymysql.connect(**config)
-        
-        # Check if connection is still alive
         thread_local.connection.ping(reconnect=True)
         return thread_local.connection
-        
     except Exception as e:
         print(f"Database connection failed: {e}")
-        # Try to create a new connection
         try:
             thread_local.connection = pymysql.connect(**config)
             return thread_local.connection
         except Exception as e2:
             print(f"Failed to create new database connection: {e2}")
+            thread_local.connection = None
             return None
 
+def acquire_db_connection():
+    """
+    Borrow a database connection from the pool, or None when none is available.
+    Every borrowed connection must go back through release_db_connection();
+    pooled_db_connection() does that for a with-block
+    """
+    pool = get_db_pool()
+    if not pool:
+        return None
+
+    try:
+        return pool.acquire()
+    except Exception as e:
+        print(f"Database connection failed: {e}")
+        return None
+
+def release_db_connection(connection, discard=False):
+    """Return a connection obtained from acquire_db_connection() to the pool"""
+    if connection and db_pool:
+        db_pool.release(connection, discard=discard)
+
 @contextmanager
-def get_db_cursor():
-    """Context manager for database operations"""
-    connection = get_db_connection()
+def pooled_db_connection():
+    """
+    with pooled_db_connection() as connection: ... borrows a pooled connection
+    (None when the database is unavailable) and always returns it; one broken
+    by a connection error is discarded
+    """
+    connection = acquire_db_connection()
+    discard = False
+    try:
+        yield connection
+    except (pymysql.err.OperationalError, pymysql.err.InterfaceError):
+        discard = True
+        raise
+    finally:
+        release_db_connection(connection, discard=discard)
+
+@contextmanager
+def get_db_cursor(cursor_class=pymysql.cursors.DictCursor):
+    """Context manager for database operations on a pooled connection"""
+    connection = acquire_db_connection()
     if not connection:
         yield None
         return
         
     cursor = None
+    discard = False
     try:
-        cursor = connection.cursor(pymysql.cursors.DictCursor)
+        cursor = connection.cursor(cursor_class)
         yield cursor
         connection.commit()
     except Exception as e:
-        if connection:
+        try:
             connection.rollback()
+        except Exception:
+            # The connection is unusable, keep it out of the pool
+            discard = True
         print(f"Database operation failed: {e}")
         raise e
     finally:
         if cursor:
-            cursor.close()
+            try:
+                cursor.close()
+            except Exception:
+                discard = True
+        release_db_connection(connection, discard=discard)
+
+@contextmanager
+def get_db_transaction(cursor_class=pymysql.cursors.DictCursor):
+    """
+    Run a with-block as one transaction on a pooled connection.
+    Pooled connections autocommit, so the transaction is opened explicitly;
+    it commits when the block exits and rolls back on any exception
+    """
+    connection = acquire_db_connection()
+    if not connection:
+        raise RuntimeError("Database connection failed")
+
+    cursor = None
+    discard = False
+    try:
+        connection.begin()
+        cursor = connection.cursor(cursor_class)
+        yield cursor
+        connection.commit()
+    except Exception:
+        try:
+            connection.rollback()
+        except Exception:
+            discard = True
+        raise
+    finally:
+        if cursor:
+            try:
+                cursor.close()
+            except Exception:
+                discard = True
+        release_db_connection(connection, discard=discard)
 
 def execute_query(query, params=None):
     """Execute database query and return results in standardized format"""
@@ -92,13 +381,9 @@ def execute_query(query, params=None):
 def test_db_connection():
     """Test database connectivity and return status"""
     try:
-        connection = get_db_connection()
-        if not connection:
-            return False, "Failed to establish connection"
-        
         with get_db_cursor() as cursor:
             if not cursor:
-                return False, "Failed to create cursor"
+                return False, "Failed to establish connection"
             
             cursor.execute("SELECT 1 as test")
             result = cursor.fetchone()
@@ -123,7 +408,8 @@ def get_database_info():
             "port": config.get('port', 'not set'),
             "user": config.get('user', 'not set'),
             "connected": connection_status,
-            "message": message
+            "message": message,
+            "pool": db_pool.stats() if db_pool else None
         }
     except Exception as e:
         return {
@@ -132,91 +418,178 @@ def get_database_info():
         }
 
 def close_db_connection():
-    """Close the current thread's database connection"""
+    """Close the current thread's get_db_connection() connection and the idle pooled ones"""
     try:
-        if hasattr(thread_local, 'connection') and thread_local.connection:
+        if getattr(thread_local, 'connection', None):
             thread_local.connection.close()
             thread_local.connection = None
+        if db_pool:
+            db_pool.close_all()
     except Exception as e:
-        print(f"Error closing database connection: {e}")
+        print(f"Error closing database connections: {e}")
+
+# The category -> subject -> topic hierarchy is the same for every student
+# and rarely changes, so lookups go through a read-through cache.
+# Call the invalidate_* hooks after writing to subject or topics
+HIERARCHY_CACHE_TTL = float(os.getenv("HIERARCHY_CACHE_TTL", "300"))
+hierarchy_cache = ReadThroughCache(
+    LRUTTLCache(max_entries=int(os.getenv("HIERARCHY_CACHE_SIZE", "512")), ttl=HIERARCHY_CACHE_TTL),
+    backend=create_cache_backend(),
+    ttl=HIERARCHY_CACHE_TTL
+)
+
+def set_hierarchy_cache_backend(backend):
+    """Plug in a shared cache backend (anything with get/set/delete/delete_prefix)"""
+    hierarchy_cache.backend = backend
+
+def invalidate_subjects_cache(category_id=None):
+    """Forget cached subjects for one category, or for every category"""
+    if category_id is None:
+        hierarchy_cache.invalidate_prefix("subjects:")
+    else:
+        hierarchy_cache.invalidate(f"subjects:{category_id}")
+
+def invalidate_topics_cache(subject_id=None):
+    """Forget cached topics for one subject, or for every subject"""
+    if subject_id is None:
+        hierarchy_cache.invalidate_prefix("topics:")
+    else:
+        hierarchy_cache.invalidate(f"topics:{subject_id}")
+
+def invalidate_hierarchy_cache():
+    """Forget every cached subject and topic list"""
+    invalidate_subjects_cache()
+    invalidate_topics_cache()
+
+def is_cacheable_result(result):
+    """Only successful query results are cached"""
+    return "error" not in result
 
 # Utility functions for common database operations
-def get_subjects_by_category(category_id):
+def get_subjects_by_category(category_id, use_cache=True):
     """Get all subjects for a given category"""
     query = "SELECT * FROM subject WHERE categoryId = %s"
-    return execute_query(query, (category_id,))
+    if not use_cache:
+        return execute_query(query, (category_id,))
 
-def get_topics_by_subject(subject_id):
+    return hierarchy_cache.get_or_load(
+        f"subjects:{category_id}",
+        lambda: execute_query(query, (category_id,)),
+        should_cache=is_cacheable_result
+    )
+
+def get_topics_by_subject(subject_id, use_cache=True):
     """Get all topics for a given subject"""
     query = "SELECT * FROM topics WHERE subjectId = %s"
-    return execute_query(query, (subject_id,))
+    if not use_cache:
+        return execute_query(query, (subject_id,))
 
-def get_questions_by_topic(topic_id):
-    """Get all questions for a given topic"""
-    # First get question IDs linked to the topic
-    query_ids = "SELECT questionId FROM topicQueRel WHERE topicId = %s"
-    ids_result = execute_query(query_ids, (topic_id,))
-    
-    if ids_result.get("error") or not ids_result.get("data"):
-        return ids_result
-    
-    # Extract question IDs
-    question_ids = [row["questionId"] for row in ids_result["data"]]
-    
-    if not question_ids:
-        return {"data": []}
-    
-    # Get full question details
-    ids_placeholders = ",".join(["%s"] * len(question_ids))
-    query_questions = f"SELECT * FROM tblquestion WHERE questionId IN ({ids_placeholders})"
-    return execute_query(query_questions, question_ids)
+    return hierarchy_cache.get_or_load(
+        f"topics:{subject_id}",
+        lambda: execute_query(query, (subject_id,)),
+        should_cache=is_cacheable_result
+    )
+
+def get_questions_by_topic(topic_id, limit=None, after=None):
+    """
+    Get questions for a given topic.
+    With `limit`, returns one keyset page ordered by questionId plus the
+    `next_after` cursor to pass back for the following page
+    """
+    # Ask for one extra row to know whether another page exists
+    query, params = build_topic_questions_query(
+        topic_id, after=after, limit=limit + 1 if limit else None
+    )
+    result = execute_query(query, params)
+
+    if result.get("error") or not limit:
+        return result
+
+    rows = result["data"]
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    return {
+        "data": rows,
+        "has_more": has_more,
+        "next_after": rows[-1]["questionId"] if has_more else None
+    }
+
+def iter_questions_by_topic(topic_id, after=None, limit=None, batch_size=500):
+    """
+    Yield a topic's questions one row at a time from an unbuffered cursor.
+    Rows are read from the server in batches, so memory stays flat however
+    many questions the topic has. The pooled connection is held until the
+    result is exhausted, since an open unbuffered result blocks every other
+    query on it
+    """
+    pool = get_db_pool()
+    if not pool:
+        raise RuntimeError("Missing required database environment variables")
+
+    query, params = build_topic_questions_query(topic_id, after=after, limit=limit)
+    connection = pool.acquire()
+    cursor = None
+    exhausted = False
+    try:
+        cursor = connection.cursor(pymysql.cursors.SSDictCursor)
+        cursor.execute(query, params)
+
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            for row in rows:
+                yield row
+
+        exhausted = True
+    finally:
+        if exhausted:
+            cursor.close()
+        # An abandoned unbuffered result would have to be drained before the
+        # connection is reusable, so drop the connection instead
+        pool.release(connection, discard=not exhausted)
 
 def get_question_count_by_topic(category_id, subject_name, topic_name):
     """Get count of questions needing descriptions for a specific topic"""
     try:
-        # Get subject ID
-        subject_result = execute_query(
-            "SELECT id FROM subject WHERE categoryId = %s AND subjectName = %s",
-            (category_id, subject_name)
+        # Subject, topic and count are resolved in one JOINed aggregate
+        result = execute_query(
+            build_topic_missing_count_query(),
+            (topic_name, category_id, subject_name)
         )
         
-        if not subject_result.get("data"):
-            return {"count": 0, "error": "Subject not found"}
-        
-        subject_id = subject_result["data"][0]["id"]
+        if result.get("error"):
+            return {"count": 0, "error": result["error"]}
         
-        # Get topic ID
-        topic_result = execute_query(
-            "SELECT id FROM topics WHERE subjectId = %s AND topicName = %s",
-            (subject_id, topic_name)
-        )
+        if not result.get("data"):
+            return {"count": 0, "error": "Subject not found"}
         
-        if not topic_result.get("data"):
+        row = result["data"][0]
+        if row["topicId"] is None:
             return {"count": 0, "error": "Topic not found"}
         
-        topic_id = topic_result["data"][0]["id"]
-        
-        # Get question IDs for this topic
-        ids_result = execute_query(
-            "SELECT questionId FROM topicQueRel WHERE topicId = %s",
-            (topic_id,)
-        )
-        
-        if not ids_result.get("data"):
-            return {"count": 0}
-        
-        question_ids = [str(row["questionId"]) for row in ids_result["data"]]
-        
-        # Count questions with NULL description
-        ids_placeholders = ",".join(["%s"] * len(question_ids))
-        count_query = f"SELECT COUNT(*) AS count FROM tblquestion WHERE questionId IN ({ids_placeholders}) AND (description IS NULL OR TRIM(description) = '')"
-        
-        count_result = execute_query(count_query, question_ids)
-        
-        if count_result.get("data"):
-            return {"count": count_result["data"][0]["count"]}
-        else:
-            return {"count": 0, "error": count_result.get("error", "Unknown error")}
+        return {"count": row["count"]}
             
     except Exception as e:
         return {"count": 0, "error": str(e)}
+
+def get_missing_description_counts(category_id=None, subject_id=None):
+    """
+    Count questions needing descriptions for every topic of a subject (or of
+    a whole category) with a single GROUP BY query.
+    Returns {"data": [{categoryId, subjectId, subjectName, topicId, topicName, count}], "total"}
+    """
+    try:
+        query, params = build_missing_counts_by_topic_query(category_id=category_id, subject_id=subject_id)
+    except ValueError as e:
+        return {"error": str(e)}
+    
+    result = execute_query(query, params)
+    if result.get("error"):
+        return result
+    
+    return {
+        "data": result["data"],
+        "total": sum(row["count"] for row in result["data"])
+    }
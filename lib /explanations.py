@@ -0,0 +1,161 @@
+import os
+import hmac
+import time
+
+from .board_explainer import get_shared_explainer
+from .cache import SingleFlight, create_cache_backend
+from .database import execute_query
+from .question_bank import row_to_mcq
+from .question_store import update_descriptions
+from .queries import build_question_by_id_query, get_question_column_map
+
+# Explanations are generated at most once per question: stored descriptions
+# are served straight from tblquestion, and concurrent misses for the same
+# question share one generation. SingleFlight only covers one process: with
+# CACHE_REDIS_URL set, a short-lived lock extends this across instances
+# (others wait for the stored result); without it, instances that miss at
+# the same time each generate, and the first write wins since only empty
+# descriptions are filled. Replacing a stored description (regenerate) is
+# reserved for callers holding EXPLANATION_ADMIN_TOKEN
+
+EXPLANATION_LOCK_TTL = int(os.getenv("EXPLANATION_LOCK_TTL", "60"))
+EXPLANATION_WAIT_TIMEOUT = float(os.getenv("EXPLANATION_WAIT_TIMEOUT", "30"))
+EXPLANATION_POLL_INTERVAL = 0.5
+
+# get_question_explanation(generate=False) error when nothing is stored yet
+EXPLANATION_MISSING = "Explanation not generated yet"
+
+def is_explanation_admin(token):
+    """True when token matches EXPLANATION_ADMIN_TOKEN (never when that is unset)"""
+    admin_token = os.getenv("EXPLANATION_ADMIN_TOKEN")
+    return bool(admin_token and token) and hmac.compare_digest(str(token), admin_token)
+
+explanation_flights = SingleFlight()
+explanation_lock_backend = create_cache_backend()
+
+def fetch_question(question_id):
+    """Return (row, error) for one question with the fields needed to explain it"""
+    try:
+        column_map = get_question_column_map()
+    except ValueError as e:
+        return None, str(e)
+    columns = ["questionId"] + [column_map[field] for field in ("question", "A", "B", "C", "D", "answer", "explanation")]
+    result = execute_query(build_question_by_id_query(columns), (question_id,))
+
+    if result.get("error"):
+        return None, result["error"]
+    if not result.get("data"):
+        return None, "Question not found"
+    return result["data"][0], None
+
+def stored_explanation(row):
+    """The stored description, or None when it is empty"""
+    description = row.get(get_question_column_map()["explanation"])
+    if description and str(description).strip():
+        return description
+    return None
+
+def wait_for_stored_explanation(question_id, previous=None):
+    """
+    Poll tblquestion while another instance generates the explanation,
+    until a description other than `previous` is stored
+    """
+    deadline = time.monotonic() + EXPLANATION_WAIT_TIMEOUT
+    while time.monotonic() < deadline:
+        time.sleep(EXPLANATION_POLL_INTERVAL)
+        row, error = fetch_question(question_id)
+        explanation = stored_explanation(row) if row else None
+        if explanation and explanation != previous:
+            return explanation
+    return None
+
+def generate_and_store_explanation(question_id, api_key=None, regenerate=False):
+    """
+    Generate an explanation for a question and save it as its description.
+    The row is read again first: a request that missed just before another
+    one stored its result should not generate a second time. Only an empty
+    description is written, unless regenerate, which replaces the stored one
+    and bypasses the LLM output cache (callers must check is_explanation_admin)
+    """
+    row, error = fetch_question(question_id)
+    if error:
+        raise RuntimeError(error)
+    previous = stored_explanation(row)
+    if previous and not regenerate:
+        return {"explanation": previous, "source": "stored"}
+
+    lock_key = f"lock:explanation:{question_id}"
+    owns_lock = False
+
+    if explanation_lock_backend is not None:
+        try:
+            owns_lock = explanation_lock_backend.add(lock_key, os.getpid(), EXPLANATION_LOCK_TTL)
+            locked_elsewhere = not owns_lock
+        except Exception as e:
+            print(f"Explanation lock unavailable: {e}")
+            locked_elsewhere = False
+
+        if locked_elsewhere:
+            explanation = wait_for_stored_explanation(question_id, previous)
+            if explanation:
+                return {"explanation": explanation, "source": "stored"}
+            print(f"Timed out waiting for explanation of question {question_id}, generating it here")
+
+    try:
+        explainer = get_shared_explainer(api_key)
+        if not explainer:
+            raise RuntimeError("OpenAI API is not configured")
+
+        mcq = row_to_mcq(row)
+        options = [mcq["options"][letter] for letter in ("A", "B", "C", "D")]
+        explanation = explainer._request_simple_explanation(mcq["question"], options, mcq["answer"], refresh=regenerate)
+
+        report = update_descriptions([(question_id, explanation)], only_missing=not regenerate)
+        if report.get("error"):
+            print(f"Failed to store explanation for question {question_id}: {report['error']}")
+        elif not report["updated"] and not regenerate:
+            # Another instance filled the description first; serve what is stored
+            row, error = fetch_question(question_id)
+            if row and stored_explanation(row):
+                return {"explanation": stored_explanation(row), "source": "stored"}
+
+        return {"explanation": explanation, "source": "generated", "stored": bool(report.get("updated"))}
+    finally:
+        if owns_lock:
+            try:
+                explanation_lock_backend.delete(lock_key)
+            except Exception as e:
+                print(f"Explanation lock release failed: {e}")
+
+def get_question_explanation(question_id, regenerate=False, generate=True, api_key=None):
+    """
+    Explanation for one question: the stored description when there is one,
+    otherwise a generated one (saved back to tblquestion). generate=False
+    only reads, returning {"error": EXPLANATION_MISSING} when nothing is stored.
+    Concurrent requests for the same question in this process, regenerations
+    included, share a single generation (across instances only with the
+    Redis lock, see above). regenerate overwrites a curated description:
+    check is_explanation_admin before passing it.
+    Returns {"questionId", "explanation", "source", "coalesced"} or {"error"}
+    """
+    row, error = fetch_question(question_id)
+    if error:
+        return {"error": error}
+
+    if not regenerate:
+        explanation = stored_explanation(row)
+        if explanation:
+            return {"questionId": question_id, "explanation": explanation, "source": "stored", "coalesced": False}
+    if not generate:
+        return {"error": EXPLANATION_MISSING}
+
+    try:
+        value, shared = explanation_flights.do(
+            f"explanation:{question_id}",
+            lambda: generate_and_store_explanation(question_id, api_key, regenerate=regenerate)
+        )
+    except Exception as e:
+        print(f"Explanation generation failed for question {question_id}: {e}")
+        return {"error": "Explanation generation failed"}
+
+    return dict(value, questionId=question_id, coalesced=shared)
@@ -0,0 +1,163 @@
+import os
+import re
+import csv
+import time
+import itertools
+
+try:
+    import xlsxwriter
+except ImportError:
+    xlsxwriter = None
+
+try:
+    from openpyxl import Workbook
+except ImportError:
+    Workbook = None
+
+try:
+    import pyarrow
+    import pyarrow.parquet as pyarrow_parquet
+except ImportError:
+    pyarrow = None
+
+# Streaming export of generated MCQs.
+# MCQ blocks are consumed as an iterator and flattened row by row straight
+# into the output file: xlsx through xlsxwriter's constant-memory mode (or
+# openpyxl's write-only mode), CSV through the csv module, and Parquet in
+# columnar record batches. Memory use does not grow with the export size.
+# Parquet is optional: pyarrow is not in requirements.txt (it would take up
+# most of the Vercel function size limit) and is installed with
+#   pip install -r requirements-parquet.txt
+
+MCQ_EXPORT_HEADERS = ["Temat", "Pytanie", "Opcja A", "Opcja B", "Opcja C", "Opcja D", "Poprawna OdpowiedÅº", "WyjaÅ›nienie"]
+
+EXPORT_FORMATS = ("xlsx", "csv", "parquet")
+PARQUET_BATCH_ROWS = 10000
+
+# Control characters openpyxl refuses in cells (xlsxwriter escapes them itself)
+XLSX_ILLEGAL_CHARACTERS = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+def iter_mcq_rows(mcq_blocks):
+    """Yield one tuple per question, in MCQ_EXPORT_HEADERS order"""
+    for mcq_block in mcq_blocks:
+        if not isinstance(mcq_block, dict):
+            continue
+
+        topic = mcq_block.get("topic") or mcq_block.get("temat", "")
+        for question_data in mcq_block.get("questions", []):
+            if not isinstance(question_data, dict):
+                continue
+
+            options = question_data.get("options", {})
+            yield (
+                topic,
+                question_data.get("question", ""),
+                options.get("A", ""),
+                options.get("B", ""),
+                options.get("C", ""),
+                options.get("D", ""),
+                question_data.get("answer", ""),
+                question_data.get("explanation", "")
+            )
+
+def _xlsx_value(value):
+    if isinstance(value, str):
+        return XLSX_ILLEGAL_CHARACTERS.sub("", value)
+    return value
+
+def write_mcqs_xlsx(mcq_blocks, output_path, sheet_name="Sheet1"):
+    """Stream MCQs to an xlsx file; returns the number of question rows"""
+    rows = 0
+    if xlsxwriter is not None:
+        workbook = xlsxwriter.Workbook(output_path, {"constant_memory": True, "strings_to_numbers": False,
+                                                     "strings_to_formulas": False, "strings_to_urls": False})
+        try:
+            worksheet = workbook.add_worksheet(sheet_name)
+            worksheet.write_row(0, 0, MCQ_EXPORT_HEADERS)
+            for row in iter_mcq_rows(mcq_blocks):
+                rows += 1
+                worksheet.write_row(rows, 0, row)
+        finally:
+            workbook.close()
+        return rows
+
+    if Workbook is None:
+        raise ImportError("xlsxwriter or openpyxl is required for xlsx export")
+
+    workbook = Workbook(write_only=True)
+    worksheet = workbook.create_sheet(sheet_name)
+    worksheet.append(MCQ_EXPORT_HEADERS)
+    for row in iter_mcq_rows(mcq_blocks):
+        worksheet.append([_xlsx_value(value) for value in row])
+        rows += 1
+    workbook.save(output_path)
+    return rows
+
+def write_mcqs_csv(mcq_blocks, output_path, encoding="utf-8-sig"):
+    """
+    Stream MCQs to a CSV file; returns the number of question rows
+    The default encoding writes a BOM so Excel opens Polish text correctly
+    """
+    rows = 0
+    with open(output_path, "w", newline="", encoding=encoding) as output:
+        writer = csv.writer(output)
+        writer.writerow(MCQ_EXPORT_HEADERS)
+        for row in iter_mcq_rows(mcq_blocks):
+            writer.writerow(row)
+            rows += 1
+    return rows
+
+def write_mcqs_parquet(mcq_blocks, output_path, batch_size=PARQUET_BATCH_ROWS):
+    """
+    Stream MCQs to a Parquet file in record batches; returns the number of question rows
+    Needs the optional pyarrow package (requirements-parquet.txt)
+    """
+    if pyarrow is None:
+        raise ImportError("Parquet export needs pyarrow, which is optional: pip install pyarrow "
+                          "(or pip install -r requirements-parquet.txt)")
+
+    schema = pyarrow.schema([(header, pyarrow.string()) for header in MCQ_EXPORT_HEADERS])
+    rows = 0
+    row_iter = iter_mcq_rows(mcq_blocks)
+    with pyarrow_parquet.ParquetWriter(output_path, schema) as writer:
+        # islice batches keep the export free of the DB layer (question_store imports pymysql)
+        for batch in iter(lambda: list(itertools.islice(row_iter, batch_size)), []):
+            columns = [
+                pyarrow.array([None if value is None else str(value) for value in column], type=pyarrow.string())
+                for column in zip(*batch)
+            ]
+            writer.write_batch(pyarrow.RecordBatch.from_arrays(columns, schema=schema))
+            rows += len(batch)
+        if not rows:
+            writer.write_table(schema.empty_table())
+    return rows
+
+EXPORT_WRITERS = {
+    "xlsx": write_mcqs_xlsx,
+    "csv": write_mcqs_csv,
+    "parquet": write_mcqs_parquet
+}
+
+def export_mcqs(mcq_blocks, output_path, export_format=None):
+    """
+    Export MCQ blocks (any iterable, e.g. a generator over a whole book)
+    export_format is "xlsx", "csv" or "parquet"; by default it follows the
+    file extension; "parquet" needs the optional pyarrow package.
+    Returns {"rows", "format", "path", "elapsed", "rows_per_sec"}
+    """
+    export_format = (export_format or os.path.splitext(output_path)[1].lstrip(".") or "xlsx").lower()
+    if export_format not in EXPORT_WRITERS:
+        raise ValueError(f"Unsupported export format: {export_format} (expected one of {', '.join(EXPORT_FORMATS)})")
+
+    started = time.monotonic()
+    rows = EXPORT_WRITERS[export_format](mcq_blocks, output_path)
+    elapsed = time.monotonic() - started
+    report = {
+        "rows": rows,
+        "format": export_format,
+        "path": output_path,
+        "elapsed": round(elapsed, 3),
+        "rows_per_sec": round(rows / elapsed, 1) if elapsed > 0 else 0.0
+    }
+    print(f"Exported {rows} MCQs to {output_path} ({export_format}) in {report['elapsed']}s ({report['rows_per_sec']} rows/s)")
+    return report
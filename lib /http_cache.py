@@ -0,0 +1,47 @@
+import os
+import hashlib
+from flask import jsonify, request
+
+# Browser cache lifetime, edge (CDN) lifetime and how long the edge may keep
+# serving a stale copy while it revalidates in the background, in seconds
+HTTP_CACHE_MAX_AGE = int(os.getenv("HTTP_CACHE_MAX_AGE", "60"))
+HTTP_CACHE_S_MAXAGE = int(os.getenv("HTTP_CACHE_S_MAXAGE", "300"))
+HTTP_CACHE_STALE_WHILE_REVALIDATE = int(os.getenv("HTTP_CACHE_STALE_WHILE_REVALIDATE", "60"))
+
+def compute_etag(body):
+    """Strong ETag from a hash of the serialized response body"""
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+    return hashlib.sha256(body).hexdigest()[:32]
+
+def build_cache_control(max_age=None, s_maxage=None, stale_while_revalidate=None):
+    """Cache-Control value letting browsers and the edge CDN reuse a response"""
+    max_age = HTTP_CACHE_MAX_AGE if max_age is None else max_age
+    s_maxage = HTTP_CACHE_S_MAXAGE if s_maxage is None else s_maxage
+    stale_while_revalidate = (
+        HTTP_CACHE_STALE_WHILE_REVALIDATE if stale_while_revalidate is None else stale_while_revalidate
+    )
+
+    directives = ["public", f"max-age={max_age}", f"s-maxage={s_maxage}"]
+    if stale_while_revalidate:
+        directives.append(f"stale-while-revalidate={stale_while_revalidate}")
+    return ", ".join(directives)
+
+def cached_json_response(payload, status=200, max_age=None, s_maxage=None, stale_while_revalidate=None):
+    """
+    JSON response carrying an ETag.
+    GET/HEAD requests also get Cache-Control, and a matching If-None-Match
+    is answered with an empty 304. POST responses are never stored by
+    HTTP caches, so they only carry the ETag
+    """
+    response = jsonify(payload)
+    response.status_code = status
+    etag = compute_etag(response.get_data())
+
+    if request.method in ("GET", "HEAD"):
+        if status == 200 and request.if_none_match.contains_weak(etag):
+            response = response.__class__(status=304)
+        response.headers["Cache-Control"] = build_cache_control(max_age, s_maxage, stale_while_revalidate)
+
+    response.set_etag(etag)
+    return response
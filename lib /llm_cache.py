@@ -0,0 +1,197 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import tempfile
+import threading
+
+class LLMCache:
+    """
+    Persistent cache of LLM outputs, stored in SQLite.
+    Entries are content addressed: the key is a hash of the model, prompt
+    template version, normalized input and temperature, so identical work
+    (re-uploaded PDFs, retried batches, duplicate questions) is answered
+    locally. The least recently used entries are evicted once the cache
+    grows past max_entries or max_bytes
+    """
+
+    def __init__(self, path, max_entries=50000, max_bytes=200 * 1024 * 1024):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0, "errors": 0}
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            "key TEXT PRIMARY KEY, kind TEXT NOT NULL, value TEXT NOT NULL, size INTEGER NOT NULL, "
+            "created_at REAL NOT NULL, last_access REAL NOT NULL, hits INTEGER NOT NULL DEFAULT 0)"
+        )
+        self._connection.execute("CREATE INDEX IF NOT EXISTS llm_cache_last_access ON llm_cache (last_access)")
+
+        count, total = self._connection.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_cache").fetchone()
+        self._entries = count
+        self._bytes = total
+
+    @staticmethod
+    def make_key(kind, model, template_version, payload, temperature):
+        """Content hash identifying one LLM request"""
+        material = json.dumps(
+            [kind, model, str(template_version), normalize_llm_input(payload), temperature],
+            sort_keys=True, ensure_ascii=False, separators=(",", ":")
+        )
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """Return (found, value) and mark the entry as recently used"""
+        with self._lock:
+            row = self._connection.execute("SELECT value FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self._stats["misses"] += 1
+                return False, None
+
+            self._connection.execute(
+                "UPDATE llm_cache SET last_access = ?, hits = hits + 1 WHERE key = ?", (time.time(), key)
+            )
+            self._stats["hits"] += 1
+            return True, json.loads(row[0])
+
+    def set(self, key, kind, value):
+        """Store a JSON-serializable value, evicting old entries when over the bounds"""
+        payload = json.dumps(value, ensure_ascii=False)
+        size = len(payload.encode("utf-8"))
+        now = time.time()
+
+        with self._lock:
+            previous = self._connection.execute("SELECT size FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            self._connection.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, kind, value, size, created_at, last_access, hits) "
+                "VALUES (?, ?, ?, ?, ?, ?, 0)",
+                (key, kind, payload, size, now, now)
+            )
+            if previous is None:
+                self._entries += 1
+            else:
+                self._bytes -= previous[0]
+            self._bytes += size
+            self._stats["writes"] += 1
+            self._evict_locked()
+
+    def _evict_locked(self):
+        """Drop least recently used entries until both bounds hold (caller holds the lock)"""
+        while self._entries > self.max_entries or self._bytes > self.max_bytes:
+            # Evict in slices so a full cache does not pay for one DELETE per write
+            batch = max(1, self._entries // 20)
+            rows = self._connection.execute(
+                "SELECT key, size FROM llm_cache ORDER BY last_access LIMIT ?", (batch,)
+            ).fetchall()
+            if not rows:
+                break
+
+            self._connection.executemany("DELETE FROM llm_cache WHERE key = ?", [(key,) for key, _ in rows])
+            self._entries -= len(rows)
+            self._bytes -= sum(size for _, size in rows)
+            self._stats["evictions"] += len(rows)
+
+    def record_error(self):
+        with self._lock:
+            self._stats["errors"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._connection.execute("DELETE FROM llm_cache")
+            self._entries = 0
+            self._bytes = 0
+
+    def stats(self):
+        """Hit-rate and size counters for this process"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats.update({
+                "entries": self._entries,
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "path": self.path
+            })
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        return stats
+
+def normalize_llm_input(value):
+    """Collapse whitespace in every string so cosmetic differences share a key"""
+    if isinstance(value, str):
+        return " ".join(value.split())
+    if isinstance(value, dict):
+        return {str(key): normalize_llm_input(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [normalize_llm_input(item) for item in value]
+    return value
+
+# Process-wide cache, opened on first use
+llm_cache = None
+llm_cache_lock = threading.Lock()
+
+def get_llm_cache():
+    """
+    Get the shared LLM output cache, or None when LLM_CACHE_ENABLED=0.
+    Stored at LLM_CACHE_PATH (default: the system temp directory)
+    """
+    global llm_cache
+
+    if llm_cache is not None:
+        return llm_cache
+
+    if os.getenv("LLM_CACHE_ENABLED", "1").lower() in ("0", "false", "no"):
+        return None
+
+    with llm_cache_lock:
+        if llm_cache is None:
+            path = os.getenv("LLM_CACHE_PATH") or os.path.join(tempfile.gettempdir(), "medfellow_llm_cache.sqlite3")
+            try:
+                llm_cache = LLMCache(
+                    path,
+                    max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", "50000")),
+                    max_bytes=int(os.getenv("LLM_CACHE_MAX_BYTES", str(200 * 1024 * 1024)))
+                )
+            except Exception as e:
+                print(f"LLM cache unavailable: {e}")
+                return None
+    return llm_cache
+
+def llm_cache_key(kind, model, template_version, payload, temperature):
+    """Cache key for one LLM request"""
+    return LLMCache.make_key(kind, model, template_version, payload, temperature)
+
+def get_cached_llm_output(key):
+    """Return (found, value); cache failures count as misses"""
+    cache = get_llm_cache()
+    if cache is None:
+        return False, None
+
+    try:
+        return cache.get(key)
+    except Exception as e:
+        print(f"LLM cache read failed: {e}")
+        cache.record_error()
+        return False, None
+
+def store_llm_output(key, kind, value):
+    """Save a successful LLM output; cache failures never break the caller"""
+    cache = get_llm_cache()
+    if cache is None:
+        return
+
+    try:
+        cache.set(key, kind, value)
+    except Exception as e:
+        print(f"LLM cache write failed: {e}")
+        cache.record_error()
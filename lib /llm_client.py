@@ -0,0 +1,184 @@
+import os
+import asyncio
+import threading
+import httpx
+from openai import AsyncOpenAI, OpenAI
+
+try:
+    import h2  # noqa: F401  (lets httpx speak HTTP/2)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# HTTP/2 multiplexes concurrent requests over one connection; it is used
+# when the h2 package is installed, unless OPENAI_HTTP2=0
+USE_HTTP2 = HTTP2_AVAILABLE and os.getenv("OPENAI_HTTP2", "1").lower() not in ("0", "false", "no")
+
+# Connection limits for the shared sync HTTP client. Thread pools (batch
+# explanations, chunk fan-out) share these kept-alive connections
+MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", "32"))
+MAX_KEEPALIVE = int(os.getenv("OPENAI_MAX_KEEPALIVE", "16"))
+KEEPALIVE_EXPIRY = float(os.getenv("OPENAI_KEEPALIVE_EXPIRY", "60"))
+
+# Connection limits for the shared async HTTP client. One process can keep
+# this many LLM requests in flight over kept-alive connections
+ASYNC_MAX_CONNECTIONS = int(os.getenv("OPENAI_ASYNC_MAX_CONNECTIONS", "64"))
+ASYNC_MAX_KEEPALIVE = int(os.getenv("OPENAI_ASYNC_MAX_KEEPALIVE", "32"))
+ASYNC_KEEPALIVE_EXPIRY = float(os.getenv("OPENAI_ASYNC_KEEPALIVE_EXPIRY", "60"))
+
+class HTTPPoolStats:
+    """
+    Counts requests against new TCP connections and TLS handshakes, from
+    httpcore trace events, so connection reuse on warm invocations is visible
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {"requests": 0, "new_connections": 0, "tls_handshakes": 0}
+
+    def _record(self, event_name):
+        if event_name == "connection.connect_tcp.complete":
+            key = "new_connections"
+        elif event_name == "connection.start_tls.complete":
+            key = "tls_handshakes"
+        else:
+            return
+        with self._lock:
+            self._stats[key] += 1
+
+    def trace(self, event_name, info):
+        self._record(event_name)
+
+    async def trace_async(self, event_name, info):
+        self._record(event_name)
+
+    def on_request(self, request):
+        with self._lock:
+            self._stats["requests"] += 1
+        request.extensions["trace"] = self.trace
+
+    async def on_request_async(self, request):
+        with self._lock:
+            self._stats["requests"] += 1
+        request.extensions["trace"] = self.trace_async
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        requests = stats["requests"]
+        reused = max(requests - stats["new_connections"], 0)
+        stats["connection_reuse_rate"] = round(reused / requests, 4) if requests else 0.0
+        return stats
+
+sync_pool_stats = HTTPPoolStats()
+async_pool_stats = HTTPPoolStats()
+
+# Shared sync clients: (api_key, base_url) -> OpenAI
+clients = {}
+clients_lock = threading.Lock()
+
+# httpx.AsyncClient is bound to the event loop it first runs on, so the
+# shared clients are kept per loop: (id(loop), api_key, base_url) -> (loop, client)
+async_clients = {}
+async_clients_lock = threading.Lock()
+
+def resolve_api_key(api_key=None):
+    """Return the given key or OPENAI_API_KEY, raising when neither is set"""
+    if not api_key:
+        api_key = os.getenv("OPENAI_API_KEY")
+
+    if not api_key:
+        raise ValueError("OpenAI API key is required")
+
+    return api_key
+
+def get_openai_client(api_key=None, base_url=None):
+    """
+    Shared OpenAI client for this process, created on first use.
+    Every sync helper goes through this, so calls reuse kept-alive
+    connections and warm invocations skip the TCP + TLS handshake
+    """
+    api_key = resolve_api_key(api_key)
+    base_url = base_url or os.getenv("OPENAI_BASE_URL") or None
+    key = (api_key, base_url)
+
+    with clients_lock:
+        client = clients.get(key)
+        if client is not None:
+            return client
+
+        http_client = httpx.Client(
+            limits=httpx.Limits(
+                max_connections=MAX_CONNECTIONS,
+                max_keepalive_connections=MAX_KEEPALIVE,
+                keepalive_expiry=KEEPALIVE_EXPIRY
+            ),
+            timeout=httpx.Timeout(60.0, connect=10.0),
+            http2=USE_HTTP2,
+            event_hooks={"request": [sync_pool_stats.on_request]}
+        )
+        # Retries are handled by the shared rate limiter
+        client = OpenAI(api_key=api_key, base_url=base_url, http_client=http_client, max_retries=0)
+        clients[key] = client
+        return client
+
+def get_async_openai_client(api_key=None, base_url=None):
+    """
+    Shared AsyncOpenAI client for the running event loop.
+    Every async helper goes through this, so concurrent calls share one
+    httpx connection pool. base_url (or OPENAI_BASE_URL) points the client
+    at a local mock server in tests
+    """
+    api_key = resolve_api_key(api_key)
+    base_url = base_url or os.getenv("OPENAI_BASE_URL") or None
+    loop = asyncio.get_running_loop()
+    key = (id(loop), api_key, base_url)
+
+    with async_clients_lock:
+        # Forget clients whose loop has been closed
+        for stale_key in [k for k, (client_loop, _) in async_clients.items() if client_loop.is_closed()]:
+            del async_clients[stale_key]
+
+        entry = async_clients.get(key)
+        if entry is not None:
+            return entry[1]
+
+        http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=ASYNC_MAX_CONNECTIONS,
+                max_keepalive_connections=ASYNC_MAX_KEEPALIVE,
+                keepalive_expiry=ASYNC_KEEPALIVE_EXPIRY
+            ),
+            timeout=httpx.Timeout(60.0, connect=10.0),
+            http2=USE_HTTP2,
+            event_hooks={"request": [async_pool_stats.on_request_async]}
+        )
+        # Retries are handled by the shared rate limiter
+        client = AsyncOpenAI(api_key=api_key, base_url=base_url, http_client=http_client, max_retries=0)
+        async_clients[key] = (loop, client)
+        return client
+
+async def close_async_openai_clients():
+    """Close the shared async clients created on the running event loop"""
+    loop = asyncio.get_running_loop()
+    with async_clients_lock:
+        keys = [key for key, (client_loop, _) in async_clients.items() if client_loop is loop]
+        clients = [async_clients.pop(key)[1] for key in keys]
+
+    for client in clients:
+        await client.close()
+
+def get_openai_pool_stats():
+    """Connection reuse counters for the shared sync and async clients"""
+    with clients_lock:
+        sync_clients = len(clients)
+    with async_clients_lock:
+        loop_clients = len(async_clients)
+
+    return {
+        "http2": USE_HTTP2,
+        "sync": dict(sync_pool_stats.stats(), clients=sync_clients, max_connections=MAX_CONNECTIONS,
+                     max_keepalive=MAX_KEEPALIVE),
+        "async": dict(async_pool_stats.stats(), clients=loop_clients, max_connections=ASYNC_MAX_CONNECTIONS,
+                      max_keepalive=ASYNC_MAX_KEEPALIVE)
+    }
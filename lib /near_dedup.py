@@ -0,0 +1,167 @@
+import re
+import zlib
+import numpy as np
+
+# Overlapping sliding windows produce many reworded copies of the same
+# question. Exact string matching misses them, so questions are compared by
+# MinHash signatures of their character shingles, and locality-sensitive
+# hashing (LSH) keeps lookups sub-quadratic: a question is only compared with
+# the few earlier questions that share at least one signature band with it.
+
+# Largest prime below 2**32; (a * x + b) stays below 2**64 for 32-bit x
+MINHASH_PRIME = np.uint64(4294967291)
+
+DEFAULT_THRESHOLD = 0.8
+DEFAULT_NUM_PERM = 128
+DEFAULT_SHINGLE_SIZE = 5
+
+NON_WORD_PATTERN = re.compile(r'[\W_]+', re.UNICODE)
+
+def normalize_text(text):
+    """Lowercase and reduce punctuation and whitespace to single spaces"""
+    return NON_WORD_PATTERN.sub(" ", (text or "").lower()).strip()
+
+def mcq_fingerprint_text(question):
+    """
+    Text used to compare MCQs: question plus options
+    Options are sorted so shuffled answer orders still match
+    """
+    if not isinstance(question, dict):
+        return ""
+
+    options = question.get("options") or {}
+    if isinstance(options, dict):
+        option_texts = sorted(str(value) for value in options.values())
+    else:
+        option_texts = sorted(str(value) for value in options)
+
+    return normalize_text(" ".join([str(question.get("question", ""))] + option_texts))
+
+def shingle_hashes(text, shingle_size=DEFAULT_SHINGLE_SIZE):
+    """Stable 32-bit hashes of the distinct character shingles of normalized text"""
+    if len(text) <= shingle_size:
+        shingles = {text} if text else set()
+    else:
+        shingles = {text[i:i + shingle_size] for i in range(len(text) - shingle_size + 1)}
+
+    return np.fromiter(
+        (zlib.crc32(shingle.encode("utf-8")) for shingle in shingles),
+        dtype=np.uint64, count=len(shingles)
+    )
+
+def choose_bands(num_perm, threshold):
+    """
+    Pick (bands, rows) with bands * rows == num_perm so the LSH
+    S-curve threshold (1 / bands) ** (1 / rows) is the highest one not above
+    threshold. Candidates are verified against the real threshold anyway,
+    so erring low only costs a few extra comparisons while erring high
+    misses true duplicates
+    """
+    best = None
+    for rows in range(1, num_perm + 1):
+        if num_perm % rows:
+            continue
+        bands = num_perm // rows
+        curve_threshold = (1.0 / bands) ** (1.0 / rows)
+        if curve_threshold <= threshold and (best is None or curve_threshold > best[0]):
+            best = (curve_threshold, bands, rows)
+
+    if best is None:
+        return num_perm, 1
+    return best[1], best[2]
+
+class MinHasher:
+    """Computes MinHash signatures with num_perm seeded universal hash functions"""
+
+    def __init__(self, num_perm=DEFAULT_NUM_PERM, shingle_size=DEFAULT_SHINGLE_SIZE, seed=1):
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        # Fixed seed: signatures stay comparable across runs and persisted indexes
+        rng = np.random.RandomState(seed)
+        self.a = rng.randint(1, int(MINHASH_PRIME), size=num_perm, dtype=np.uint64)
+        self.b = rng.randint(0, int(MINHASH_PRIME), size=num_perm, dtype=np.uint64)
+
+    def signature(self, text):
+        """MinHash signature (uint32 array) of normalized text"""
+        hashes = shingle_hashes(text, self.shingle_size)
+        if hashes.size == 0:
+            return np.full(self.num_perm, np.iinfo(np.uint32).max, dtype=np.uint32)
+
+        # One vectorized pass: every shingle hash through every permutation
+        permuted = (np.outer(hashes, self.a) + self.b) % MINHASH_PRIME
+        return permuted.min(axis=0).astype(np.uint32)
+
+def estimate_similarity(signature_a, signature_b):
+    """Estimated Jaccard similarity: the share of matching signature slots"""
+    return float(np.count_nonzero(signature_a == signature_b)) / len(signature_a)
+
+class MinHashLSHIndex:
+    """
+    Incremental LSH index over MinHash signatures
+    query() only verifies keys that share a band bucket with the probe,
+    so adding and checking n items costs roughly O(n) instead of O(n^2)
+    """
+
+    def __init__(self, threshold=DEFAULT_THRESHOLD, num_perm=DEFAULT_NUM_PERM, shingle_size=DEFAULT_SHINGLE_SIZE):
+        self.threshold = threshold
+        self.hasher = MinHasher(num_perm, shingle_size)
+        self.bands, self.rows = choose_bands(num_perm, threshold)
+        self._buckets = [{} for _ in range(self.bands)]
+        self._signatures = {}
+
+    def __len__(self):
+        return len(self._signatures)
+
+    def __contains__(self, key):
+        return key in self._signatures
+
+    def signature(self, text):
+        return self.hasher.signature(text)
+
+    def _band_keys(self, signature):
+        for band in range(self.bands):
+            yield band, signature[band * self.rows:(band + 1) * self.rows].tobytes()
+
+    def add(self, key, signature):
+        """Index a signature under key"""
+        self._signatures[key] = signature
+        for band, band_key in self._band_keys(signature):
+            self._buckets[band].setdefault(band_key, []).append(key)
+
+    def query(self, signature, threshold=None):
+        """Return [(key, similarity)] for indexed items at or above threshold, best first"""
+        threshold = self.threshold if threshold is None else threshold
+        candidates = set()
+        for band, band_key in self._band_keys(signature):
+            candidates.update(self._buckets[band].get(band_key, ()))
+
+        matches = []
+        for key in candidates:
+            similarity = estimate_similarity(signature, self._signatures[key])
+            if similarity >= threshold:
+                matches.append((key, similarity))
+
+        matches.sort(key=lambda match: match[1], reverse=True)
+        return matches
+
+    def items(self):
+        return self._signatures.items()
+
+def find_near_duplicates(texts, threshold=DEFAULT_THRESHOLD, num_perm=DEFAULT_NUM_PERM,
+                         shingle_size=DEFAULT_SHINGLE_SIZE):
+    """
+    Find near-duplicates in a sequence of texts, keeping the first occurrence
+    Returns {duplicate_index: (kept_index, similarity)}
+    """
+    index = MinHashLSHIndex(threshold, num_perm, shingle_size)
+    duplicates = {}
+
+    for position, text in enumerate(texts):
+        signature = index.signature(text)
+        matches = index.query(signature)
+        if matches:
+            duplicates[position] = matches[0]
+        else:
+            index.add(position, signature)
+
+    return duplicates
@@ -0,0 +1,246 @@
+import re
+from collections import Counter, namedtuple
+
+import fitz  # PyMuPDF
+
+# Structure-aware chunking for MCQ generation.
+# Instead of overlapping fixed word windows, the PDF is read as text blocks
+# with their font size and weight. Headings are recognised from typography
+# (or from the text itself when only plain text is available), and body
+# blocks are packed into non-overlapping chunks that fit the MCQ prompt
+# budget, starting a new chunk at section boundaries. Every word is sent
+# to the LLM once, and each chunk carries its section heading as a topic hint.
+# Budgets are measured with a caller-supplied function (characters by
+# default, tokens via tokens.count_tokens).
+
+TextBlock = namedtuple("TextBlock", ["page", "text", "size", "heading"])
+
+# A block this much larger than the body text is a heading candidate
+HEADING_SIZE_RATIO = 1.15
+HEADING_MAX_CHARS = 150
+HEADING_MAX_WORDS = 20
+
+# Pages sampled to find the body font size
+BODY_SIZE_SAMPLE_PAGES = 8
+
+# Same cues as extract_title_from_text, plus their Polish counterparts
+HEADING_KEYWORDS = (
+    'chapter', 'section', 'topic', 'disease', 'syndrome', 'treatment', 'diagnosis',
+    'rozdział', 'podrozdział', 'temat', 'choroba', 'zespół', 'leczenie', 'diagnostyka', 'rozpoznanie'
+)
+
+NUMBERED_HEADING_PATTERN = re.compile(r'^(\d+(\.\d+)*\.?|[IVXLC]+\.)\s+\w', re.UNICODE)
+SENTENCE_END_PATTERN = re.compile(r'(?<=[.!?])\s+')
+SPAN_BOLD_FLAG = 16
+
+def is_heading_text(line):
+    """Heading detection from text alone: markdown, numbering, capitals and topic keywords"""
+    line = line.strip()
+    if not line or len(line) > HEADING_MAX_CHARS or len(line.split()) > HEADING_MAX_WORDS:
+        return False
+
+    if line.startswith("#"):
+        return True
+
+    # Headings do not end like sentences
+    if line.endswith((".", ",", ";", ":")):
+        return False
+
+    if NUMBERED_HEADING_PATTERN.match(line) and len(line) < 100:
+        return True
+
+    letters = [char for char in line if char.isalpha()]
+    if len(letters) >= 4 and all(char.isupper() for char in letters):
+        return True
+
+    return 10 < len(line) < 100 and any(word in line.lower() for word in HEADING_KEYWORDS)
+
+def is_heading_block(text, size, bold, body_size):
+    """Heading detection for a PDF block, from its typography first"""
+    if len(text) > HEADING_MAX_CHARS or len(text.split()) > HEADING_MAX_WORDS:
+        return False
+    if text.rstrip().endswith((".", ",", ";")):
+        return False
+    if body_size and size >= body_size * HEADING_SIZE_RATIO:
+        return True
+    if bold and (not body_size or size >= body_size) and len(text) <= 80:
+        return True
+    return is_heading_text(text)
+
+def _block_spans(block):
+    """Text, font size and bold flag of every span in a PyMuPDF text block"""
+    for line in block.get("lines", []):
+        for span in line.get("spans", []):
+            text = span.get("text", "")
+            if text.strip():
+                yield text, round(span.get("size", 0) * 2) / 2, bool(span.get("flags", 0) & SPAN_BOLD_FLAG)
+
+def _page_text_blocks(page):
+    """(text, dominant size, mostly bold) for each text block of a page"""
+    for block in page.get_text("dict")["blocks"]:
+        if block.get("type") != 0:
+            continue
+
+        lines = []
+        for line in block.get("lines", []):
+            line_text = "".join(span.get("text", "") for span in line.get("spans", [])).strip()
+            if line_text:
+                lines.append(line_text)
+        text = " ".join(lines)
+        if not text:
+            continue
+
+        sizes = Counter()
+        bold_chars = 0
+        total_chars = 0
+        for span_text, size, bold in _block_spans(block):
+            sizes[size] += len(span_text)
+            total_chars += len(span_text)
+            bold_chars += len(span_text) if bold else 0
+
+        size = sizes.most_common(1)[0][0] if sizes else 0
+        yield text, size, total_chars > 0 and bold_chars * 2 > total_chars
+
+def iter_pdf_blocks(pdf_path_or_bytes, sample_pages=BODY_SIZE_SAMPLE_PAGES):
+    """
+    Yield the TextBlocks of a PDF, page by page
+    The body font size is taken from the first sample_pages pages, so
+    headings are recognised without reading the whole document first
+    """
+    if isinstance(pdf_path_or_bytes, (bytes, bytearray)):
+        doc = fitz.open(stream=pdf_path_or_bytes, filetype="pdf")
+    else:
+        doc = fitz.open(pdf_path_or_bytes)
+
+    try:
+        sizes = Counter()
+        for page_number in range(min(sample_pages, doc.page_count)):
+            for text, size, _ in _page_text_blocks(doc[page_number]):
+                sizes[size] += len(text)
+        body_size = sizes.most_common(1)[0][0] if sizes else None
+
+        for page_number, page in enumerate(doc):
+            for text, size, bold in _page_text_blocks(page):
+                yield TextBlock(page_number + 1, text, size, is_heading_block(text, size, bold, body_size))
+    finally:
+        doc.close()
+
+def iter_text_blocks(page_texts):
+    """
+    TextBlocks from plain page texts (e.g. parallel extraction output)
+    Lines are grouped into paragraphs at blank lines and headings, which
+    are recognised from the text alone
+    """
+    for page_number, page_text in enumerate(page_texts, start=1):
+        paragraph = []
+        for line in page_text.split("\n"):
+            line = line.strip()
+            if line and not is_heading_text(line):
+                paragraph.append(line)
+                continue
+
+            if paragraph:
+                yield TextBlock(page_number, " ".join(paragraph), None, False)
+                paragraph = []
+            if line:
+                yield TextBlock(page_number, line.lstrip("#").strip(), None, True)
+
+        if paragraph:
+            yield TextBlock(page_number, " ".join(paragraph), None, False)
+
+def cut_to_fit(text, budget, measure=len):
+    """Longest prefix of text that measures at most budget (binary search over its length)"""
+    low, high = 0, len(text)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if measure(text[:middle]) <= budget:
+            low = middle
+        else:
+            high = middle - 1
+    return text[:low]
+
+def split_to_fit(text, budget, measure=len, truncate=None):
+    """
+    Split text at sentence (then word) boundaries into pieces that measure at most budget
+    A single word over budget is cut with truncate(word, budget), by default
+    the longest prefix that measure allows; pass a tokenizer's truncation
+    (e.g. truncate_to_tokens) to avoid the repeated measuring
+    """
+    truncate = truncate or (lambda unit, limit: cut_to_fit(unit, limit, measure))
+    if measure(text) <= budget:
+        return [text]
+
+    pieces = []
+    current = ""
+    current_size = 0
+    for sentence in SENTENCE_END_PATTERN.split(text):
+        units = [sentence] if measure(sentence) <= budget else sentence.split()
+        for unit in units:
+            unit_size = measure(unit)
+            if unit_size > budget:
+                unit = truncate(unit, budget)
+                unit_size = measure(unit)
+            if current and current_size + 1 + unit_size > budget:
+                pieces.append(current)
+                current = ""
+                current_size = 0
+            current = f"{current} {unit}" if current else unit
+            current_size += unit_size + (1 if current_size else 0)
+    if current:
+        pieces.append(current)
+    return pieces
+
+def iter_structured_chunks(blocks, budget, min_size=None, measure=len, truncate=None):
+    """
+    Pack TextBlocks into non-overlapping chunks that measure at most budget
+    A heading starts a new chunk once the current one holds min_size
+    (default: half the budget); shorter sections are merged so no chunk is
+    wasted on a few lines. Yields {"text", "topic", "pages"} where topic is
+    the first heading in the chunk, or the section it continues
+    """
+    min_size = budget // 2 if min_size is None else min_size
+    parts = []
+    pages = []
+    length = 0
+    topic = None
+    section = None
+    # Headings wait for their section text, so no chunk ends on a bare heading
+    pending = []
+
+    for block in blocks:
+        text = block.text.strip()
+        if not text:
+            continue
+
+        if block.heading:
+            if length >= min_size and not pending:
+                yield {"text": "\n".join(parts), "topic": topic or section, "pages": (pages[0], pages[-1])}
+                parts, pages, length, topic = [], [], 0, None
+            heading = text if measure(text) <= budget else split_to_fit(text, budget, measure, truncate)[0]
+            pending.append((heading, measure(heading), block.page))
+            continue
+
+        for piece in split_to_fit(text, budget, measure, truncate):
+            piece_size = measure(piece)
+            header_length = sum(size + 1 for _, size, _ in pending)
+            if parts and length + 1 + header_length + piece_size > budget:
+                yield {"text": "\n".join(parts), "topic": topic or section, "pages": (pages[0], pages[-1])}
+                parts, pages, length, topic = [], [], 0, None
+
+            if pending:
+                # Headings go into the text when they fit; they always become the topic
+                if length + header_length + piece_size <= budget:
+                    for heading, size, page in pending:
+                        length += size + (1 if parts else 0)
+                        parts.append(heading)
+                        pages.append(page)
+                topic = topic or pending[0][0]
+                section = pending[-1][0]
+                pending = []
+
+            length += piece_size + (1 if parts else 0)
+            parts.append(piece)
+            pages.append(block.page)
+
+    if parts:
+        yield {"text": "\n".join(parts), "topic": topic or section, "pages": (pages[0], pages[-1])}
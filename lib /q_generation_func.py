@@ -1,36 +1,142 @@
 import os
 import fitz  # PyMuPDF
-import pandas as pd
 import json
 import time
-from openai import OpenAI
+import asyncio
+import itertools
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
 
-def extract_pdf_text(file_path):
-    """Extract text from PDF file"""
+from .llm_cache import get_cached_llm_output, llm_cache_key, store_llm_output
+from .llm_client import get_async_openai_client, get_openai_client
+from .rate_limiter import create_chat_completion, create_chat_completion_async
+from .near_dedup import find_near_duplicates, mcq_fingerprint_text
+from .question_bank import get_question_bank_index
+from .pdf_sections import iter_pdf_blocks, iter_structured_chunks, iter_text_blocks
+from .tokens import count_tokens, estimate_request, truncate_to_tokens
+from .relevance import classify_relevance, should_skip_chunk
+from .export import export_mcqs
+
+# Model used for generation and relevance checks. Bump a prompt version
+# whenever that prompt changes, so cached outputs of the old prompt are not reused
+GENERATION_MODEL = "gpt-4o-mini"
+MCQ_PROMPT_VERSION = 1
+RELEVANCE_PROMPT_VERSION = 1
+
+# Token budgets for the text placed in each prompt; structured chunks are
+# built to fill the MCQ budget exactly
+MCQ_PROMPT_MAX_TOKENS = int(os.getenv("MCQ_PROMPT_MAX_TOKENS", "750"))
+RELEVANCE_PROMPT_MAX_TOKENS = int(os.getenv("RELEVANCE_PROMPT_MAX_TOKENS", "400"))
+MCQ_MAX_COMPLETION_TOKENS = 2000
+
+def iter_pdf_pages(pdf_path_or_bytes):
+    """
+    Yield the stripped text of each non-empty PDF page, one page at a time
+    Accepts a file path or PDF bytes; the document is closed once the
+    generator is exhausted or closed
+    """
+    if isinstance(pdf_path_or_bytes, (bytes, bytearray)):
+        doc = fitz.open(stream=pdf_path_or_bytes, filetype="pdf")
+    else:
+        doc = fitz.open(pdf_path_or_bytes)
+    
     try:
-        doc = fitz.open(file_path)
-        full_text = ""
         for page in doc:
-            text = page.get_text()
-            if text.strip():
-                full_text += text.strip() + " "
+            text = page.get_text().strip()
+            if text:
+                yield text
+    finally:
         doc.close()
-        return full_text
+
+# Below this many pages, starting worker processes costs more than it saves
+PARALLEL_EXTRACTION_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "64"))
+
+# Document opened once per extraction worker process
+_worker_doc = None
+
+def _init_extraction_worker(pdf_path_or_bytes):
+    """Open the PDF once in each worker process"""
+    global _worker_doc
+    if isinstance(pdf_path_or_bytes, (bytes, bytearray)):
+        _worker_doc = fitz.open(stream=pdf_path_or_bytes, filetype="pdf")
+    else:
+        _worker_doc = fitz.open(pdf_path_or_bytes)
+
+def _extract_page_range(start, stop):
+    """Return the stripped text of pages [start, stop) from this worker's document"""
+    return [_worker_doc[i].get_text().strip() for i in range(start, stop)]
+
+def extract_pdf_pages_parallel(pdf_path_or_bytes, max_workers=None, min_pages=None):
+    """
+    Extract page texts on a process pool, each worker with its own fitz document
+    Returns (pages, stats): the non-empty page texts in page order, and
+    page count, mode, workers, elapsed and pages/sec. PDFs shorter than
+    min_pages, or environments without process support, use the serial loop
+    """
+    started = time.monotonic()
+    min_pages = PARALLEL_EXTRACTION_MIN_PAGES if min_pages is None else min_pages
+    max_workers = max_workers or os.cpu_count() or 1
+    
+    if isinstance(pdf_path_or_bytes, (bytes, bytearray)):
+        doc = fitz.open(stream=pdf_path_or_bytes, filetype="pdf")
+    else:
+        doc = fitz.open(pdf_path_or_bytes)
+    page_count = doc.page_count
+    doc.close()
+    
+    pages = None
+    mode = "serial"
+    workers = 1
+    
+    if page_count >= min_pages and max_workers > 1:
+        workers = min(max_workers, page_count)
+        # Several ranges per worker keep the pool balanced when page density varies
+        step = max(1, -(-page_count // (workers * 4)))
+        starts = list(range(0, page_count, step))
+        stops = [min(start + step, page_count) for start in starts]
+        try:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_extraction_worker,
+                                     initargs=(pdf_path_or_bytes,)) as executor:
+                pages = [text for texts in executor.map(_extract_page_range, starts, stops) for text in texts if text]
+            mode = "parallel"
+        except (OSError, BrokenProcessPool) as e:
+            # e.g. no /dev/shm in some serverless sandboxes
+            print(f"Parallel PDF extraction unavailable, falling back to serial: {e}")
+            workers = 1
+    
+    if pages is None:
+        pages = list(iter_pdf_pages(pdf_path_or_bytes))
+    
+    elapsed = time.monotonic() - started
+    stats = {
+        "pages": page_count,
+        "mode": mode,
+        "workers": workers,
+        "elapsed": round(elapsed, 3),
+        "pages_per_sec": round(page_count / elapsed, 1) if elapsed > 0 else None
+    }
+    print(f"Extracted {page_count} pages ({mode}, {workers} workers) at {stats['pages_per_sec']} pages/sec")
+    return pages, stats
+
+def extract_pdf_text(file_path, parallel=False):
+    """Extract text from PDF file (parallel=True uses a process pool for large PDFs)"""
+    try:
+        if parallel:
+            pages, _ = extract_pdf_pages_parallel(file_path)
+            return "".join(text + " " for text in pages)
+        return "".join(text + " " for text in iter_pdf_pages(file_path))
     except Exception as e:
         print(f"Error extracting PDF text: {e}")
         return ""
 
-def extract_pdf_text_from_bytes(pdf_bytes):
+def extract_pdf_text_from_bytes(pdf_bytes, parallel=False):
     """Extract text from PDF bytes (for file uploads)"""
     try:
-        doc = fitz.open(stream=pdf_bytes, filetype="pdf")
-        full_text = ""
-        for page in doc:
-            text = page.get_text()
-            if text.strip():
-                full_text += text.strip() + " "
-        doc.close()
-        return full_text
+        if parallel:
+            pages, _ = extract_pdf_pages_parallel(pdf_bytes)
+            return "".join(text + " " for text in pages)
+        return "".join(text + " " for text in iter_pdf_pages(pdf_bytes))
     except Exception as e:
         print(f"Error extracting PDF text from bytes: {e}")
         return ""
@@ -51,8 +157,38 @@ def sliding_window_chunks(text, window_size=1200, step_size=600):
     
     return chunks
 
-def deduplicate_mcqs(mcq_list):
-    """Remove duplicate questions from MCQ list"""
+def iter_words(texts):
+    """Yield the words of a stream of texts (e.g. PDF pages)"""
+    for text in texts:
+        yield from text.split()
+
+def iter_sliding_window_chunks(words, window_size=1200, step_size=600):
+    """
+    Streaming version of sliding_window_chunks over an iterable of words
+    Keeps only the current window in a deque and yields each chunk as soon
+    as its last word arrives; produces the same windows as sliding_window_chunks
+    """
+    window = deque(maxlen=window_size)
+    seen = 0
+    emitted = False
+    
+    for word in words:
+        window.append(word)
+        seen += 1
+        if seen >= window_size and (seen - window_size) % step_size == 0:
+            yield " ".join(window)
+            emitted = True
+    
+    # Documents shorter than one window become a single chunk
+    if not emitted and window:
+        yield " ".join(window)
+
+def deduplicate_mcqs(mcq_list, near_duplicate_threshold=None):
+    """
+    Remove duplicate questions from MCQ list
+    With near_duplicate_threshold (0-1, e.g. 0.8), reworded copies whose
+    question + options similarity reaches the threshold are dropped too
+    """
     if not mcq_list:
         return []
     
@@ -82,42 +218,36 @@ def deduplicate_mcqs(mcq_list):
         if unique_questions:
             unique_mcqs.append({"temat": topic, "questions": unique_questions})
     
+    if near_duplicate_threshold:
+        unique_mcqs = _drop_near_duplicate_mcqs(unique_mcqs, near_duplicate_threshold)
+    
     return unique_mcqs
 
+def _drop_near_duplicate_mcqs(mcq_blocks, threshold):
+    """Drop questions that are near-duplicates of an earlier question (MinHash/LSH)"""
+    texts = [mcq_fingerprint_text(q) for block in mcq_blocks for q in block["questions"]]
+    duplicates = find_near_duplicates(texts, threshold)
+    if not duplicates:
+        return mcq_blocks
+    
+    print(f"Dropped {len(duplicates)} near-duplicate questions")
+    
+    filtered = []
+    position = 0
+    for block in mcq_blocks:
+        kept = []
+        for q in block["questions"]:
+            if position not in duplicates:
+                kept.append(q)
+            position += 1
+        if kept:
+            filtered.append({"temat": block["temat"], "questions": kept})
+    
+    return filtered
+
 def mcqs_to_excel(mcq_list, output_path):
-    """Save MCQs to Excel file"""
-    if not mcq_list:
-        # Create empty Excel file
-        df = pd.DataFrame(columns=["Temat", "Pytanie", "Opcja A", "Opcja B", "Opcja C", "Opcja D", "Poprawna OdpowiedÅº", "WyjaÅ›nienie"])
-        df.to_excel(output_path, index=False)
-        return
-    
-    rows = []
-    for mcq_block in mcq_list:
-        if not isinstance(mcq_block, dict):
-            continue
-            
-        topic = mcq_block.get("topic") or mcq_block.get("temat", "")
-        questions = mcq_block.get("questions", [])
-        
-        for question_data in questions:
-            if not isinstance(question_data, dict):
-                continue
-                
-            options = question_data.get("options", {})
-            rows.append({
-                "Temat": topic,
-                "Pytanie": question_data.get("question", ""),
-                "Opcja A": options.get("A", ""),
-                "Opcja B": options.get("B", ""),
-                "Opcja C": options.get("C", ""),
-                "Opcja D": options.get("D", ""),
-                "Poprawna OdpowiedÅº": question_data.get("answer", ""),
-                "WyjaÅ›nienie": question_data.get("explanation", "")
-            })
-    
-    df = pd.DataFrame(rows)
-    df.to_excel(output_path, index=False)
+    """Save MCQs to Excel file (streamed, see export.export_mcqs)"""
+    export_mcqs(mcq_list or [], output_path, "xlsx")
 
 def extract_title_from_text(text):
     """Extract title from text using various strategies"""
@@ -147,17 +277,8 @@ def extract_title_from_text(text):
     
     return "Medical Topic"
 
-def generate_mcqs_with_assistant(client, text, max_attempts=2):
-    """
-    Generate MCQs using OpenAI Chat Completions
-    Simplified version for serverless environments
-    """
-    
-    if not text or not text.strip():
-        return []
-    
-    # System prompt for MCQ generation
-    system_prompt = """You are a medical education expert specializing in creating high-quality multiple-choice questions (MCQs) from clinical content. 
+# System prompt for MCQ generation
+MCQ_SYSTEM_PROMPT = """You are a medical education expert specializing in creating high-quality multiple-choice questions (MCQs) from clinical content. 
 
 Your task is to:
 1. Analyze the provided medical text
@@ -193,27 +314,124 @@ Return your response as a JSON object with this exact format:
 
 CRITICAL: Return ONLY the JSON object, no additional text or formatting."""
 
-    for attempt in range(max_attempts):
-        try:
-            print(f"[MCQ GENERATION] Attempt {attempt + 1} of {max_attempts}")
-            
-            # Create the user prompt
-            user_prompt = f"""Generate medical MCQs from the following text:
+def _mcq_prompt_text(text):
+    """The part of a chunk that is actually sent for MCQ generation"""
+    return truncate_to_tokens(text, MCQ_PROMPT_MAX_TOKENS, GENERATION_MODEL)
+
+def _chunk_tokens(text):
+    """Chunk size measure for iter_structured_chunks"""
+    return count_tokens(text, GENERATION_MODEL)
 
-{text[:3000]}  # Limit text length for serverless
+def _truncate_chunk(text, max_tokens):
+    """Cut for text over the chunk budget in iter_structured_chunks"""
+    return truncate_to_tokens(text, max_tokens, GENERATION_MODEL)
+
+def estimate_mcq_request(text, topic_hint=None):
+    """Predicted prompt tokens, cost and latency of generating MCQs from a chunk"""
+    return estimate_request(_build_mcq_messages(text, topic_hint), MCQ_MAX_COMPLETION_TOKENS, GENERATION_MODEL)
+
+def _mcq_cache_key(text, topic_hint=None):
+    """LLM cache key for MCQ generation from a chunk"""
+    payload = _mcq_prompt_text(text)
+    if topic_hint:
+        payload = f"{topic_hint}\n{payload}"
+    return llm_cache_key("mcqs", GENERATION_MODEL, MCQ_PROMPT_VERSION, payload, 0.3)
+
+def _build_mcq_messages(text, topic_hint=None):
+    """Build the chat messages for MCQ generation from a text chunk"""
+    # The section heading the chunk came from, when the PDF structure gave one
+    section_line = f"Section: {topic_hint}\n\n" if topic_hint else ""
+
+    # Create the user prompt
+    user_prompt = f"""{section_line}Generate medical MCQs from the following text:
+
+{_mcq_prompt_text(text)}  # Limit text length for serverless
 
 Please create 2-3 high-quality multiple-choice questions based on the key clinical concepts in this text. Follow the JSON format specified in the system message."""
 
+    return [
+        {"role": "system", "content": MCQ_SYSTEM_PROMPT},
+        {"role": "user", "content": user_prompt}
+    ]
+
+def _parse_mcq_response(response_content, text, topic_hint=None):
+    """
+    Parse and validate an MCQ generation response
+    Raises json.JSONDecodeError or ValueError when the response is unusable
+    """
+    parsed_quiz = json.loads(response_content)
+    
+    # Validate the response structure
+    if not isinstance(parsed_quiz, dict):
+        raise ValueError("Response is not a JSON object")
+
+    if "questions" not in parsed_quiz:
+        raise ValueError("No 'questions' key in response")
+
+    if not isinstance(parsed_quiz["questions"], list):
+        raise ValueError("'questions' is not a list")
+
+    if len(parsed_quiz["questions"]) == 0:
+        raise ValueError("No questions generated")
+
+    # Ensure topic is present
+    if "topic" not in parsed_quiz or not parsed_quiz["topic"]:
+        parsed_quiz["topic"] = topic_hint or extract_title_from_text(text)
+
+    # Validate each question structure
+    for i, question in enumerate(parsed_quiz["questions"]):
+        required_keys = ["question", "options", "answer", "explanation"]
+        for key in required_keys:
+            if key not in question:
+                raise ValueError(f"Question {i+1} missing required key: {key}")
+
+        # Validate options structure
+        if not isinstance(question["options"], dict):
+            raise ValueError(f"Question {i+1} options must be a dictionary")
+
+        expected_options = ["A", "B", "C", "D"]
+        for opt in expected_options:
+            if opt not in question["options"]:
+                question["options"][opt] = f"Option {opt} not provided"
+    
+    return parsed_quiz
+
+def generate_mcqs_with_assistant(client, text, max_attempts=2, topic_hint=None, deadline=None):
+    """
+    Generate MCQs using OpenAI Chat Completions
+    Simplified version for serverless environments
+    topic_hint is the section heading of the chunk, passed on to the prompt
+    Rate limits and API errors are retried by the shared rate limiter;
+    max_attempts only re-asks when the output is unusable. deadline (a
+    time.monotonic() value) stops retries and attempts once it passes
+    """
+    
+    if not text or not text.strip():
+        return []
+    
+    # Identical chunks (re-uploaded PDFs, retried runs) are answered from the cache
+    cache_key = _mcq_cache_key(text, topic_hint)
+    found, cached = get_cached_llm_output(cache_key)
+    if found:
+        print("[MCQ GENERATION] Served from LLM cache")
+        return [cached]
+    
+    for attempt in range(max_attempts):
+        if deadline is not None and time.monotonic() >= deadline:
+            print("[MCQ GENERATION] Deadline reached, no further attempts")
+            break
+        try:
+            print(f"[MCQ GENERATION] Attempt {attempt + 1} of {max_attempts}")
+            
             # Make API call to chat completions
-            response = client.chat.completions.create(
-                model="gpt-4o-mini",  # Using mini for faster serverless response
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
+            response = create_chat_completion(
+                client,
+                model=GENERATION_MODEL,  # Using mini for faster serverless response
+                messages=_build_mcq_messages(text, topic_hint),
                 temperature=0.3,
-                max_tokens=2000,  # Reduced for serverless
+                max_tokens=MCQ_MAX_COMPLETION_TOKENS,  # Reduced for serverless
                 timeout=30,       # 30 second timeout
+                deadline=deadline,
                 response_format={"type": "json_object"}  # Enforce JSON response
             )
             
@@ -222,42 +440,9 @@ Please create 2-3 high-quality multiple-choice questions based on the key clinic
             print(f"[MCQ GENERATION] Raw response length: {len(response_content)} chars")
             
             try:
-                parsed_quiz = json.loads(response_content)
-                
-                # Validate the response structure
-                if not isinstance(parsed_quiz, dict):
-                    raise ValueError("Response is not a JSON object")
-                
-                if "questions" not in parsed_quiz:
-                    raise ValueError("No 'questions' key in response")
-                
-                if not isinstance(parsed_quiz["questions"], list):
-                    raise ValueError("'questions' is not a list")
-                
-                if len(parsed_quiz["questions"]) == 0:
-                    raise ValueError("No questions generated")
-                
-                # Ensure topic is present
-                if "topic" not in parsed_quiz or not parsed_quiz["topic"]:
-                    parsed_quiz["topic"] = extract_title_from_text(text)
-                
-                # Validate each question structure
-                for i, question in enumerate(parsed_quiz["questions"]):
-                    required_keys = ["question", "options", "answer", "explanation"]
-                    for key in required_keys:
-                        if key not in question:
-                            raise ValueError(f"Question {i+1} missing required key: {key}")
-                    
-                    # Validate options structure
-                    if not isinstance(question["options"], dict):
-                        raise ValueError(f"Question {i+1} options must be a dictionary")
-                    
-                    expected_options = ["A", "B", "C", "D"]
-                    for opt in expected_options:
-                        if opt not in question["options"]:
-                            question["options"][opt] = f"Option {opt} not provided"
-                
+                parsed_quiz = _parse_mcq_response(response_content, text, topic_hint)
                 print(f"[MCQ GENERATION] Successfully generated {len(parsed_quiz['questions'])} questions")
+                store_llm_output(cache_key, "mcqs", parsed_quiz)
                 return [parsed_quiz]
                 
             except json.JSONDecodeError as je:
@@ -269,25 +454,70 @@ Please create 2-3 high-quality multiple-choice questions based on the key clinic
                 
         except Exception as e:
             print(f"[MCQ GENERATION] API error on attempt {attempt + 1}: {e}")
-        
-        # Wait before retry if not the last attempt
-        if attempt < max_attempts - 1:
-            print(f"[MCQ GENERATION] Waiting 2 seconds before retry...")
-            time.sleep(2)
 
     print(f"[MCQ GENERATION] Failed to generate MCQs after {max_attempts} attempts")
     return []
 
-def is_clinically_relevant(client, text, max_chars=1500):
+async def generate_mcqs_with_assistant_async(client, text, max_attempts=2, topic_hint=None, deadline=None):
     """
-    Enhanced clinical relevance checker using chat completions
-    Simplified for serverless environments
+    Async variant of generate_mcqs_with_assistant
+    Takes an AsyncOpenAI client, e.g. from create_async_openai_client()
     """
     if not text or not text.strip():
-        return False
+        return []
     
+    # Identical chunks (re-uploaded PDFs, retried runs) are answered from the cache
+    cache_key = _mcq_cache_key(text, topic_hint)
+    found, cached = get_cached_llm_output(cache_key)
+    if found:
+        print("[MCQ GENERATION] Served from LLM cache")
+        return [cached]
+    
+    for attempt in range(max_attempts):
+        if deadline is not None and time.monotonic() >= deadline:
+            print("[MCQ GENERATION] Deadline reached, no further attempts")
+            break
+        try:
+            response = await create_chat_completion_async(
+                client,
+                model=GENERATION_MODEL,
+                messages=_build_mcq_messages(text, topic_hint),
+                temperature=0.3,
+                max_tokens=MCQ_MAX_COMPLETION_TOKENS,
+                timeout=30,
+                deadline=deadline,
+                response_format={"type": "json_object"}
+            )
+            
+            response_content = response.choices[0].message.content.strip()
+            
+            try:
+                parsed_quiz = _parse_mcq_response(response_content, text, topic_hint)
+                print(f"[MCQ GENERATION] Successfully generated {len(parsed_quiz['questions'])} questions")
+                store_llm_output(cache_key, "mcqs", parsed_quiz)
+                return [parsed_quiz]
+                
+            except json.JSONDecodeError as je:
+                print(f"[MCQ GENERATION] JSON decode error on attempt {attempt + 1}: {je}")
+                
+            except ValueError as ve:
+                print(f"[MCQ GENERATION] Validation error on attempt {attempt + 1}: {ve}")
+                
+        except Exception as e:
+            print(f"[MCQ GENERATION] API error on attempt {attempt + 1}: {e}")
+
+    print(f"[MCQ GENERATION] Failed to generate MCQs after {max_attempts} attempts")
+    return []
+
+def _relevance_cache_key(text, max_tokens=RELEVANCE_PROMPT_MAX_TOKENS):
+    """LLM cache key for a clinical relevance verdict"""
+    text_sample = truncate_to_tokens(text, max_tokens, GENERATION_MODEL)
+    return llm_cache_key("relevance", GENERATION_MODEL, RELEVANCE_PROMPT_VERSION, text_sample, 0.0)
+
+def _build_relevance_messages(text, max_tokens=RELEVANCE_PROMPT_MAX_TOKENS):
+    """Build the chat messages for the clinical relevance check"""
     # Limit text length for faster processing
-    text_sample = text[:max_chars]
+    text_sample = truncate_to_tokens(text, max_tokens, GENERATION_MODEL)
     
     prompt = f"""Analyze the following text to determine if it contains clinically relevant medical content suitable for creating medical education questions.
 
@@ -303,15 +533,52 @@ Criteria for clinical relevance:
 Respond with only "YES" if the text is clinically relevant for medical education, or "NO" if it is not.
 Do not include any explanation, just YES or NO."""
 
+    return [
+        {"role": "system", "content": "You are a medical education expert who determines if content is suitable for creating medical exam questions. Respond only with YES or NO."},
+        {"role": "user", "content": prompt}
+    ]
+
+def _local_relevance(text, max_tokens):
+    """
+    Local pre-filter verdict on the sample the LLM would see: True, or None (ask the LLM)
+    Never False: a document's opening (title page, copyright, foreword) can
+    look non-medical, so only the LLM may reject it
+    """
+    verdict, scores = classify_relevance(truncate_to_tokens(text, max_tokens, GENERATION_MODEL))
+    if verdict != "relevant":
+        return None
+    print(f"Clinical relevance decided locally: {verdict} (medical term density {scores['density']})")
+    return True
+
+def is_clinically_relevant(client, text, max_tokens=RELEVANCE_PROMPT_MAX_TOKENS, max_chars=None):
+    """
+    Enhanced clinical relevance checker using chat completions
+    Simplified for serverless environments
+    Clearly medical text is accepted by the local pre-filter without an API call
+    max_tokens bounds the checked sample; max_chars (the old limit) still
+    cuts the text to that many characters first
+    """
+    if max_chars is not None:
+        text = text[:max_chars] if text else text
+    if not text or not text.strip():
+        return False
+    
+    local = _local_relevance(text, max_tokens)
+    if local is not None:
+        return local
+    
+    cache_key = _relevance_cache_key(text, max_tokens)
+    found, cached = get_cached_llm_output(cache_key)
+    if found:
+        return cached
+    
     try:
         print("Checking clinical relevance...")
         
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",  # Using mini for faster serverless response
-            messages=[
-                {"role": "system", "content": "You are a medical education expert who determines if content is suitable for creating medical exam questions. Respond only with YES or NO."},
-                {"role": "user", "content": prompt}
-            ],
+        response = create_chat_completion(
+            client,
+            model=GENERATION_MODEL,  # Using mini for faster serverless response
+            messages=_build_relevance_messages(text, max_tokens),
             temperature=0.0,
             max_tokens=10,
             timeout=15  # Reduced timeout for serverless
@@ -320,69 +587,339 @@ Do not include any explanation, just YES or NO."""
         answer = response.choices[0].message.content.strip().upper()
         print(f"Clinical relevance check result: {answer}")
         
-        return answer == "YES"
+        relevant = answer == "YES"
+        store_llm_output(cache_key, "relevance", relevant)
+        return relevant
         
     except Exception as e:
         print(f"Error in clinical relevance check: {e}")
         # Default to True to avoid blocking content unnecessarily
         return True
 
-def create_openai_client(api_key=None):
-    """Create OpenAI client with error handling"""
-    if not api_key:
-        api_key = os.getenv("OPENAI_API_KEY")
+async def is_clinically_relevant_async(client, text, max_tokens=RELEVANCE_PROMPT_MAX_TOKENS, max_chars=None):
+    """
+    Async variant of is_clinically_relevant
+    """
+    if max_chars is not None:
+        text = text[:max_chars] if text else text
+    if not text or not text.strip():
+        return False
+    
+    local = _local_relevance(text, max_tokens)
+    if local is not None:
+        return local
     
-    if not api_key:
-        raise ValueError("OpenAI API key is required")
+    cache_key = _relevance_cache_key(text, max_tokens)
+    found, cached = get_cached_llm_output(cache_key)
+    if found:
+        return cached
     
-    return OpenAI(api_key=api_key)
+    try:
+        response = await create_chat_completion_async(
+            client,
+            model=GENERATION_MODEL,
+            messages=_build_relevance_messages(text, max_tokens),
+            temperature=0.0,
+            max_tokens=10,
+            timeout=15
+        )
+
+        answer = response.choices[0].message.content.strip().upper()
+        print(f"Clinical relevance check result: {answer}")
+        
+        relevant = answer == "YES"
+        store_llm_output(cache_key, "relevance", relevant)
+        return relevant
+        
+    except Exception as e:
+        print(f"Error in clinical relevance check: {e}")
+        # Default to True to avoid blocking content unnecessarily
+        return True
+
+def create_openai_client(api_key=None, base_url=None):
+    """
+    Get the shared OpenAI client (see llm_client.get_openai_client)
+    Raises ValueError when no API key is configured
+    """
+    return get_openai_client(api_key, base_url)
+
+def create_async_openai_client(api_key=None, base_url=None):
+    """
+    Get the shared AsyncOpenAI client for the running event loop
+    Must be called from inside a coroutine
+    """
+    return get_async_openai_client(api_key, base_url)
 
-def process_pdf_for_mcqs(pdf_path_or_bytes, api_key=None, max_chunks=4):
+def skip_irrelevant_chunks(chunks, skipped):
+    """
+    Drop chunks the local pre-filter rules out (contents and index pages,
+    non-medical text) before they reach MCQ generation
+    Each dropped chunk is recorded in skipped with its reason
+    """
+    for chunk in chunks:
+        text, topic = (chunk["text"], chunk.get("topic")) if isinstance(chunk, dict) else (chunk, None)
+        reason = should_skip_chunk(text)
+        if reason:
+            print(f"Skipping chunk ({reason}): {text[:60]!r}")
+            skipped.append({"reason": reason, "topic": topic, "words": count_words(text)})
+            continue
+        yield chunk
+
+def generate_mcqs_for_chunks(client, chunks, max_workers=4, deadline=None):
+    """
+    Generate MCQs for many chunks on a bounded thread pool
+    chunks may be any iterable (including a lazy generator) of texts or
+    {"text", "topic"} dicts from iter_structured_chunks; at most
+    max_workers chunks are in flight, so it is only pulled as fast as the
+    pool drains. deadline is a time.monotonic() value: once it passes no new
+    chunks are started and unfinished ones are abandoned.
+    Returns MCQ blocks in chunk order, per-chunk timings and a timed_out flag
+    """
+    def run(index, chunk):
+        print(f"Processing chunk {index + 1}")
+        started = time.monotonic()
+        text, topic = (chunk["text"], chunk.get("topic")) if isinstance(chunk, dict) else (chunk, None)
+        estimate = estimate_mcq_request(text, topic)
+        mcqs = generate_mcqs_with_assistant(client, text, topic_hint=topic, deadline=deadline)
+        return mcqs, {
+            "chunk": index + 1,
+            "status": "ok" if mcqs else "failed",
+            "elapsed": round(time.monotonic() - started, 3),
+            "words": count_words(text),
+            "topic": topic,
+            "prompt_tokens": estimate["prompt_tokens"],
+            "estimated_cost_usd": estimate["cost_usd"],
+            "estimated_latency": estimate["latency_seconds"],
+            "questions": sum(len(block.get("questions", [])) for block in mcqs)
+        }
+    
+    results = {}
+    timings = {}
+    pending = {}
+    chunk_iter = iter(chunks)
+    next_index = 0
+    exhausted = False
+    timed_out = False
+    executor = ThreadPoolExecutor(max_workers=max(1, max_workers))
+    
+    try:
+        while True:
+            # Keep the pool fed without reading ahead of it
+            while not exhausted and len(pending) < max(1, max_workers):
+                if deadline is not None and time.monotonic() >= deadline:
+                    exhausted = timed_out = True
+                    break
+                chunk = next(chunk_iter, None)
+                if chunk is None:
+                    exhausted = True
+                    break
+                pending[executor.submit(run, next_index, chunk)] = next_index
+                next_index += 1
+            
+            if not pending:
+                break
+            
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            
+            if not done:
+                # Deadline reached with chunks still running
+                timed_out = True
+                for index in pending.values():
+                    timings[index] = {"chunk": index + 1, "status": "timed_out"}
+                break
+            
+            for future in done:
+                index = pending.pop(future)
+                try:
+                    results[index], timings[index] = future.result()
+                except Exception as e:
+                    print(f"Chunk {index + 1} failed: {e}")
+                    timings[index] = {"chunk": index + 1, "status": "failed", "error": str(e)}
+    finally:
+        # Do not block on abandoned chunks once the deadline has passed
+        executor.shutdown(wait=not timed_out, cancel_futures=True)
+    
+    return {
+        "mcqs": [block for index in sorted(results) for block in results[index]],
+        "timings": [timings[index] for index in sorted(timings)],
+        "timed_out": timed_out
+    }
+
+def process_pdf_for_mcqs(pdf_path_or_bytes, api_key=None, max_chunks=4, max_workers=1, time_budget=None,
+                         parallel_extraction=False, near_duplicate_threshold=None, topic_id=None,
+                         chunking="structured"):
     """
     Complete pipeline for processing PDF and generating MCQs
     Optimized for serverless environments
+    max_workers > 1 fans chunks out to a thread pool; time_budget (seconds)
+    bounds the whole run, so max_chunks can be raised (or None for every
+    chunk) and whatever finishes in time is returned
+    parallel_extraction=True extracts all pages up front on a process pool,
+    which beats lazy page reads for large, dense PDFs
+    near_duplicate_threshold also drops reworded duplicates (see deduplicate_mcqs)
+    topic_id also drops MCQs already stored in that topic's question bank
+    chunking="structured" packs whole sections into non-overlapping chunks
+    with their heading as topic hint; "sliding" keeps the old overlapping
+    1200-word windows
     """
+    started = time.monotonic()
+    deadline = started + time_budget if time_budget else None
+    pages = None
+    source = None
+    
     try:
         client = create_openai_client(api_key)
         
-        # Extract text from PDF
-        if isinstance(pdf_path_or_bytes, (bytes, bytearray)):
-            full_text = extract_pdf_text_from_bytes(pdf_path_or_bytes)
+        # Pages are read lazily, so generation starts while later pages are still unread
+        if parallel_extraction:
+            page_texts, _ = extract_pdf_pages_parallel(pdf_path_or_bytes)
+            pages = (text for text in page_texts)
+        elif chunking != "structured":
+            pages = iter_pdf_pages(pdf_path_or_bytes)
+        
+        # Structured chunking reads text blocks (with fonts) instead of page text
+        if chunking == "structured":
+            source = iter_text_blocks(pages) if pages is not None else iter_pdf_blocks(pdf_path_or_bytes)
         else:
-            full_text = extract_pdf_text(pdf_path_or_bytes)
+            source = pages
         
-        if not full_text or len(full_text.strip()) < 100:
+        # Buffer only the leading pages / blocks needed for the sufficiency and relevance checks
+        head = []
+        head_tokens = 0
+        for item in source:
+            head.append(item)
+            head_tokens += _chunk_tokens(item.text if chunking == "structured" else item)
+            if head_tokens >= RELEVANCE_PROMPT_MAX_TOKENS:
+                break
+        head_text = "".join((item.text if chunking == "structured" else item) + " " for item in head)
+        
+        if len(head_text.strip()) < 100:
             return {"error": "Could not extract sufficient text from PDF"}
         
         # Check clinical relevance
-        if not is_clinically_relevant(client, full_text[:2000]):
+        if not is_clinically_relevant(client, head_text):
             return {"error": "PDF content is not clinically relevant for medical education"}
         
-        # Create chunks
-        chunks = sliding_window_chunks(full_text, 1200, 600)
-        if not chunks:
-            return {"error": "Could not create text chunks from PDF"}
+        # Create chunks incrementally from the page / block stream
+        if chunking == "structured":
+            chunks = iter_structured_chunks(itertools.chain(head, source), MCQ_PROMPT_MAX_TOKENS,
+                                            measure=_chunk_tokens, truncate=_truncate_chunk)
+        else:
+            chunks = iter_sliding_window_chunks(iter_words(itertools.chain(head, source)), 1200, 600)
+        
+        # Skipped chunks do not count towards max_chunks
+        skipped_chunks = []
+        chunks = skip_irrelevant_chunks(chunks, skipped_chunks)
         
         # Limit chunks for serverless processing
-        chunks = chunks[:max_chunks]
+        if max_chunks is not None:
+            chunks = itertools.islice(chunks, max_chunks)
         
         # Generate MCQs for each chunk
-        all_mcqs = []
-        for i, chunk in enumerate(chunks):
-            print(f"Processing chunk {i + 1} of {len(chunks)}")
-            mcqs = generate_mcqs_with_assistant(client, chunk)
-            all_mcqs.extend(mcqs)
+        generated = generate_mcqs_for_chunks(client, chunks, max_workers=max_workers, deadline=deadline)
+        all_mcqs = generated["mcqs"]
         
         if not all_mcqs:
             return {"error": "No MCQs could be generated from the PDF content"}
         
         # Deduplicate and return
+        final_mcqs = deduplicate_mcqs(all_mcqs, near_duplicate_threshold)
+        
+        # Drop questions the bank already has before they reach insertion
+        bank_duplicates = []
+        if topic_id is not None:
+            bank_index = get_question_bank_index(topic_id)
+            final_mcqs, bank_duplicates = bank_index.filter_new_mcqs(final_mcqs)
+            if not final_mcqs:
+                return {"error": "All generated MCQs already exist in the question bank",
+                        "bank_duplicates": bank_duplicates}
+        
+        return {
+            "success": True,
+            "mcqs": final_mcqs,
+            "chunks_processed": sum(1 for timing in generated["timings"] if timing["status"] == "ok"),
+            "chunks_skipped": skipped_chunks,
+            "estimated_cost_usd": round(sum(timing.get("estimated_cost_usd", 0) for timing in generated["timings"]), 6),
+            "questions_generated": sum(len(block.get("questions", [])) for block in final_mcqs),
+            "bank_duplicates": bank_duplicates,
+            "chunk_timings": generated["timings"],
+            "timed_out": generated["timed_out"],
+            "elapsed": round(time.monotonic() - started, 3)
+        }
+        
+    except Exception as e:
+        return {"error": f"Failed to process PDF: {str(e)}"}
+    finally:
+        for stream in (source, pages):
+            if stream is not None:
+                stream.close()
+
+async def process_pdf_for_mcqs_async(pdf_path_or_bytes, api_key=None, max_chunks=4, max_concurrency=4, base_url=None,
+                                     chunking="structured"):
+    """
+    Async variant of process_pdf_for_mcqs
+    Chunks are generated concurrently over the shared async client,
+    at most max_concurrency requests at a time, and kept in chunk order
+    """
+    try:
+        client = create_async_openai_client(api_key, base_url)
+        
+        # PyMuPDF is blocking, keep it off the event loop
+        if chunking == "structured":
+            blocks = await asyncio.to_thread(lambda: list(iter_pdf_blocks(pdf_path_or_bytes)))
+            full_text = "".join(block.text + " " for block in blocks)
+        elif isinstance(pdf_path_or_bytes, (bytes, bytearray)):
+            full_text = await asyncio.to_thread(extract_pdf_text_from_bytes, pdf_path_or_bytes)
+        else:
+            full_text = await asyncio.to_thread(extract_pdf_text, pdf_path_or_bytes)
+        
+        if not full_text or len(full_text.strip()) < 100:
+            return {"error": "Could not extract sufficient text from PDF"}
+        
+        if not await is_clinically_relevant_async(client, full_text):
+            return {"error": "PDF content is not clinically relevant for medical education"}
+        
+        if chunking == "structured":
+            chunks = list(iter_structured_chunks(blocks, MCQ_PROMPT_MAX_TOKENS, measure=_chunk_tokens,
+                                                 truncate=_truncate_chunk))
+        else:
+            chunks = [{"text": chunk, "topic": None} for chunk in sliding_window_chunks(full_text, 1200, 600)]
+        if not chunks:
+            return {"error": "Could not create text chunks from PDF"}
+        
+        skipped_chunks = []
+        chunks = list(skip_irrelevant_chunks(chunks, skipped_chunks))[:max_chunks]
+        
+        # Every chunk is known up front, so the run can be priced before dispatch
+        estimates = [estimate_mcq_request(chunk["text"], chunk["topic"]) for chunk in chunks]
+        estimated_cost = round(sum(estimate["cost_usd"] for estimate in estimates), 6)
+        estimated_latency = round(sum(estimate["latency_seconds"] for estimate in estimates) / max(1, min(max_concurrency, len(chunks))), 2)
+        print(f"Generating MCQs for {len(chunks)} chunks: ~{sum(estimate['prompt_tokens'] for estimate in estimates)} prompt tokens, "
+              f"~${estimated_cost}, ~{estimated_latency}s")
+        
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
+        
+        async def generate(index, chunk):
+            async with semaphore:
+                print(f"Processing chunk {index + 1} of {len(chunks)}")
+                return await generate_mcqs_with_assistant_async(client, chunk["text"], topic_hint=chunk["topic"])
+        
+        results = await asyncio.gather(*(generate(i, chunk) for i, chunk in enumerate(chunks)))
+        all_mcqs = [block for mcqs in results for block in mcqs]
+        
+        if not all_mcqs:
+            return {"error": "No MCQs could be generated from the PDF content"}
+        
         final_mcqs = deduplicate_mcqs(all_mcqs)
         
         return {
             "success": True,
             "mcqs": final_mcqs,
             "chunks_processed": len(chunks),
+            "chunks_skipped": skipped_chunks,
+            "estimated_cost_usd": estimated_cost,
+            "estimated_latency": estimated_latency,
             "questions_generated": sum(len(block.get("questions", [])) for block in final_mcqs)
         }
         
@@ -0,0 +1,242 @@
+import os
+import re
+import json
+
+# SQL shared by the lib helpers and the api/ functions.
+# Keeping the statements in one place means the endpoints and the helpers
+# always hit MySQL the same way.
+
+IDENTIFIER_PATTERN = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+
+def get_question_columns():
+    """
+    Get the tblquestion columns to project, from QUESTION_COLUMNS (comma separated)
+    Empty when it is not set: reads then project every column (q.*)
+    """
+    raw = os.getenv("QUESTION_COLUMNS", "")
+    columns = [column.strip() for column in raw.split(",") if column.strip()]
+
+    for column in columns:
+        if not IDENTIFIER_PATTERN.match(column):
+            raise ValueError(f"Invalid column name in QUESTION_COLUMNS: {column}")
+
+    return columns
+
+# MCQ fields the writers (question_store, backfill, explanations) need
+# mapped to tblquestion columns, via
+# TBLQUESTION_COLUMN_MAP='{"question": "...", "A": "...", "B": "...", "C": "...",
+#                          "D": "...", "answer": "...", "explanation": "..."}'
+# There is no default: guessed names would only fail later, mid-write
+QUESTION_MAP_FIELDS = ("question", "A", "B", "C", "D", "answer", "explanation")
+
+def get_question_column_map():
+    """
+    Get the MCQ field -> tblquestion column mapping from TBLQUESTION_COLUMN_MAP
+    Raises ValueError when it is not set or misses a field
+    """
+    raw = os.getenv("TBLQUESTION_COLUMN_MAP")
+    if not raw:
+        raise ValueError("TBLQUESTION_COLUMN_MAP is not set: map the MCQ fields "
+                         f"{', '.join(QUESTION_MAP_FIELDS)} to tblquestion columns (JSON object)")
+    try:
+        column_map = json.loads(raw)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"TBLQUESTION_COLUMN_MAP is not valid JSON: {e}")
+
+    missing = [field for field in QUESTION_MAP_FIELDS if not column_map.get(field)]
+    if missing:
+        raise ValueError(f"TBLQUESTION_COLUMN_MAP is missing fields: {', '.join(missing)}")
+
+    for column in column_map.values():
+        if not IDENTIFIER_PATTERN.match(column):
+            raise ValueError(f"Invalid column name in TBLQUESTION_COLUMN_MAP: {column}")
+
+    return column_map
+
+def get_description_column():
+    """
+    The tblquestion column holding explanations: "description" (the column
+    the original queries used), unless TBLQUESTION_COLUMN_MAP maps it elsewhere
+    """
+    if os.getenv("TBLQUESTION_COLUMN_MAP"):
+        return get_question_column_map()["explanation"]
+    return "description"
+
+def question_projection(alias="q", columns=None):
+    """
+    Column list for reads from tblquestion, qualified with the table alias.
+    Only tblquestion columns are returned, never the topicQueRel ones.
+    columns overrides the QUESTION_COLUMNS projection
+    """
+    columns = list(columns) if columns else get_question_columns()
+    if not columns:
+        return f"{alias}.*"
+
+    # questionId is the pagination key, so it is always projected
+    if "questionId" not in columns:
+        columns.insert(0, "questionId")
+
+    return ", ".join(f"{alias}.`{column}`" for column in columns)
+
+def build_topic_questions_query(topic_id, after=None, limit=None, columns=None):
+    """
+    Fetch the questions linked to a topic in one round trip.
+    The semi-join lets MySQL resolve topicQueRel server side instead of
+    shipping the ID list to Python and back in an IN (...) clause.
+    Rows come back in questionId order so `after` works as a keyset cursor.
+    columns narrows the projection for callers that need specific fields.
+    Returns a (query, params) tuple
+    """
+    query = (
+        f"SELECT {question_projection('q', columns)} FROM tblquestion q "
+        "WHERE q.questionId IN ("
+        "SELECT r.questionId FROM topicQueRel r WHERE r.topicId = %s"
+        ")"
+    )
+    params = [topic_id]
+
+    if after is not None:
+        query += " AND q.questionId > %s"
+        params.append(after)
+
+    query += " ORDER BY q.questionId"
+
+    if limit is not None:
+        query += " LIMIT %s"
+        params.append(limit)
+
+    return query, tuple(params)
+
+def build_question_insert_query(columns, row_count):
+    """
+    Multi-row INSERT into tblquestion for row_count rows of `columns`.
+    cursor.lastrowid is the first new questionId (see question_store.insert_questions
+    for when the others follow from it)
+    """
+    for column in columns:
+        if not IDENTIFIER_PATTERN.match(column):
+            raise ValueError(f"Invalid column name: {column}")
+
+    column_list = ", ".join(f"`{column}`" for column in columns)
+    row_placeholders = "(" + ", ".join(["%s"] * len(columns)) + ")"
+    return f"INSERT INTO tblquestion ({column_list}) VALUES " + ", ".join([row_placeholders] * row_count)
+
+# Auto-increment settings that decide how the IDs of a multi-row INSERT are laid out
+AUTOINC_SETTINGS_QUERY = "SELECT @@innodb_autoinc_lock_mode AS lock_mode, @@auto_increment_increment AS increment"
+
+def build_topic_relation_upsert_query(row_count):
+    """Multi-row topicQueRel insert; links that already exist are left as they are"""
+    return (
+        "INSERT INTO topicQueRel (topicId, questionId) VALUES "
+        + ", ".join(["(%s, %s)"] * row_count)
+        + " ON DUPLICATE KEY UPDATE topicId = topicId"
+    )
+
+def build_description_update_query(row_count, column="description", only_missing=False):
+    """
+    Update the description of row_count questions in one statement.
+    Takes (questionId, description) pairs flattened into params. Joining
+    against a derived table only touches rows that exist, unlike an
+    INSERT ... ON DUPLICATE KEY UPDATE keyed on questionId.
+    only_missing leaves descriptions that are already filled in alone
+    """
+    if not IDENTIFIER_PATTERN.match(column):
+        raise ValueError(f"Invalid column name: {column}")
+
+    rows = " UNION ALL ".join(
+        ["SELECT %s AS questionId, %s AS description"] + ["SELECT %s, %s"] * (row_count - 1)
+    )
+    query = (
+        f"UPDATE tblquestion q JOIN ({rows}) v ON v.questionId = q.questionId "
+        f"SET q.`{column}` = v.description"
+    )
+    if only_missing:
+        query += f" WHERE {missing_description_condition('q', column)}"
+    return query
+
+def build_missing_descriptions_query(topic_id=None, after=None, limit=None, columns=None, count=False):
+    """
+    Questions whose description is NULL or blank, optionally within one topic.
+    Rows come back in questionId order so `after` works as a keyset cursor;
+    count=True returns the matching row count instead.
+    Returns a (query, params) tuple
+    """
+    projection = "COUNT(*) AS count" if count else question_projection("q", columns)
+    query = f"SELECT {projection} FROM tblquestion q WHERE {missing_description_condition('q')}"
+    params = []
+
+    if topic_id is not None:
+        query += " AND q.questionId IN (SELECT r.questionId FROM topicQueRel r WHERE r.topicId = %s)"
+        params.append(topic_id)
+
+    if after is not None:
+        query += " AND q.questionId > %s"
+        params.append(after)
+
+    if not count:
+        query += " ORDER BY q.questionId"
+
+        if limit is not None:
+            query += " LIMIT %s"
+            params.append(limit)
+
+    return query, tuple(params)
+
+def missing_description_condition(alias="q", column=None):
+    """SQL condition matching questions whose description is NULL or blank"""
+    description = column or get_description_column()
+    return f"({alias}.`{description}` IS NULL OR TRIM({alias}.`{description}`) = '')"
+
+def build_topic_missing_count_query():
+    """
+    Count the questions needing descriptions for one topic, found by
+    category, subject name and topic name, in a single round trip.
+    The LEFT JOINs keep a row for a subject without the topic, so callers
+    can still tell "Subject not found" (no row) from "Topic not found"
+    (topicId NULL). Params: (topic_name, category_id, subject_name)
+    """
+    return (
+        "SELECT s.id AS subjectId, t.id AS topicId, COUNT(DISTINCT q.questionId) AS count "
+        "FROM subject s "
+        "LEFT JOIN topics t ON t.subjectId = s.id AND t.topicName = %s "
+        "LEFT JOIN topicQueRel r ON r.topicId = t.id "
+        f"LEFT JOIN tblquestion q ON q.questionId = r.questionId AND {missing_description_condition('q')} "
+        "WHERE s.categoryId = %s AND s.subjectName = %s "
+        "GROUP BY s.id, t.id "
+        "ORDER BY s.id, t.id "
+        "LIMIT 1"
+    )
+
+def build_missing_counts_by_topic_query(category_id=None, subject_id=None):
+    """
+    Missing-description counts for every topic of a subject or a category,
+    in one GROUP BY. Topics without such questions are listed with count 0.
+    Returns a (query, params) tuple
+    """
+    if subject_id is None and category_id is None:
+        raise ValueError("category_id or subject_id is required")
+
+    query = (
+        "SELECT s.categoryId, s.id AS subjectId, s.subjectName, t.id AS topicId, t.topicName, "
+        "COUNT(DISTINCT q.questionId) AS count "
+        "FROM topics t "
+        "JOIN subject s ON s.id = t.subjectId "
+        "LEFT JOIN topicQueRel r ON r.topicId = t.id "
+        f"LEFT JOIN tblquestion q ON q.questionId = r.questionId AND {missing_description_condition('q')} "
+    )
+    if subject_id is not None:
+        query += "WHERE t.subjectId = %s "
+        params = (subject_id,)
+    else:
+        query += "WHERE s.categoryId = %s "
+        params = (category_id,)
+
+    query += (
+        "GROUP BY s.categoryId, s.id, s.subjectName, t.id, t.topicName "
+        "ORDER BY s.id, t.id"
+    )
+    return query, params
+
+def build_question_by_id_query(columns=None):
+    """Fetch one tblquestion row by questionId. Params: (question_id,)"""
+    return f"SELECT {question_projection('q', columns)} FROM tblquestion q WHERE q.questionId = %s"
@@ -0,0 +1,219 @@
+import os
+import time
+import sqlite3
+import hashlib
+import tempfile
+import threading
+import numpy as np
+
+from .database import execute_query
+from .near_dedup import DEFAULT_THRESHOLD, MinHashLSHIndex, mcq_fingerprint_text
+from .queries import build_topic_questions_query, get_question_column_map
+
+def row_to_mcq(row, column_map=None):
+    """Turn a tblquestion row into the MCQ dict shape used by the generator"""
+    column_map = column_map or get_question_column_map()
+    return {
+        "question": row.get(column_map["question"]) or "",
+        "options": {letter: row.get(column_map[letter]) or "" for letter in ("A", "B", "C", "D")},
+        "answer": row.get(column_map["answer"]) or "",
+        "explanation": row.get(column_map["explanation"]) or ""
+    }
+
+def exact_hash(fingerprint_text):
+    """Hash of the normalized question + options, for exact matches"""
+    return hashlib.sha1(fingerprint_text.encode("utf-8")).hexdigest()
+
+class QuestionBankIndex:
+    """
+    Index of the questions already stored in tblquestion for one topic
+    Newly generated MCQs are checked against it before insertion, by exact
+    hash of the normalized question + options and by MinHash/LSH similarity.
+    The index is persisted in a local SQLite file and refreshed
+    incrementally: only questions with a questionId above the last one seen
+    are fetched from MySQL (edits to older rows need rebuild())
+    """
+
+    def __init__(self, topic_id, path=None, threshold=DEFAULT_THRESHOLD):
+        self.topic_id = topic_id
+        self.path = path or get_bank_index_path()
+        self.threshold = threshold
+        self.last_question_id = None
+        self._lsh = MinHashLSHIndex(threshold)
+        self._exact = {}
+        self._lock = threading.Lock()
+
+        self._connection = sqlite3.connect(self.path, check_same_thread=False)
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS bank_questions ("
+            "topic_id INTEGER NOT NULL, question_id INTEGER NOT NULL, exact_hash TEXT NOT NULL, "
+            "signature BLOB NOT NULL, PRIMARY KEY (topic_id, question_id))"
+        )
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS bank_topics (topic_id INTEGER PRIMARY KEY, "
+            "last_question_id INTEGER, refreshed_at REAL)"
+        )
+        self._connection.commit()
+        self._load()
+
+    def __len__(self):
+        return len(self._lsh)
+
+    def _load(self):
+        """Load the persisted entries for this topic into memory"""
+        row = self._connection.execute(
+            "SELECT last_question_id FROM bank_topics WHERE topic_id = ?", (self.topic_id,)
+        ).fetchone()
+        self.last_question_id = row[0] if row else None
+
+        rows = self._connection.execute(
+            "SELECT question_id, exact_hash, signature FROM bank_questions WHERE topic_id = ?", (self.topic_id,)
+        )
+        for question_id, hash_value, signature in rows:
+            self._exact.setdefault(hash_value, question_id)
+            self._lsh.add(question_id, np.frombuffer(signature, dtype=np.uint32))
+
+    def add_questions(self, questions):
+        """Index (question_id, mcq_dict) pairs, e.g. right after inserting them"""
+        entries = []
+        with self._lock:
+            for question_id, question in questions:
+                if question_id in self._lsh:
+                    continue
+                fingerprint = mcq_fingerprint_text(question)
+                hash_value = exact_hash(fingerprint)
+                signature = self._lsh.signature(fingerprint)
+                self._exact.setdefault(hash_value, question_id)
+                self._lsh.add(question_id, signature)
+                entries.append((self.topic_id, question_id, hash_value, signature.tobytes()))
+
+            if entries:
+                self._connection.executemany(
+                    "INSERT OR REPLACE INTO bank_questions (topic_id, question_id, exact_hash, signature) "
+                    "VALUES (?, ?, ?, ?)", entries
+                )
+                self._connection.commit()
+        return len(entries)
+
+    def refresh(self, batch_size=1000):
+        """
+        Pull questions added to the topic since the last refresh, in keyset pages
+        Returns the number of newly indexed questions, or a dict with "error"
+        """
+        started = time.monotonic()
+        column_map = get_question_column_map()
+        columns = ["questionId"] + [column_map[field] for field in ("question", "A", "B", "C", "D")]
+        added = 0
+
+        while True:
+            query, params = build_topic_questions_query(
+                self.topic_id, after=self.last_question_id, limit=batch_size, columns=columns
+            )
+            result = execute_query(query, params)
+            if result.get("error"):
+                return {"error": result["error"]}
+
+            rows = result.get("data", [])
+            if not rows:
+                break
+
+            added += self.add_questions((row["questionId"], row_to_mcq(row, column_map)) for row in rows)
+            self.last_question_id = rows[-1]["questionId"]
+            self._save_progress()
+
+            if len(rows) < batch_size:
+                break
+
+        print(f"Question bank index for topic {self.topic_id}: {added} new, {len(self)} total "
+              f"({time.monotonic() - started:.2f}s)")
+        return added
+
+    def rebuild(self, batch_size=1000):
+        """Drop the persisted entries for this topic and index it again from scratch"""
+        with self._lock:
+            self._connection.execute("DELETE FROM bank_questions WHERE topic_id = ?", (self.topic_id,))
+            self._connection.execute("DELETE FROM bank_topics WHERE topic_id = ?", (self.topic_id,))
+            self._connection.commit()
+            self._lsh = MinHashLSHIndex(self.threshold)
+            self._exact = {}
+            self.last_question_id = None
+        return self.refresh(batch_size)
+
+    def _save_progress(self):
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO bank_topics (topic_id, last_question_id, refreshed_at) VALUES (?, ?, ?)",
+                (self.topic_id, self.last_question_id, time.time())
+            )
+            self._connection.commit()
+
+    def match(self, question):
+        """
+        Check one MCQ against the bank
+        Returns {"match": "exact" | "near" | None, "question_id", "similarity"}
+        """
+        fingerprint = mcq_fingerprint_text(question)
+        question_id = self._exact.get(exact_hash(fingerprint))
+        if question_id is not None:
+            return {"match": "exact", "question_id": question_id, "similarity": 1.0}
+
+        matches = self._lsh.query(self._lsh.signature(fingerprint))
+        if matches:
+            question_id, similarity = matches[0]
+            return {"match": "near", "question_id": question_id, "similarity": round(similarity, 3)}
+
+        return {"match": None, "question_id": None, "similarity": None}
+
+    def match_many(self, questions):
+        """Bulk lookup: one match() result per question, in order"""
+        return [self.match(question) for question in questions]
+
+    def filter_new_mcqs(self, mcq_blocks):
+        """
+        Drop MCQs that already exist in the bank
+        Returns (filtered_blocks, duplicates) where duplicates lists
+        {"question", "match", "question_id", "similarity"} for every dropped MCQ
+        """
+        filtered = []
+        duplicates = []
+        for block in mcq_blocks:
+            topic = block.get("topic") or block.get("temat", "")
+            questions = block.get("questions", [])
+            kept = []
+            for question, result in zip(questions, self.match_many(questions)):
+                if result["match"]:
+                    duplicates.append(dict(result, question=question.get("question", "")))
+                else:
+                    kept.append(question)
+            if kept:
+                filtered.append({"temat": topic, "questions": kept})
+
+        return filtered, duplicates
+
+    def close(self):
+        self._connection.close()
+
+def get_bank_index_path():
+    """Local file for persisted bank indexes (QUESTION_BANK_INDEX_PATH)"""
+    return os.getenv("QUESTION_BANK_INDEX_PATH") or os.path.join(
+        tempfile.gettempdir(), "medfellow_question_bank.sqlite3"
+    )
+
+# Indexes stay loaded for warm invocations
+bank_indexes = {}
+bank_indexes_lock = threading.Lock()
+
+def get_question_bank_index(topic_id, refresh=True):
+    """Get the shared index for a topic, pulling new bank questions first when refresh is set"""
+    with bank_indexes_lock:
+        index = bank_indexes.get(topic_id)
+        if index is None:
+            index = QuestionBankIndex(topic_id)
+            bank_indexes[topic_id] = index
+
+    if refresh:
+        result = index.refresh()
+        if isinstance(result, dict) and result.get("error"):
+            print(f"Question bank refresh failed for topic {topic_id}: {result['error']}")
+
+    return index
@@ -0,0 +1,77 @@
+import re
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Tuple
+
+# Parser for board-style question text:
+#   <question / topic lines>
+#   1) ... 2) ...           numbered statements
+#   A. ... B. ...           answer choices
+#   Prawidłowa odpowiedź: C
+# Each line is classified by its first character, so regexes only run
+# where they can match: the precompiled option pattern on lines starting
+# with a digit, and one combined search for the answer phrases instead of
+# a substring scan per phrase. Whole exported question banks parse in bulk.
+
+ANSWER_PHRASES = ("Prawidłowa odpowiedź", "Correct answer", "Answer:", "Odpowiedź:")
+# Exports with a wrong encoding spell the Polish phrases as UTF-8 read as cp1252
+ANSWER_PHRASES += tuple(phrase.encode("utf-8").decode("cp1252") for phrase in ANSWER_PHRASES if not phrase.isascii())
+
+OPTION_PATTERN = re.compile(r"\d+\)")
+ANSWER_PATTERN = re.compile("|".join(re.escape(phrase) for phrase in ANSWER_PHRASES))
+CHOICE_LETTERS = "ABCDE"
+
+class ParsedQuestion(NamedTuple):
+    main_topic: str
+    options: Tuple[str, ...]
+    answer_choices: Tuple[str, ...]
+    correct_answer: str
+
+    def to_dict(self) -> Dict:
+        """Same shape as GenericBoardStyleMedicalExplainer.parse_question"""
+        return {
+            "main_topic": self.main_topic,
+            "options": list(self.options),
+            "answer_choices": list(self.answer_choices),
+            "correct_answer": self.correct_answer
+        }
+
+def parse_question_text(question_text: str) -> ParsedQuestion:
+    """
+    Split one question into topic, numbered options, answer choices and answer line
+    Topic lines are only those before the first option, choice or answer line;
+    with several answer lines the last one wins
+    """
+    topic_lines = []
+    options = []
+    answer_choices = []
+    correct_answer = ""
+    in_topic = True
+
+    for line in question_text.split("\n"):
+        line = line.strip()
+        if not line:
+            continue
+
+        # Checked in the order parse_question always used: option, choice, answer line
+        first = line[0]
+        if first.isdigit() and OPTION_PATTERN.match(line):
+            options.append(line)
+        elif first in CHOICE_LETTERS and line[1:2] == ".":
+            answer_choices.append(line)
+        elif ANSWER_PATTERN.search(line):
+            correct_answer = line
+        else:
+            if in_topic:
+                topic_lines.append(line)
+            continue
+        in_topic = False
+
+    return ParsedQuestion(" ".join(topic_lines).rstrip(":"), tuple(options), tuple(answer_choices), correct_answer)
+
+def iter_parsed_questions(question_texts: Iterable[str]) -> Iterator[ParsedQuestion]:
+    """Parse a stream of questions (e.g. rows of an exported bank) lazily"""
+    for question_text in question_texts:
+        yield parse_question_text(question_text)
+
+def parse_questions(question_texts: Iterable[str]) -> List[ParsedQuestion]:
+    """Parse many questions in one call"""
+    return [parse_question_text(question_text) for question_text in question_texts]
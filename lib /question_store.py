@@ -0,0 +1,183 @@
+import os
+import time
+import itertools
+
+from .database import get_db_transaction
+from .queries import (
+    AUTOINC_SETTINGS_QUERY,
+    build_description_update_query,
+    build_question_insert_query,
+    build_topic_relation_upsert_query,
+    get_description_column,
+    get_question_column_map
+)
+from .question_bank import get_question_bank_index
+
+# Rows per multi-row statement. Each batch is one transaction, so a failed
+# batch rolls back on its own and earlier batches stay written
+BULK_WRITE_BATCH_SIZE = int(os.getenv("BULK_WRITE_BATCH_SIZE", "500"))
+
+MCQ_FIELDS = ("question", "A", "B", "C", "D", "answer", "explanation")
+
+def iter_batches(items, batch_size):
+    """Yield lists of up to batch_size items"""
+    iterator = iter(items)
+    while True:
+        batch = list(itertools.islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
+
+def mcq_to_row(question):
+    """Values for one MCQ, in MCQ_FIELDS order"""
+    options = question.get("options") or {}
+    values = {
+        "question": question.get("question", ""),
+        "answer": question.get("answer", ""),
+        "explanation": question.get("explanation") or None
+    }
+    for letter in ("A", "B", "C", "D"):
+        values[letter] = options.get(letter, "")
+    return [values[field] for field in MCQ_FIELDS]
+
+# (innodb_autoinc_lock_mode, auto_increment_increment), read once per process
+autoinc_settings = None
+
+def get_autoinc_settings(cursor):
+    """The server's auto-increment lock mode and step"""
+    global autoinc_settings
+    if autoinc_settings is None:
+        cursor.execute(AUTOINC_SETTINGS_QUERY)
+        row = cursor.fetchone()
+        autoinc_settings = (int(row["lock_mode"]), int(row["increment"]))
+    return autoinc_settings
+
+def insert_questions(cursor, batch, columns):
+    """
+    INSERT a batch of MCQs into tblquestion and return their questionIds, in batch order.
+    With innodb_autoinc_lock_mode 0 or 1 (traditional / consecutive), a
+    multi-row INSERT with a known row count gets one block of IDs: the first
+    is cursor.lastrowid and the rest follow at auto_increment_increment steps,
+    ROW_COUNT() (cursor.rowcount) of them. Mode 2 (interleaved) does not
+    guarantee that block, so there every row is inserted on its own and its
+    lastrowid collected, still within the caller's transaction
+    """
+    lock_mode, increment = get_autoinc_settings(cursor)
+
+    if lock_mode in (0, 1):
+        params = [value for question in batch for value in mcq_to_row(question)]
+        cursor.execute(build_question_insert_query(columns, len(batch)), params)
+        if cursor.rowcount != len(batch):
+            raise RuntimeError(f"Inserted {cursor.rowcount} of {len(batch)} questions")
+        first_id = cursor.lastrowid
+        return list(range(first_id, first_id + len(batch) * increment, increment))
+
+    query = build_question_insert_query(columns, 1)
+    batch_ids = []
+    for question in batch:
+        cursor.execute(query, mcq_to_row(question))
+        batch_ids.append(cursor.lastrowid)
+    return batch_ids
+
+def write_report(label, rows, batches, started, failed=0, error=None):
+    """Timing summary shared by the bulk writers"""
+    elapsed = time.monotonic() - started
+    report = {
+        "rows": rows,
+        "batches": batches,
+        "failed_rows": failed,
+        "elapsed": round(elapsed, 3),
+        "rows_per_sec": round(rows / elapsed, 1) if elapsed > 0 else 0.0
+    }
+    if error:
+        report["error"] = error
+    print(f"{label}: {rows} rows in {batches} batches, {report['elapsed']}s ({report['rows_per_sec']} rows/s)")
+    return report
+
+def save_mcqs(topic_id, mcq_blocks, batch_size=None, skip_existing=True):
+    """
+    Insert generated MCQ blocks into tblquestion and link them to topic_id.
+    Each batch is one multi-row INSERT into tblquestion (row by row under
+    interleaved auto-increment locking, see insert_questions) plus one
+    multi-row topicQueRel upsert, in a single transaction. With skip_existing, MCQs
+    already in the topic's question bank are dropped first and the new
+    rows are added to the bank index afterwards.
+    Returns the write report plus "question_ids" and "skipped"
+    """
+    batch_size = batch_size or BULK_WRITE_BATCH_SIZE
+    started = time.monotonic()
+    column_map = get_question_column_map()
+    columns = [column_map[field] for field in MCQ_FIELDS]
+
+    bank_index = None
+    skipped = []
+    if skip_existing:
+        bank_index = get_question_bank_index(topic_id)
+        mcq_blocks, skipped = bank_index.filter_new_mcqs(mcq_blocks)
+
+    questions = [question for block in mcq_blocks for question in block.get("questions", [])]
+    question_ids = []
+    rows = 0
+    failed = 0
+    batches = 0
+    error = None
+
+    for batch in iter_batches(questions, batch_size):
+        try:
+            with get_db_transaction() as cursor:
+                batch_ids = insert_questions(cursor, batch, columns)
+
+                relation_params = [value for question_id in batch_ids for value in (topic_id, question_id)]
+                cursor.execute(build_topic_relation_upsert_query(len(batch)), relation_params)
+        except Exception as e:
+            print(f"MCQ insert batch failed: {e}")
+            error = str(e)
+            failed += len(batch)
+            continue
+
+        question_ids.extend(batch_ids)
+        rows += len(batch)
+        batches += 1
+        if bank_index is not None:
+            bank_index.add_questions(zip(batch_ids, batch))
+
+    report = write_report("Saved MCQs", rows, batches, started, failed=failed, error=error)
+    report["question_ids"] = question_ids
+    report["skipped"] = skipped
+    return report
+
+def update_descriptions(updates, batch_size=None, only_missing=False):
+    """
+    Write explanations to tblquestion.description.
+    updates is an iterable of (question_id, description) pairs; each batch
+    is one UPDATE ... JOIN statement in its own transaction. only_missing
+    only fills descriptions that are NULL or blank; "updated" in the report
+    counts the rows actually changed
+    """
+    batch_size = batch_size or BULK_WRITE_BATCH_SIZE
+    started = time.monotonic()
+    column = get_description_column()
+    updated = 0
+    rows = 0
+    failed = 0
+    batches = 0
+    error = None
+
+    for batch in iter_batches(updates, batch_size):
+        try:
+            with get_db_transaction() as cursor:
+                params = [value for question_id, description in batch for value in (question_id, description)]
+                cursor.execute(build_description_update_query(len(batch), column, only_missing), params)
+                updated += cursor.rowcount
+        except Exception as e:
+            print(f"Description update batch failed: {e}")
+            error = str(e)
+            failed += len(batch)
+            continue
+
+        rows += len(batch)
+        batches += 1
+
+    report = write_report("Updated descriptions", rows, batches, started, failed=failed, error=error)
+    report["updated"] = updated
+    return report
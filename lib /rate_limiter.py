@@ -0,0 +1,328 @@
+import os
+import time
+import random
+import asyncio
+import threading
+import openai
+
+from .tokens import estimate_message_tokens
+
+# Client-side scheduling for OpenAI calls.
+# Every chat completion reserves one request and its estimated tokens from
+# per-model RPM / TPM buckets before it is sent. Buckets may go into debt:
+# the debt is the queue of callers ahead, so a caller sleeps until its share
+# of the budget refills instead of firing a request that would come back
+# as a 429. Budgets are per process; with several instances, set the limits
+# to each instance's share of the organization limit.
+
+OPENAI_RPM_LIMIT = float(os.getenv("OPENAI_RPM_LIMIT", "500"))
+OPENAI_TPM_LIMIT = float(os.getenv("OPENAI_TPM_LIMIT", "200000"))
+OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "4"))
+
+# Burst allowance: how many seconds of budget can be spent at once
+BURST_SECONDS = 10.0
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 30.0
+
+# Share of the configured rate kept after a 429, and regained per success
+THROTTLE_FACTOR = 0.5
+RECOVERY_STEP = 0.05
+MIN_RATE_FACTOR = 0.1
+
+# 429s within this many seconds of a cut come from requests already in
+# flight, so they do not cut the rate again
+THROTTLE_COOLDOWN = 5.0
+
+# Least time left before a deadline that is worth starting an attempt with
+MIN_ATTEMPT_TIME = 2.0
+
+def estimate_request_tokens(messages, max_tokens=None, model=None):
+    """
+    Token cost of a chat request: prompt tokens plus the completion budget.
+    Reservations are settled against the reported usage, so the word-based
+    estimate is enough and no request waits on loading a tokenizer
+    """
+    return estimate_message_tokens(messages) + (max_tokens or 0)
+
+def retry_after_seconds(error):
+    """Server-requested delay from Retry-After / retry-after-ms headers, if any"""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000.0
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except (TypeError, ValueError):
+        return None
+    return None
+
+def is_retryable_error(error, timeout=None):
+    """
+    Rate limits, timeouts, connection failures and server errors are worth retrying
+    A timeout the caller set itself is not: the caller chose how long to wait
+    """
+    if timeout is not None and isinstance(error, openai.APITimeoutError):
+        return False
+    if isinstance(error, (openai.APIConnectionError, openai.RateLimitError, openai.InternalServerError)):
+        return True
+    status = getattr(error, "status_code", None)
+    return status in (408, 409, 429) or (status is not None and status >= 500)
+
+def remaining_time(deadline):
+    """Seconds left until a time.monotonic() deadline (None: no deadline)"""
+    return None if deadline is None else deadline - time.monotonic()
+
+def backoff_delay(attempt):
+    """Exponential backoff with equal jitter, so retrying callers spread out"""
+    delay = min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+class RateLimiter:
+    """
+    Adaptive RPM / TPM budget for one model.
+    A 429 pauses every caller until Retry-After has passed and halves the
+    refill rate; each success wins back a little of it, so throughput
+    settles just under the limit the server actually enforces
+    """
+
+    def __init__(self, rpm=OPENAI_RPM_LIMIT, tpm=OPENAI_TPM_LIMIT):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.request_capacity = max(1.0, rpm * BURST_SECONDS / 60.0)
+        self.token_capacity = max(1.0, tpm * BURST_SECONDS / 60.0)
+        self.rate_factor = 1.0
+
+        self._requests = self.request_capacity
+        self._tokens = self.token_capacity
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._throttled_at = None
+        self._lock = threading.Lock()
+        self._stats = {
+            "requests": 0,
+            "succeeded": 0,
+            "failed": 0,
+            "retries": 0,
+            "rate_limited": 0,
+            "queued": 0,
+            "wait_time_total": 0.0,
+            "wait_time_max": 0.0
+        }
+
+    def _refill_locked(self, now):
+        elapsed = now - self._updated
+        self._updated = now
+        self._requests = min(self.request_capacity, self._requests + elapsed * self.rpm / 60.0 * self.rate_factor)
+        self._tokens = min(self.token_capacity, self._tokens + elapsed * self.tpm / 60.0 * self.rate_factor)
+
+    def reserve(self, tokens):
+        """Take one request and `tokens` from the budget; returns how long to wait before sending"""
+        tokens = min(float(tokens), self.token_capacity)
+        with self._lock:
+            now = time.monotonic()
+            self._refill_locked(now)
+            self._requests -= 1
+            self._tokens -= tokens
+
+            wait = max(
+                -self._requests / (self.rpm / 60.0 * self.rate_factor) if self._requests < 0 else 0.0,
+                -self._tokens / (self.tpm / 60.0 * self.rate_factor) if self._tokens < 0 else 0.0,
+                self._blocked_until - now
+            )
+            self._stats["requests"] += 1
+            if wait > 0:
+                self._stats["queued"] += 1
+                self._stats["wait_time_total"] += wait
+                self._stats["wait_time_max"] = max(self._stats["wait_time_max"], wait)
+            return max(wait, 0.0)
+
+    def settle(self, reserved_tokens, used_tokens):
+        """Give back the part of a reservation the response did not use"""
+        if used_tokens is None:
+            return
+        reserved_tokens = min(float(reserved_tokens), self.token_capacity)
+        with self._lock:
+            self._tokens = min(self.token_capacity, self._tokens + max(0.0, reserved_tokens - used_tokens))
+
+    def refund(self, reserved_tokens, request=False):
+        """
+        Give back the whole token reservation of an attempt that failed or was never sent
+        request=True also returns the request slot, for an attempt that was never sent
+        """
+        self.settle(reserved_tokens, 0)
+        if request:
+            with self._lock:
+                self._requests = min(self.request_capacity, self._requests + 1)
+
+    def record_success(self):
+        with self._lock:
+            self._stats["succeeded"] += 1
+            self.rate_factor = min(1.0, self.rate_factor + RECOVERY_STEP)
+
+    def record_failure(self, error, retrying):
+        """Account for a failed attempt; 429s slow every caller of this model down"""
+        with self._lock:
+            if retrying:
+                self._stats["retries"] += 1
+            else:
+                self._stats["failed"] += 1
+
+            if getattr(error, "status_code", None) == 429:
+                self._stats["rate_limited"] += 1
+                now = time.monotonic()
+                if self._throttled_at is None or now - self._throttled_at >= THROTTLE_COOLDOWN:
+                    self.rate_factor = max(MIN_RATE_FACTOR, self.rate_factor * THROTTLE_FACTOR)
+                    self._throttled_at = now
+                retry_after = retry_after_seconds(error)
+                if retry_after:
+                    self._blocked_until = max(self._blocked_until, now + retry_after)
+
+    def _retry_delay(self, error, attempt):
+        retry_after = retry_after_seconds(error)
+        delay = backoff_delay(attempt)
+        return max(delay, retry_after) if retry_after else delay
+
+    def _check_wait(self, wait, estimated_tokens, deadline):
+        """
+        Raise TimeoutError when the queue wait outlasts the deadline
+        The request is never sent, so its request slot and tokens are both refunded
+        """
+        remaining = remaining_time(deadline)
+        if remaining is not None and (remaining <= 0 or (wait > 0 and wait + MIN_ATTEMPT_TIME > remaining)):
+            self.refund(estimated_tokens, request=True)
+            with self._lock:
+                self._stats["failed"] += 1
+            raise TimeoutError(f"OpenAI request would wait {wait:.1f}s for the rate limit, {max(remaining, 0.0):.1f}s left")
+
+    def _plan_retry(self, error, attempt, max_retries, timeout, deadline, attempt_time):
+        """
+        Delay before the next attempt, or None to give up: not retryable, out of
+        retries, or the deadline cannot cover the delay plus another attempt
+        (as long as the failed one took, at least MIN_ATTEMPT_TIME)
+        """
+        if not is_retryable_error(error, timeout) or attempt >= max_retries:
+            return None
+        delay = self._retry_delay(error, attempt)
+        remaining = remaining_time(deadline)
+        if remaining is not None and delay + max(attempt_time, MIN_ATTEMPT_TIME) > remaining:
+            return None
+        return delay
+
+    def call(self, request, estimated_tokens, max_retries=OPENAI_MAX_RETRIES, timeout=None, deadline=None):
+        """
+        Run request() within the budget, retrying retryable failures with backoff
+        timeout is the per-attempt timeout the request was given (timeouts are
+        then not retried); deadline is a time.monotonic() value after which no
+        attempt is started or waited for
+        """
+        attempt = 0
+        while True:
+            wait = self.reserve(estimated_tokens)
+            self._check_wait(wait, estimated_tokens, deadline)
+            if wait > 0:
+                time.sleep(wait)
+
+            attempt_started = time.monotonic()
+            try:
+                response = request()
+            except Exception as e:
+                self.refund(estimated_tokens)
+                delay = self._plan_retry(e, attempt, max_retries, timeout, deadline, time.monotonic() - attempt_started)
+                self.record_failure(e, delay is not None)
+                if delay is None:
+                    raise
+                print(f"OpenAI request failed ({e.__class__.__name__}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+                attempt += 1
+                continue
+
+            self.record_success()
+            self.settle(estimated_tokens, response_tokens(response))
+            return response
+
+    async def call_async(self, request, estimated_tokens, max_retries=OPENAI_MAX_RETRIES, timeout=None, deadline=None):
+        """Async variant of call(); request() returns an awaitable"""
+        attempt = 0
+        while True:
+            wait = self.reserve(estimated_tokens)
+            self._check_wait(wait, estimated_tokens, deadline)
+            if wait > 0:
+                await asyncio.sleep(wait)
+
+            attempt_started = time.monotonic()
+            try:
+                response = await request()
+            except Exception as e:
+                self.refund(estimated_tokens)
+                delay = self._plan_retry(e, attempt, max_retries, timeout, deadline, time.monotonic() - attempt_started)
+                self.record_failure(e, delay is not None)
+                if delay is None:
+                    raise
+                print(f"OpenAI request failed ({e.__class__.__name__}), retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+
+            self.record_success()
+            self.settle(estimated_tokens, response_tokens(response))
+            return response
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats.update({
+                "rpm": self.rpm,
+                "tpm": self.tpm,
+                "rate_factor": round(self.rate_factor, 3),
+                "requests_available": round(self._requests, 2),
+                "tokens_available": round(self._tokens, 1)
+            })
+        stats["wait_time_total"] = round(stats["wait_time_total"], 3)
+        stats["wait_time_max"] = round(stats["wait_time_max"], 3)
+        return stats
+
+def response_tokens(response):
+    usage = getattr(response, "usage", None)
+    return getattr(usage, "total_tokens", None) if usage else None
+
+# One limiter per model, shared by every caller in the process
+rate_limiters = {}
+rate_limiters_lock = threading.Lock()
+
+def get_rate_limiter(model):
+    """Get the shared limiter for a model (limits from OPENAI_RPM_LIMIT / OPENAI_TPM_LIMIT)"""
+    with rate_limiters_lock:
+        limiter = rate_limiters.get(model)
+        if limiter is None:
+            limiter = RateLimiter()
+            rate_limiters[model] = limiter
+        return limiter
+
+def attempt_kwargs(kwargs, deadline):
+    """Request kwargs for one attempt: the timeout never reaches past the deadline"""
+    remaining = remaining_time(deadline)
+    if remaining is None:
+        return kwargs
+    timeout = kwargs.get("timeout")
+    return dict(kwargs, timeout=max(0.1, remaining if timeout is None else min(timeout, remaining)))
+
+def create_chat_completion(client, deadline=None, **kwargs):
+    """
+    client.chat.completions.create(**kwargs), scheduled and retried by the model's limiter
+    deadline (a time.monotonic() value) bounds the whole call, retries included
+    """
+    limiter = get_rate_limiter(kwargs.get("model"))
+    tokens = estimate_request_tokens(kwargs.get("messages"), kwargs.get("max_tokens"), kwargs.get("model"))
+    return limiter.call(lambda: client.chat.completions.create(**attempt_kwargs(kwargs, deadline)), tokens,
+                        timeout=kwargs.get("timeout"), deadline=deadline)
+
+async def create_chat_completion_async(client, deadline=None, **kwargs):
+    """Async variant of create_chat_completion for AsyncOpenAI clients"""
+    limiter = get_rate_limiter(kwargs.get("model"))
+    tokens = estimate_request_tokens(kwargs.get("messages"), kwargs.get("max_tokens"), kwargs.get("model"))
+    return await limiter.call_async(lambda: client.chat.completions.create(**attempt_kwargs(kwargs, deadline)), tokens,
+                                    timeout=kwargs.get("timeout"), deadline=deadline)
@@ -0,0 +1,166 @@
+import re
+
+# Local pre-filter for clinical relevance.
+# One tokenizing pass counts words from a Polish and English medical
+# vocabulary (stems are looked up by prefix in hash sets); the share of such
+# words decides clear cases on the spot and leaves the rest for the LLM
+# check. A whole document is only ever accepted locally: its first pages are
+# often front matter (title, copyright, foreword) that scores like
+# non-medical text. The same pass spots navigation pages (table of
+# contents, index), which hold no content to write questions about.
+
+# Word stems matched as prefixes (case-insensitive)
+MEDICAL_STEMS = (
+    # Polish
+    "lecz", "chorob", "choró", "chorz", "pacjent", "objaw", "rozpozn", "diagnost", "zapal", "zakaż", "zakaz",
+    "bakter", "wirus", "wirusow", "grzybic", "niewydoln", "nadciśnien", "niedociśnien", "cukrzyc", "serc", "płuc",
+    "nerk", "nerek", "wątrob", "krwi", "krwaw", "krwot", "gorączk", "bólu", "bólow", "bólów", "dawk", "leków", "lekow",
+    "medyc", "lekarz", "lekarsk", "pielęgn", "szczepi", "zdrowot", "niedobór",
+    "antybiot", "terapi", "terapeut", "zabieg", "operac", "chirurg", "szpital", "badani", "kliniczn", "patolog",
+    "fizjolog", "farmakolog", "farmakoter", "przewlekł", "niedokrwist", "zawał", "udar", "nowotw", "przerzut",
+    "chemioter", "radioter", "immunolog", "odporn", "alergi", "astm", "tętnic", "żylak", "żyln", "mózg",
+    "neurolog", "kardiolog", "onkolog", "pediatr", "ginekolog", "położni", "ciąż", "noworod", "hormon", "insulin",
+    "glukoz", "cholesterol", "hemoglobin", "leukocyt", "erytrocyt", "płytek", "płytk", "osocz", "surowic", "mocz",
+    "tomograf", "rezonans", "biopsj", "histopatolog", "etiolog", "patogenez", "epidemiolog", "rokowan", "powikłan",
+    "przeciwwskaz", "przeciwzapal", "przeciwból", "niedobor", "infekc", "sepsa", "septyczn",
+    "wstrząs", "oddech", "duszno", "kaszel", "kaszl", "biegunk", "wymiot", "nudnoś", "obrzęk", "zakrzep",
+    "zator", "miażdżyc", "arytmi", "migotan", "tachykard", "bradykard", "anemi",
+    # English
+    "patient", "diagnos", "treat", "therap", "clinic", "disease", "disorder", "syndrom", "symptom", "infect",
+    "bacteri", "viral", "virus", "fever", "febrile", "dosage", "drug", "medic", "antibiot", "surg", "hospital",
+    "patholog", "physiolog", "pharmac", "chronic", "acute", "anemi", "anaemi", "cardi", "heart", "lung", "pulmon",
+    "renal", "kidney", "liver", "hepat", "blood", "bleed", "haemorrh", "hemorrh", "hypertens", "hypotens",
+    "diabet", "insulin", "glucose", "tumor", "tumour", "cancer", "carcinom", "metasta", "oncolog", "chemother",
+    "radiother", "immun", "allerg", "physician", "internist", "nurs", "asthma", "arter", "venous", "thromb", "embol", "neurolog", "brain", "stroke",
+    "infarct", "pediatr", "paediatr", "obstet", "gynec", "gynaec", "pregnan", "neonat", "hormon", "cholesterol",
+    "hemoglobin", "haemoglobin", "leukocyt", "lymphocyt", "neutrophil", "platelet", "plasma", "serum", "urin",
+    "ultrasound", "radiograph", "tomograph", "biops", "histolog", "etiolog", "aetiolog", "epidemiolog", "prognos",
+    "complicat", "contraindic", "inflamm", "sepsis", "septic", "dyspn", "cough", "diarrh", "vomit", "nausea",
+    "oedema", "edema", "arrhythm", "fibrillat", "tachycard", "bradycard", "atheroscl", "mortality", "morbidity"
+)
+
+# Short terms matched as whole words only (as stems they match unrelated words)
+MEDICAL_WORDS = (
+    "lek", "leki", "leku", "lekiem", "rak", "raka", "guz", "guza", "ból", "bóle", "ostry", "ostra", "ostre",
+    "krew", "interna", "interny",
+    "mg", "ml", "mmol", "mmhg", "iu", "ekg", "ecg", "usg", "rtg", "mri", "ct", "hiv", "copd", "pochp", "dose", "doses",
+    "pain", "vein", "veins", "ards", "bmi"
+)
+
+# Headings of navigation pages
+NAVIGATION_KEYWORDS = ("spis treści", "table of contents", "contents", "skorowidz", "indeks", "index", "bibliografia", "piśmiennictwo", "references")
+
+MEDICAL_STEM_SET = frozenset(MEDICAL_STEMS)
+MEDICAL_STEM_LENGTHS = sorted({len(stem) for stem in MEDICAL_STEMS})
+MEDICAL_WORD_SET = frozenset(MEDICAL_WORDS)
+
+WORD_PATTERN = re.compile(r"[^\W\d_]+|\d+", re.UNICODE)
+# Dot leaders ("Anemia ........ 45")
+LEADER_PATTERN = re.compile(r"(?:\.\s?){4,}|…{2,}")
+# Words and symbols after a number that make it a measurement, not a page
+# ("sodium 135 mmol/L", "dose 500 mg", "130 to 170")
+NUMBER_UNITS = (
+    "mg", "g", "mcg", "µg", "μg", "ug", "kg", "ml", "l", "dl", "mmol", "µmol", "μmol", "mol", "meq", "mmhg",
+    "iu", "j", "jm", "u", "mm", "cm", "h", "min", "x", "×", "%", "/", "to", "do", "and", "i", "or", "lub"
+)
+# A term followed by trailing page numbers ("anemia, 45, 112", "Choroby serca 12")
+PAGE_REFERENCE_PATTERN = re.compile(
+    r"[^\W\d_]{3,}[,:]?\s+\d{1,4}(?:\s*[,–-]\s*\d{1,4})*(?=\s|$)"
+    r"(?!\s*(?:" + "|".join(re.escape(unit) for unit in NUMBER_UNITS) + r")(?![^\W\d_]))",
+    re.UNICODE | re.IGNORECASE
+)
+# End of a prose sentence (a lower-case word, then the stop)
+SENTENCE_END_PATTERN = re.compile(r"[^\W\d_A-ZĄĆĘŁŃÓŚŹŻ]{2,}[.!?](?=\s|$)", re.UNICODE)
+
+# Share of medical words that settles the verdict without the LLM
+ACCEPT_DENSITY = 0.05
+REJECT_DENSITY = 0.01
+ACCEPT_MIN_TERMS = 5
+# Below this many words there is not enough evidence either way
+MIN_WORDS = 40
+
+# Thresholds for navigation pages
+NAVIGATION_NUMBER_RATIO = 0.2
+NAVIGATION_MIN_LEADERS = 3
+NAVIGATION_MIN_REFERENCES = 5
+
+def is_medical_word(word):
+    """word must be lower-case"""
+    if word in MEDICAL_WORD_SET:
+        return True
+    for length in MEDICAL_STEM_LENGTHS:
+        if length > len(word):
+            break
+        if word[:length] in MEDICAL_STEM_SET:
+            return True
+    return False
+
+def score_text(text):
+    """Word count, medical term count, number share and navigation cues of a text"""
+    words = WORD_PATTERN.findall(text.lower())
+    word_count = len(words)
+    numbers = sum(1 for word in words if word.isdigit())
+
+    return {
+        "words": word_count,
+        "medical_terms": sum(1 for word in words if is_medical_word(word)),
+        "number_ratio": numbers / word_count if word_count else 0.0,
+        "leaders": len(LEADER_PATTERN.findall(text)),
+        "page_references": len(PAGE_REFERENCE_PATTERN.findall(text)),
+        "sentences": len(SENTENCE_END_PATTERN.findall(text)),
+        "navigation_heading": any(keyword in text[:200].lower() for keyword in NAVIGATION_KEYWORDS)
+    }
+
+def is_navigation_text(text, scores=None):
+    """True for table of contents, index and similar pages"""
+    scores = scores or score_text(text)
+    if not scores["words"]:
+        return True
+
+    # A contents page at the start of a chunk of prose does not make it navigation
+    entries = max(scores["leaders"], scores["page_references"])
+    if scores["sentences"] * 2 >= entries:
+        return False
+
+    # Only dot leaders and trailing page numbers count; a heading such as
+    # "Index" just lowers the bar for them
+    if scores["leaders"] >= NAVIGATION_MIN_LEADERS:
+        return True
+    number_ratio = NAVIGATION_NUMBER_RATIO / 2 if scores["navigation_heading"] else NAVIGATION_NUMBER_RATIO
+    return scores["number_ratio"] >= number_ratio and scores["page_references"] >= NAVIGATION_MIN_REFERENCES
+
+def classify_relevance(text):
+    """
+    Local relevance verdict for a text: ("relevant" | "irrelevant" | "uncertain", scores)
+    "irrelevant" is meant for single chunks (see should_skip_chunk); for a
+    whole document only "relevant" is final
+    """
+    scores = score_text(text or "")
+    scores["density"] = round(scores["medical_terms"] / scores["words"], 4) if scores["words"] else 0.0
+
+    if scores["words"] < MIN_WORDS:
+        return "uncertain", scores
+    if scores["density"] >= ACCEPT_DENSITY and scores["medical_terms"] >= ACCEPT_MIN_TERMS:
+        # Contents and index pages of a medical book are dense with headings,
+        # not content; they need the dot leaders or page numbers to match
+        if is_navigation_text(text, scores):
+            return "uncertain", scores
+        return "relevant", scores
+    if scores["density"] < REJECT_DENSITY:
+        return "irrelevant", scores
+    return "uncertain", scores
+
+def should_skip_chunk(text):
+    """
+    Reason to skip MCQ generation for a chunk (navigation / not medical), or None
+    A chunk dense with medical terms is never skipped: lab tables and dosing
+    schedules are full of numbers but are content, not navigation
+    """
+    verdict, scores = classify_relevance(text)
+    if verdict == "relevant":
+        return None
+    if is_navigation_text(text, scores):
+        return "navigation"
+    if verdict == "irrelevant":
+        return "not_medical"
+    return None
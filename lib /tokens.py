@@ -0,0 +1,185 @@
+import os
+import re
+import math
+import time
+import threading
+from functools import lru_cache
+
+# Encoding files written into the deployment by the Vercel build
+# (buildCommand in vercel_config.json runs prefetch_tiktoken.py), so a cold
+# start does not download them. Only used when the directory exists: a
+# missing one would make tiktoken try to write into the read-only bundle
+TIKTOKEN_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tiktoken_cache")
+if os.path.isdir(TIKTOKEN_CACHE_DIR):
+    os.environ.setdefault("TIKTOKEN_CACHE_DIR", TIKTOKEN_CACHE_DIR)
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+# Token counting for prompt budgets and cost estimates.
+# With tiktoken installed, counts are exact for the model's encoding;
+# otherwise (or when the encoding cannot be loaded) a word-based estimate
+# is used, which errs on the high side so budgets are not overrun.
+
+DEFAULT_MODEL = "gpt-4o-mini"
+FALLBACK_ENCODING = "o200k_base"
+
+# Chat framing overhead per message and per reply (OpenAI's published counting rules)
+TOKENS_PER_MESSAGE = 3
+TOKENS_PER_REPLY = 3
+
+# Encodings of the models below, fetched by prefetch_tiktoken.py
+PREFETCH_ENCODINGS = ("o200k_base", "cl100k_base")
+
+# USD per million tokens (input, output); unknown models are priced as gpt-4o-mini
+MODEL_PRICING = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4-turbo": (10.00, 30.00),
+    "gpt-3.5-turbo": (0.50, 1.50)
+}
+
+# Rough latency model: time to first token plus output tokens per second
+MODEL_LATENCY = {
+    "gpt-4o-mini": (0.5, 80.0),
+    "gpt-4o": (0.7, 60.0),
+    "gpt-4-turbo": (1.0, 30.0),
+    "gpt-3.5-turbo": (0.4, 90.0)
+}
+
+# Share of max_tokens a reply is expected to use
+EXPECTED_COMPLETION_RATIO = float(os.getenv("EXPECTED_COMPLETION_RATIO", "0.6"))
+
+# No token is longer than this, so a prefix this long always covers a budget
+MAX_CHARS_PER_TOKEN = 16
+
+# Longer texts are counted without being kept in the count cache
+COUNT_CACHE_MAX_CHARS = 20000
+
+TOKEN_PIECE_PATTERN = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+
+# After a failed load (e.g. the encoding download timed out), counts are
+# estimated for this long before the load is tried again
+ENCODING_RETRY_SECONDS = float(os.getenv("ENCODING_RETRY_SECONDS", "60"))
+
+# Loaded encodings by model, and when loading one last failed
+encodings = {}
+encoding_failures = {}
+encoding_lock = threading.Lock()
+
+def get_encoding(model=DEFAULT_MODEL):
+    """
+    tiktoken encoding for a model, loaded once per process; None when unavailable.
+    Failures are not kept: the load is retried after ENCODING_RETRY_SECONDS
+    """
+    if tiktoken is None:
+        return None
+    encoding = encodings.get(model)
+    if encoding is not None:
+        return encoding
+    failed_at = encoding_failures.get(model)
+    if failed_at is not None and time.monotonic() - failed_at < ENCODING_RETRY_SECONDS:
+        return None
+
+    with encoding_lock:
+        if model in encodings:
+            return encodings[model]
+        try:
+            try:
+                encoding = tiktoken.encoding_for_model(model)
+            except KeyError:
+                encoding = tiktoken.get_encoding(FALLBACK_ENCODING)
+        except Exception as e:
+            # Encodings are downloaded on first use, which can fail offline
+            encoding_failures[model] = time.monotonic()
+            print(f"Tokenizer unavailable for {model}, estimating token counts: {e}")
+            return None
+        encodings[model] = encoding
+        encoding_failures.pop(model, None)
+        return encoding
+
+def estimate_tokens(text):
+    """Token estimate without a tokenizer: one token per 4 characters of each word or symbol"""
+    return sum(math.ceil(len(piece) / 4) for piece in TOKEN_PIECE_PATTERN.findall(text))
+
+def _count_tokens(text, model):
+    return len(get_encoding(model).encode(text, disallowed_special=()))
+
+# Prompts, chunks and headings are counted repeatedly while packing and budgeting.
+# Only exact counts are cached, so estimates made while the encoding was
+# unavailable are not served once it loads
+_count_tokens_cached = lru_cache(maxsize=1024)(_count_tokens)
+
+def count_tokens(text, model=DEFAULT_MODEL):
+    """Number of tokens in text for a model"""
+    if not text:
+        return 0
+    if get_encoding(model) is None:
+        return estimate_tokens(text)
+    if len(text) > COUNT_CACHE_MAX_CHARS:
+        return _count_tokens(text, model)
+    return _count_tokens_cached(text, model)
+
+def truncate_to_tokens(text, max_tokens, model=DEFAULT_MODEL):
+    """Longest prefix of text that fits in max_tokens, cut at a word boundary"""
+    if not text:
+        return text
+    # Whole documents can be passed in; only their head can matter
+    text = text[:max_tokens * MAX_CHARS_PER_TOKEN]
+    if count_tokens(text, model) <= max_tokens:
+        return text
+
+    encoding = get_encoding(model)
+    if encoding is not None:
+        prefix = encoding.decode(encoding.encode(text, disallowed_special=())[:max_tokens])
+    else:
+        used = 0
+        end = 0
+        for match in TOKEN_PIECE_PATTERN.finditer(text):
+            used += math.ceil(len(match.group()) / 4)
+            if used > max_tokens:
+                break
+            end = match.end()
+        prefix = text[:end]
+
+    # Do not end on a partial word
+    cut = prefix.rfind(" ")
+    if cut > len(prefix) // 2:
+        prefix = prefix[:cut]
+    while prefix and count_tokens(prefix, model) > max_tokens:
+        prefix = prefix[:int(len(prefix) * 0.9)]
+    return prefix
+
+def count_message_tokens(messages, model=DEFAULT_MODEL):
+    """Prompt tokens of a chat request, including the per-message framing"""
+    return sum(
+        TOKENS_PER_MESSAGE + count_tokens(str(message.get("content") or ""), model)
+        for message in messages or []
+    ) + TOKENS_PER_REPLY
+
+def estimate_message_tokens(messages):
+    """count_message_tokens without a tokenizer, for callers that only need an estimate"""
+    return sum(
+        TOKENS_PER_MESSAGE + estimate_tokens(str(message.get("content") or ""))
+        for message in messages or []
+    ) + TOKENS_PER_REPLY
+
+def estimate_request(messages, max_tokens=None, model=DEFAULT_MODEL):
+    """
+    Predicted size, cost and latency of a chat request before it is sent.
+    The completion is assumed to use EXPECTED_COMPLETION_RATIO of max_tokens
+    """
+    prompt_tokens = count_message_tokens(messages, model)
+    completion_tokens = int((max_tokens or 0) * EXPECTED_COMPLETION_RATIO)
+    input_price, output_price = MODEL_PRICING.get(model, MODEL_PRICING[DEFAULT_MODEL])
+    first_token, tokens_per_second = MODEL_LATENCY.get(model, MODEL_LATENCY[DEFAULT_MODEL])
+
+    return {
+        "model": model,
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "cost_usd": round((prompt_tokens * input_price + completion_tokens * output_price) / 1_000_000, 6),
+        "latency_seconds": round(first_token + completion_tokens / tokens_per_second, 2)
+    }
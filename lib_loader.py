@@ -0,0 +1,22 @@
+import importlib.util
+import os
+import sys
+
+# lib/ sits at the repo root but its directory name ("lib ") is not a valid
+# module name, so entry points (api/ functions, scripts) load it as the
+# "lib" package by path through this helper:
+#   from lib_loader import load_lib
+#   load_lib()
+#   from lib.database import execute_query
+
+LIB_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "lib ")
+
+def load_lib():
+    """Register lib/ as the "lib" package (once per process) and return it"""
+    if "lib" not in sys.modules:
+        lib_spec = importlib.util.spec_from_file_location(
+            "lib", os.path.join(LIB_DIR, "__init__.py"), submodule_search_locations=[LIB_DIR]
+        )
+        sys.modules["lib"] = importlib.util.module_from_spec(lib_spec)
+        lib_spec.loader.exec_module(sys.modules["lib"])
+    return sys.modules["lib"]
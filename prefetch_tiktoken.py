@@ -0,0 +1,38 @@
+import argparse
+import os
+import sys
+
+# Download the tiktoken encodings into lib/tiktoken_cache, which lib/tokens.py
+# points tiktoken at, so cold starts load the encodings from the bundle
+# instead of the network. The Vercel build runs it (buildCommand in
+# vercel_config.json) and fails when a download fails; to run it locally:
+#   python prefetch_tiktoken.py
+
+# lib_loader.py (next to this script) loads lib/ (not a valid module name) as "lib"
+from lib_loader import LIB_DIR, load_lib
+
+CACHE_DIR = os.path.join(LIB_DIR, "tiktoken_cache")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Prefetch tiktoken encodings into lib/tiktoken_cache")
+    parser.add_argument("--cache-dir", default=CACHE_DIR)
+    args = parser.parse_args(argv)
+
+    # Must be set before tiktoken reads it, i.e. before lib.tokens is imported
+    os.makedirs(args.cache_dir, exist_ok=True)
+    os.environ["TIKTOKEN_CACHE_DIR"] = args.cache_dir
+    load_lib()
+    from lib.tokens import PREFETCH_ENCODINGS, tiktoken
+
+    if tiktoken is None:
+        print("tiktoken is not installed (pip install -r requirements.txt)")
+        return 1
+
+    for name in PREFETCH_ENCODINGS:
+        encoding = tiktoken.get_encoding(name)
+        print(f"{name}: {encoding.n_vocab:,} tokens")
+    print(f"Cached in {args.cache_dir}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
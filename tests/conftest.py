@@ -0,0 +1,124 @@
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+# The tests run against a local stub of the OpenAI chat completions API,
+# so concurrency, rate limiting and caching can be checked offline.
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Keep the LLM cache of the test run away from the real one
+os.environ["LLM_CACHE_PATH"] = os.path.join(tempfile.mkdtemp(prefix="medfellow-tests-"), "llm_cache.sqlite3")
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+
+from lib_loader import load_lib
+load_lib()
+
+from lib import llm_cache, rate_limiter
+
+class StubOpenAI:
+    """
+    Minimal /v1/chat/completions server.
+    delay: seconds each request takes; rate_limited: how many of the next
+    requests get a 429 with retry-after-ms; requests / peak_in_flight are
+    counted for assertions
+    """
+
+    def __init__(self):
+        self.delay = 0.0
+        self.rate_limited = 0
+        self.retry_after_ms = 50
+        self.requests = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.server.daemon_threads = True
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}/v1"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def reply_for(self, body):
+        """Content the stub answers with, shaped like each caller expects"""
+        system_prompt = body["messages"][0]["content"]
+        if body.get("response_format", {}).get("type") == "json_object":
+            return json.dumps({"topic": "Stub topic", "questions": [{
+                "question": "Which drug is first-line in type 2 diabetes?",
+                "options": {"A": "Metformin", "B": "Insulin", "C": "Sulfonylurea", "D": "Acarbose"},
+                "answer": "A",
+                "explanation": "Metformin is first-line unless contraindicated."
+            }]})
+        if "YES" in system_prompt:
+            return "YES"
+        return "Stub explanation: the correct answer follows from the key clinical finding. " * 2
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, payload, headers=None):
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                with stub.lock:
+                    stub.requests += 1
+                    stub.in_flight += 1
+                    stub.peak_in_flight = max(stub.peak_in_flight, stub.in_flight)
+                    limited = stub.rate_limited > 0
+                    if limited:
+                        stub.rate_limited -= 1
+                try:
+                    time.sleep(stub.delay)
+                finally:
+                    with stub.lock:
+                        stub.in_flight -= 1
+
+                if limited:
+                    self._send(429, {"error": {"message": "Rate limit reached", "type": "requests"}},
+                               {"retry-after-ms": str(stub.retry_after_ms)})
+                    return
+
+                self._send(200, {
+                    "id": f"chatcmpl-{stub.requests}",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": body["model"],
+                    "choices": [{"index": 0, "finish_reason": "stop",
+                                 "message": {"role": "assistant", "content": stub.reply_for(body)}}],
+                    "usage": {"prompt_tokens": 20, "completion_tokens": 20, "total_tokens": 40}
+                })
+
+        return Handler
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+@pytest.fixture
+def openai_stub():
+    stub = StubOpenAI()
+    # Fresh limiter state and an empty LLM cache for every test
+    rate_limiter.rate_limiters.clear()
+    cache = llm_cache.get_llm_cache()
+    if cache is not None:
+        cache.clear()
+    yield stub
+    stub.close()
@@ -0,0 +1,42 @@
+import json
+
+import pytest
+
+from lib import backfill
+
+COLUMN_MAP = {"question": "question", "A": "a1", "B": "a2", "C": "a3", "D": "a4", "answer": "answer",
+              "explanation": "description"}
+
+class FailingExplainer:
+    def generate_explanations_batch(self, items, max_concurrency=8):
+        return [{"index": index, "success": False, "explanation": None, "error": "API down"}
+                for index in range(len(items))]
+
+@pytest.fixture
+def question_rows(monkeypatch):
+    monkeypatch.setenv("TBLQUESTION_COLUMN_MAP", json.dumps(COLUMN_MAP))
+    rows = [{"questionId": question_id, "question": f"Q{question_id}?", "a1": "a", "a2": "b", "a3": "c",
+             "a4": "d", "answer": "A"} for question_id in range(1, 6)]
+
+    def execute_query(query, params):
+        if "COUNT(*)" in query:
+            return {"data": [{"count": len(rows)}]}
+        return {"data": rows}
+
+    monkeypatch.setattr(backfill, "execute_query", execute_query)
+    monkeypatch.setattr(backfill, "update_descriptions", lambda updates: pytest.fail("nothing to write"))
+    return rows
+
+def test_outage_stops_the_run_without_moving_the_cursor(question_rows, tmp_path):
+    checkpoint_path = str(tmp_path / "checkpoint.json")
+    summary = backfill.run_backfill(checkpoint_path=checkpoint_path, explainer=FailingExplainer())
+
+    assert "batches in a row failed completely" in summary["error"]
+    assert summary["after"] is None
+    assert summary["finished"] is False
+    assert summary["processed"] == 0
+
+def test_checkpoint_location_is_required(monkeypatch):
+    monkeypatch.delenv("BACKFILL_CHECKPOINT_DIR", raising=False)
+    summary = backfill.run_backfill(explainer=FailingExplainer())
+    assert "BACKFILL_CHECKPOINT_DIR" in summary["error"]
@@ -0,0 +1,60 @@
+import pymysql
+import pytest
+
+from lib import database
+
+class FakePool:
+    def __init__(self):
+        self.borrowed = 0
+        self.released = []
+
+    def acquire(self, timeout=None):
+        self.borrowed += 1
+        return object()
+
+    def release(self, connection, discard=False):
+        self.released.append(discard)
+
+@pytest.fixture
+def fake_pool(monkeypatch):
+    pool = FakePool()
+    monkeypatch.setattr(database, "db_pool", pool)
+    monkeypatch.setattr(database, "get_db_pool", lambda: pool)
+    return pool
+
+def test_pooled_connection_is_always_returned(fake_pool):
+    with database.pooled_db_connection() as connection:
+        assert connection is not None
+    with pytest.raises(pymysql.err.OperationalError):
+        with database.pooled_db_connection():
+            raise pymysql.err.OperationalError(2013, "Lost connection")
+
+    assert fake_pool.borrowed == 2
+    # The connection broken by the error is discarded
+    assert fake_pool.released == [False, True]
+
+def test_get_db_connection_keeps_the_thread_local_contract(fake_pool, monkeypatch):
+    connections = []
+
+    class FakeConnection:
+        def ping(self, reconnect=True):
+            pass
+
+    def connect(**config):
+        connections.append(FakeConnection())
+        return connections[-1]
+
+    for name in ("MYSQL_HOST", "MYSQL_USER", "MYSQL_PASSWORD", "MYSQL_DATABASE"):
+        monkeypatch.setenv(name, "test")
+    monkeypatch.setattr(database.pymysql, "connect", connect)
+    monkeypatch.setattr(database.thread_local, "connection", None, raising=False)
+
+    with pytest.warns(DeprecationWarning):
+        first = database.get_db_connection()
+    with pytest.warns(DeprecationWarning):
+        second = database.get_db_connection()
+
+    # One connection per thread, never borrowed from (or owed to) the pool
+    assert first is second
+    assert len(connections) == 1
+    assert fake_pool.borrowed == 0
@@ -0,0 +1,50 @@
+import importlib.util
+import os
+
+import pytest
+
+from lib import explanations
+from lib.queries import build_description_update_query
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+@pytest.fixture
+def client(monkeypatch):
+    spec = importlib.util.spec_from_file_location("explain_question", os.path.join(ROOT, "api", "explain-question.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+    calls = []
+    def get_question_explanation(question_id, regenerate=False, generate=True):
+        calls.append((question_id, regenerate, generate))
+        return {"questionId": question_id, "explanation": "Stored text", "source": "stored", "coalesced": False}
+
+    monkeypatch.setattr(module, "get_question_explanation", get_question_explanation)
+    test_client = module.app.test_client()
+    test_client.calls = calls
+    return test_client
+
+def test_get_never_generates(client):
+    assert client.get("/?questionId=7").status_code == 200
+    assert client.calls == [(7, False, False)]
+
+def test_regenerate_needs_the_admin_token(client, monkeypatch):
+    monkeypatch.delenv("EXPLANATION_ADMIN_TOKEN", raising=False)
+    assert client.post("/", json={"questionId": 7, "regenerate": True}).status_code == 403
+
+    monkeypatch.setenv("EXPLANATION_ADMIN_TOKEN", "secret")
+    assert client.post("/", json={"questionId": 7, "regenerate": True},
+                       headers={"Authorization": "Bearer wrong"}).status_code == 403
+    assert client.post("/", json={"questionId": 7, "regenerate": True},
+                       headers={"Authorization": "Bearer secret"}).status_code == 200
+    assert client.calls == [(7, True, True)]
+
+def test_public_generation_only_fills_empty_descriptions():
+    query = build_description_update_query(1, "description", only_missing=True)
+    assert query.endswith("WHERE (q.`description` IS NULL OR TRIM(q.`description`) = '')")
+    assert "WHERE" not in build_description_update_query(1, "description")
+
+def test_is_explanation_admin_is_off_without_a_token(monkeypatch):
+    monkeypatch.delenv("EXPLANATION_ADMIN_TOKEN", raising=False)
+    assert not explanations.is_explanation_admin("")
+    assert not explanations.is_explanation_admin("anything")
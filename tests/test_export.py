@@ -0,0 +1,32 @@
+import csv
+
+import pytest
+
+from lib import export
+
+MCQ_BLOCKS = [{"topic": "Diabetes", "questions": [{
+    "question": "Which drug is first-line in type 2 diabetes?",
+    "options": {"A": "Metformin", "B": "Insulin", "C": "Sulfonylurea", "D": "Acarbose"},
+    "answer": "A",
+    "explanation": "Metformin is first-line unless contraindicated."
+}]}]
+
+def test_csv_export_writes_one_row_per_question(tmp_path):
+    output_path = str(tmp_path / "mcqs.csv")
+
+    report = export.export_mcqs(iter(MCQ_BLOCKS), output_path)
+
+    assert report["rows"] == 1
+    with open(output_path, newline="", encoding="utf-8-sig") as output:
+        rows = list(csv.reader(output))
+    assert rows[0] == export.MCQ_EXPORT_HEADERS
+    assert rows[1][:3] == ["Diabetes", "Which drug is first-line in type 2 diabetes?", "Metformin"]
+
+def test_parquet_without_pyarrow_says_how_to_install_it(tmp_path, monkeypatch):
+    monkeypatch.setattr(export, "pyarrow", None)
+    output_path = tmp_path / "mcqs.parquet"
+
+    with pytest.raises(ImportError, match="pip install pyarrow"):
+        export.export_mcqs(iter(MCQ_BLOCKS), str(output_path))
+
+    assert not output_path.exists()
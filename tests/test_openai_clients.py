@@ -0,0 +1,143 @@
+import asyncio
+import time
+
+import openai
+import pytest
+
+from lib import rate_limiter
+from lib.board_explainer import GenericBoardStyleMedicalExplainer, EXPLANATION_MODEL
+from lib.llm_client import get_openai_client
+from lib.q_generation_func import create_async_openai_client, generate_mcqs_with_assistant_async
+
+OPTIONS = ["A. Metformin", "B. Insulin", "C. Sulfonylurea", "D. Acarbose"]
+
+def make_explainer(stub):
+    return GenericBoardStyleMedicalExplainer(api_key="test-key", base_url=stub.base_url)
+
+def test_async_explanations_run_concurrently(openai_stub):
+    openai_stub.delay = 0.3
+    explainer = make_explainer(openai_stub)
+
+    async def explain_all():
+        return await asyncio.gather(*[
+            explainer.generate_simple_explanation_async(f"Question {number}?", OPTIONS, "A")
+            for number in range(8)
+        ])
+
+    started = time.monotonic()
+    explanations = asyncio.run(explain_all())
+    elapsed = time.monotonic() - started
+
+    assert all(explanation.startswith("Stub explanation") for explanation in explanations)
+    assert openai_stub.requests == 8
+    assert openai_stub.peak_in_flight > 1
+    # 8 requests one after another would take 2.4s
+    assert elapsed < 8 * openai_stub.delay / 2
+
+def test_batch_explanations_respect_max_concurrency(openai_stub):
+    openai_stub.delay = 0.1
+    explainer = make_explainer(openai_stub)
+
+    items = [(f"Question {number}?", OPTIONS, "A") for number in range(9)]
+    results = explainer.generate_explanations_batch(items, max_concurrency=3)
+
+    assert [result["index"] for result in results] == list(range(9))
+    assert all(result["success"] for result in results)
+    assert 1 < openai_stub.peak_in_flight <= 3
+
+def test_rate_limited_requests_are_retried(openai_stub, monkeypatch):
+    monkeypatch.setattr(rate_limiter, "BACKOFF_BASE", 0.01)
+    openai_stub.rate_limited = 2
+    explainer = make_explainer(openai_stub)
+
+    explanation = explainer._request_simple_explanation("Retried question?", OPTIONS, "A")
+
+    assert explanation.startswith("Stub explanation")
+    assert openai_stub.requests == 3
+    stats = rate_limiter.get_rate_limiter(EXPLANATION_MODEL).stats()
+    assert stats["rate_limited"] == 2
+    assert stats["retries"] == 2
+    assert stats["succeeded"] == 1
+    # The first 429 halved the rate; the second came within the cooldown
+    assert stats["rate_factor"] < 1.0
+
+def test_repeated_explanation_is_served_from_cache(openai_stub):
+    explainer = make_explainer(openai_stub)
+
+    first = explainer._request_simple_explanation("Cached question?", OPTIONS, "A")
+    second = explainer._request_simple_explanation("Cached question?", OPTIONS, "A")
+
+    assert first == second
+    assert openai_stub.requests == 1
+
+def test_async_mcq_generation_against_stub(openai_stub):
+    async def generate():
+        client = create_async_openai_client(api_key="test-key", base_url=openai_stub.base_url)
+        return await generate_mcqs_with_assistant_async(client, "Metformin is the first-line drug in type 2 diabetes. " * 20)
+
+    mcqs = asyncio.run(generate())
+
+    assert mcqs
+    assert openai_stub.requests == 1
+
+def test_deadline_stops_retries(openai_stub):
+    # Retry-After is longer than what is left of the deadline, so the 429 is final
+    openai_stub.rate_limited = 5
+    openai_stub.retry_after_ms = 3000
+    client = get_openai_client(api_key="test-key", base_url=openai_stub.base_url)
+
+    started = time.monotonic()
+    with pytest.raises(openai.RateLimitError):
+        rate_limiter.create_chat_completion(
+            client, model=EXPLANATION_MODEL, messages=[{"role": "user", "content": "Hi"}],
+            timeout=5, deadline=time.monotonic() + 4
+        )
+
+    assert openai_stub.requests == 1
+    assert time.monotonic() - started < 1
+
+def test_deadline_timeout_refunds_the_request_slot():
+    # 60 RPM with a 10s burst: the 11th request would have to queue for a second
+    limiter = rate_limiter.RateLimiter(rpm=60, tpm=600000)
+    for _ in range(10):
+        limiter.call(lambda: None, 10)
+    before = limiter.stats()["requests_available"]
+
+    with pytest.raises(TimeoutError):
+        limiter.call(lambda: pytest.fail("must not be sent"), 10, deadline=time.monotonic() + 1)
+
+    # Only the refill of the elapsed instant separates the two
+    assert limiter.stats()["requests_available"] == pytest.approx(before, abs=0.05)
+
+def test_caller_timeout_is_not_retried(openai_stub):
+    openai_stub.delay = 1.0
+    client = get_openai_client(api_key="test-key", base_url=openai_stub.base_url)
+
+    with pytest.raises(openai.APITimeoutError):
+        rate_limiter.create_chat_completion(
+            client, model=EXPLANATION_MODEL, messages=[{"role": "user", "content": "Hi"}], timeout=0.2
+        )
+
+    assert openai_stub.requests == 1
+
+def test_failed_attempt_refunds_tokens():
+    limiter = rate_limiter.RateLimiter(rpm=60, tpm=6000)
+
+    def fail():
+        raise ValueError("not retryable")
+
+    with pytest.raises(ValueError):
+        limiter.call(fail, 500)
+
+    assert limiter.stats()["tokens_available"] == limiter.token_capacity
+
+def test_refresh_bypasses_and_overwrites_cache(openai_stub):
+    explainer = make_explainer(openai_stub)
+
+    explainer._request_simple_explanation("Regenerated question?", OPTIONS, "A")
+    explainer._request_simple_explanation("Regenerated question?", OPTIONS, "A", refresh=True)
+    assert openai_stub.requests == 2
+
+    # The refreshed explanation is what later requests are served from the cache
+    explainer._request_simple_explanation("Regenerated question?", OPTIONS, "A")
+    assert openai_stub.requests == 2
@@ -0,0 +1,40 @@
+import json
+
+import pytest
+
+from lib.queries import (
+    build_topic_questions_query,
+    get_description_column,
+    get_question_column_map,
+    missing_description_condition
+)
+
+COLUMN_MAP = {"question": "question", "A": "a1", "B": "a2", "C": "a3", "D": "a4", "answer": "answer",
+              "explanation": "explanationText"}
+
+def test_topic_query_selects_every_column_by_default(monkeypatch):
+    monkeypatch.delenv("QUESTION_COLUMNS", raising=False)
+    query, _ = build_topic_questions_query(1)
+    assert query.startswith("SELECT q.* FROM tblquestion q")
+
+def test_question_columns_narrow_the_projection(monkeypatch):
+    monkeypatch.setenv("QUESTION_COLUMNS", "question, description")
+    query, _ = build_topic_questions_query(1)
+    assert query.startswith("SELECT q.`questionId`, q.`question`, q.`description` FROM")
+
+def test_column_map_is_required(monkeypatch):
+    monkeypatch.delenv("TBLQUESTION_COLUMN_MAP", raising=False)
+    with pytest.raises(ValueError, match="TBLQUESTION_COLUMN_MAP is not set"):
+        get_question_column_map()
+    # The description column is known without it
+    assert get_description_column() == "description"
+
+def test_incomplete_column_map_is_rejected(monkeypatch):
+    monkeypatch.setenv("TBLQUESTION_COLUMN_MAP", json.dumps({"question": "question"}))
+    with pytest.raises(ValueError, match="missing fields"):
+        get_question_column_map()
+
+def test_column_map_moves_the_description_column(monkeypatch):
+    monkeypatch.setenv("TBLQUESTION_COLUMN_MAP", json.dumps(COLUMN_MAP))
+    assert get_question_column_map() == COLUMN_MAP
+    assert "`explanationText` IS NULL" in missing_description_condition("q")
@@ -0,0 +1,44 @@
+import pytest
+
+from lib import question_store
+
+COLUMNS = ["question", "a1", "a2", "a3", "a4", "answer", "explanation"]
+BATCH = [{"question": "Same stem?", "options": {"A": "a", "B": "b", "C": "c", "D": "d"}, "answer": "A"}] * 3
+
+class FakeCursor:
+    """Hands out auto-increment IDs like MySQL does for each INSERT"""
+
+    def __init__(self, lock_mode, increment=1, next_id=100):
+        self.lock_mode = lock_mode
+        self.increment = increment
+        self.next_id = next_id
+        self.inserts = 0
+        self.rowcount = 0
+        self.lastrowid = None
+
+    def execute(self, query, params=None):
+        if query.startswith("SELECT @@"):
+            self.row = {"lock_mode": self.lock_mode, "increment": self.increment}
+            return
+        rows = len(params) // len(COLUMNS)
+        self.inserts += 1
+        self.lastrowid = self.next_id
+        self.rowcount = rows
+        self.next_id += rows * self.increment
+
+    def fetchone(self):
+        return self.row
+
+@pytest.fixture(autouse=True)
+def reset_autoinc_settings(monkeypatch):
+    monkeypatch.setattr(question_store, "autoinc_settings", None)
+
+def test_consecutive_lock_mode_uses_one_insert_and_the_increment():
+    cursor = FakeCursor(lock_mode=1, increment=2)
+    assert question_store.insert_questions(cursor, BATCH, COLUMNS) == [100, 102, 104]
+    assert cursor.inserts == 1
+
+def test_interleaved_lock_mode_collects_each_lastrowid():
+    cursor = FakeCursor(lock_mode=2)
+    assert question_store.insert_questions(cursor, BATCH, COLUMNS) == [100, 101, 102]
+    assert cursor.inserts == 3
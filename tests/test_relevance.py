@@ -0,0 +1,66 @@
+from lib.q_generation_func import RELEVANCE_PROMPT_MAX_TOKENS, _local_relevance
+from lib.relevance import is_medical_word, is_navigation_text, should_skip_chunk
+
+SZCZEKLIK_FRONT_MATTER = (
+    "Interna Szczeklika 2023. Podręcznik chorób wewnętrznych. Redaktor naczelny prof. dr hab. med. Piotr Gajewski. "
+    "Medycyna Praktyczna Kraków 2023. Wszelkie prawa zastrzeżone. Żadna część tej publikacji nie może być powielana "
+    "ani rozpowszechniana za pomocą urządzeń elektronicznych, mechanicznych, kopiujących, nagrywających i innych bez "
+    "pisemnej zgody wydawcy. Wydawca dołożył wszelkich starań, aby informacje były aktualne. ISBN 978-83-67211-00-0 "
+    "Wydanie czternaste. Skład i łamanie: Medycyna Praktyczna. Druk i oprawa: drukarnia w Krakowie."
+)
+HARRISON_COPYRIGHT_PAGE = (
+    "Harrison's Principles of Internal Medicine, Twenty-First Edition. Copyright 2022 by McGraw Hill. All rights reserved. "
+    "Printed in the United States of America. Except as permitted under the United States Copyright Act of 1976, no part "
+    "of this publication may be reproduced or distributed in any form or by any means, or stored in a database or retrieval "
+    "system, without the prior written permission of the publisher. ISBN 978-1-264-26850-4. This book was set in Minion Pro "
+    "by Cenveo. The editors were Kay Conerly and Jason Malley. The production supervisor was Catherine Saggese."
+)
+CLINICAL_TEXT = (
+    "Pacjent z cukrzycą typu 2 i nadciśnieniem tętniczym zgłasza duszność oraz obrzęki kończyn dolnych. "
+    "W badaniu stwierdzono niewydolność serca; leczenie obejmuje diuretyki, inhibitory ACE i kontrolę glukozy. "
+    "Powikłania choroby obejmują zawał serca, udar mózgu i przewlekłą chorobę nerek, dlatego rokowanie zależy od terapii."
+)
+LAB_VALUES = (
+    "Index of laboratory reference values in adults. Sodium 135 to 145 mmol/L, potassium 3.5 to 5.0 mmol/L, "
+    "chloride 98 to 106 mmol/L, bicarbonate 22 to 28 mmol/L, urea 2.5 to 7.8 mmol/L, creatinine 60 to 110 µmol/L, "
+    "fasting glucose 3.9 to 5.6 mmol/L, haemoglobin 130 to 170 g/L in men and 120 to 150 g/L in women, "
+    "platelets 150 to 400 x 10^9/L, leukocytes 4 to 10 x 10^9/L, serum albumin 35 to 50 g/L, "
+    "bilirubin 3 to 21 µmol/L, ALT 7 to 56 U/L, HbA1c 48 mmol/mol or more suggests diabetes"
+)
+DRUG_DOSING = (
+    "Dosing of metformin in type 2 diabetes: start with 500 mg once daily with the evening meal, "
+    "then increase the dose by 500 mg every 1 to 2 weeks to 1000 mg twice daily; maximum dose 3000 mg daily. "
+    "In chronic kidney disease with eGFR 30 to 45 ml/min the maximum dose is 1000 mg daily; "
+    "below 30 ml/min the drug is contraindicated. Insulin glargine: initial dose 10 IU or 0.2 IU/kg at bedtime, "
+    "titrate by 2 IU every 3 days until fasting glucose is 4 to 7 mmol/L."
+)
+BOOK_INDEX = (
+    "Index anemia, 45, 112 anemia aplastic, 50 aortic stenosis, 210 asthma, 88, 90 bradycardia, 230 "
+    "bronchiectasis, 95 cirrhosis, 300, 305 colitis, 330 COPD, 80 Crohn disease, 332 cystitis, 410"
+)
+TABLE_OF_CONTENTS = (
+    "Table of contents Preface ........ 5 Heart failure ........ 12 Arrhythmias ........ 40 "
+    "Valvular heart disease ........ 61 Hypertension ........ 88 Pulmonary embolism ........ 101"
+)
+
+def test_front_matter_is_never_rejected_locally():
+    assert _local_relevance(SZCZEKLIK_FRONT_MATTER, RELEVANCE_PROMPT_MAX_TOKENS) is None
+    assert _local_relevance(HARRISON_COPYRIGHT_PAGE, RELEVANCE_PROMPT_MAX_TOKENS) is None
+
+def test_clinical_text_is_accepted_locally():
+    assert _local_relevance(CLINICAL_TEXT * 2, RELEVANCE_PROMPT_MAX_TOKENS) is True
+    assert should_skip_chunk(CLINICAL_TEXT * 2) is None
+
+def test_inflected_polish_terms_are_medical():
+    for word in ("medycyna", "medycznych", "chorób", "bólów", "zakażeń", "zapalnych", "lekarza", "interna", "leczyć"):
+        assert is_medical_word(word), word
+
+def test_lab_values_and_dosing_are_not_navigation():
+    for text in (LAB_VALUES, DRUG_DOSING):
+        assert not is_navigation_text(text)
+        assert should_skip_chunk(text) is None
+
+def test_contents_and_index_pages_are_skipped():
+    # Long enough, and dense enough with medical headings, to pass the density check
+    assert should_skip_chunk(TABLE_OF_CONTENTS * 4) == "navigation"
+    assert should_skip_chunk(BOOK_INDEX * 4) == "navigation"
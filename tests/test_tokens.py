@@ -0,0 +1,44 @@
+from lib import rate_limiter, tokens
+
+class FlakyTiktoken:
+    """tiktoken stand-in whose first load fails, as an interrupted download would"""
+
+    def __init__(self):
+        self.loads = 0
+
+    def encoding_for_model(self, model):
+        self.loads += 1
+        if self.loads == 1:
+            raise ConnectionError("download failed")
+        return FakeEncoding()
+
+class FakeEncoding:
+    def encode(self, text, disallowed_special=()):
+        return text.split()
+
+def test_failed_encoding_load_is_retried(monkeypatch):
+    flaky = FlakyTiktoken()
+    monkeypatch.setattr(tokens, "tiktoken", flaky)
+    monkeypatch.setattr(tokens, "encodings", {})
+    monkeypatch.setattr(tokens, "encoding_failures", {})
+
+    assert tokens.get_encoding("flaky-model") is None
+    # Within the retry window the estimate is used without another download
+    assert tokens.get_encoding("flaky-model") is None
+    assert flaky.loads == 1
+
+    monkeypatch.setattr(tokens, "ENCODING_RETRY_SECONDS", 0)
+    assert isinstance(tokens.get_encoding("flaky-model"), FakeEncoding)
+    assert tokens.count_tokens("one two three", "flaky-model") == 3
+
+def test_request_estimate_does_not_load_a_tokenizer(monkeypatch):
+    def fail(*args, **kwargs):
+        raise AssertionError("the limiter must not load an encoding")
+
+    monkeypatch.setattr(tokens, "get_encoding", fail)
+    messages = [{"role": "user", "content": "Which drug is first-line in type 2 diabetes?"}]
+
+    estimate = rate_limiter.estimate_request_tokens(messages, max_tokens=100)
+
+    assert estimate == tokens.estimate_message_tokens(messages) + 100
+    assert estimate > 100